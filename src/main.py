@@ -1,11 +1,24 @@
 import argparse
+import functools
 import logging
 import pprint
+import sys
+import zipfile
 from pathlib import Path
 
 from rw5_to_csv import convert, prelude
-from rw5_to_csv.plot import plot_total_station_data
+from rw5_to_csv.catalogue import PointCatalogue
+from rw5_to_csv.diff import diff_rw5, save_checkpoint, write_diff_csv
+from rw5_to_csv.gps_stats import summarize_gps_quality, write_gps_quality_csv
+from rw5_to_csv.job_archive import convert_job_archive, convert_job_archives
+from rw5_to_csv.plot_cache import PlotCache
+from rw5_to_csv.plot_data import PlotLOD, station_plot_file_names
+from rw5_to_csv.record_filter import RecordFilter
+from rw5_to_csv.residuals import analyze_station_residuals
+from rw5_to_csv.sinks import GeoJSONSink, JSONLinesSink, ShardedCSVSink
+from rw5_to_csv.svg_plot import plot_total_station_svg, render_station_svgs
 from rw5_to_csv.total_station import get_total_station_stations
+from rw5_to_csv.watch import FolderWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -13,26 +26,148 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert RW5 files to CSV files.")
     parser.add_argument("-i", "--input", required=True)
     parser.add_argument("-o", "--output")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log parsing details, which slows down noisy files.")
     parser.add_argument("--crdb", required=False)
     parser.add_argument("--prelude", action="store_true")
+    parser.add_argument("--diff", help="Old RW5 file or .json checkpoint to diff the input against. Changed rows are written to the output.")
+    parser.add_argument("--checkpoint", help="Save a checkpoint of the converted rows for later diffs.")
+    parser.add_argument("--gps-stats", help="Write GPS quality statistics per base, instrument, status and date to this CSV.")
+    parser.add_argument("--record-types", nargs="+", help="Only keep these record types, e.g. GPS SS.")
+    parser.add_argument("--point-ids", nargs="+", help="Only keep point ids matching these patterns, e.g. '60*'.")
+    parser.add_argument("--memory-budget", type=int, help="Bytes of rows, by pickled size, to hold in memory before spilling to a temporary file.")
+    parser.add_argument("--pipelined", action="store_true", help="Read, parse and write sinks in parallel.")
+    parser.add_argument("--jsonl", help="Also stream rows to this JSON Lines file.")
+    parser.add_argument("--geojson", help="Also stream rows to this GeoJSON file.")
+    parser.add_argument("--shard-by", choices=["station", "date", "instrument"], help="Also write one CSV per station, date or instrument.")
+    parser.add_argument("--shard-dir", help="Folder to write sharded CSVs to.")
+    parser.add_argument("--shard-max-open", type=int, default=128, help="Shard files kept open at once.")
     parser.add_argument("--backsights", action="store_true")
     parser.add_argument("--tsstations", action="store_true")
+    parser.add_argument("--tsresiduals", action="store_true", help="Report BD and SS residuals per station and flag blunders.")
     parser.add_argument("--tsplot", action="store_true")
+    parser.add_argument("--tsplot-lod", action="store_true", help="Thin dense sideshots and labels when plotting.")
+    parser.add_argument("--tsplot-tiles", help="Folder to write an overview plus one plot per station to.")
+    parser.add_argument("--tsplot-stations", help="Folder to render one plot per station into, in parallel.")
+    parser.add_argument("--tsplot-format", choices=["png", "svg"], default="png")
+    parser.add_argument("--tsplot-renderer", choices=["matplotlib", "svg"], default="matplotlib", help="svg writes SVG directly, without loading matplotlib.")
+    parser.add_argument("--tsplot-cache", help="Folder to cache rendered plots in, so unchanged stations aren't redrawn.")
+    parser.add_argument("--tsplot-cache-mb", type=int, default=256, help="Size the plot cache is kept under.")
+    parser.add_argument("--watch", action="store_true", help="Treat input as a folder and convert RW5 files as they arrive.")
+    parser.add_argument("--watch-interval", type=float, default=1.0, help="Seconds between folder scans.")
+    parser.add_argument("--watch-settle", type=float, default=2.0, help="Seconds a file must stay unchanged before conversion.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--archives", action="store_true", help="Treat input as a folder of zipped jobs and convert them all into the output folder.")
+    parser.add_argument("--catalogue", help="SQLite point catalogue to refresh from every RW5 file under the input folder.")
+    parser.add_argument("--find-point", help="Point id to look up in the catalogue after refreshing it.")
     args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, stream=sys.stdout)
     input_path = Path(args.input)
     input_crdb_path = None
     if args.crdb:
         input_crdb_path = Path(args.crdb)
     output_path = Path(args.output) if args.output else None
-    if args.prelude:
+    if args.watch:
+        if not output_path:
+            parser.error("--watch requires an output folder.")
+        watcher = FolderWatcher(
+            input_path,
+            output_path,
+            settle_seconds=args.watch_settle,
+            max_workers=args.workers,
+        )
+        watcher.run(poll_interval=args.watch_interval)
+    elif args.archives:
+        if not output_path:
+            parser.error("--archives requires an output folder.")
+        converted = convert_job_archives(sorted(input_path.glob("*.zip")), output_path, max_workers=args.workers)
+        logger.info("%d archives converted.", len(converted))
+    elif args.catalogue:
+        with PointCatalogue(Path(args.catalogue)) as catalogue:
+            scanned, removed = catalogue.refresh_folder(input_path, max_workers=args.workers)
+            logger.info("%d jobs scanned, %d removed.", len(scanned), len(removed))
+            if args.find_point:
+                logger.info(pprint.pformat(catalogue.find(args.find_point)))
+    elif args.diff:
+        diff = diff_rw5(Path(args.diff), input_path, crdb_path=input_crdb_path)
+        logger.info("%d added, %d removed, %d modified.", len(diff.Added), len(diff.Removed), len(diff.Modified))
+        if output_path:
+            write_diff_csv(diff, output_path)
+    elif args.prelude:
         p = prelude(input_path)
         logger.info(pprint.pformat(p))
     else:
-        machine = convert(input_path, output_path if not args.tsplot else None, crdb_path=input_crdb_path)
+        sinks = []
+        if args.jsonl:
+            sinks.append(JSONLinesSink(Path(args.jsonl)))
+        if args.geojson:
+            sinks.append(GeoJSONSink(Path(args.geojson)))
+        if args.shard_by:
+            if not args.shard_dir:
+                parser.error("--shard-by requires --shard-dir.")
+            sinks.append(ShardedCSVSink(Path(args.shard_dir), args.shard_by, max_open_files=args.shard_max_open))
+        record_filter = None
+        if args.record_types or args.point_ids:
+            record_filter = RecordFilter(
+                RecordTypes=set(args.record_types) if args.record_types else None,
+                PointIDPatterns=args.point_ids,
+            )
+        if zipfile.is_zipfile(input_path):
+            convert_input = functools.partial(convert_job_archive, input_path)
+        else:
+            convert_input = functools.partial(convert, input_path, crdb_path=input_crdb_path)
+        machine = convert_input(
+            output_path if not args.tsplot else None,
+            sinks=sinks,
+            record_filter=record_filter,
+            memory_budget=args.memory_budget,
+            pipelined=args.pipelined,
+        )
+        for (record_type, reason), count in machine.Diagnostics.counts().items():
+            logger.warning("Skipped %d %s records: %s", count, record_type, reason)
+        if args.checkpoint:
+            save_checkpoint(machine, Path(args.checkpoint))
+        if args.gps_stats:
+            write_gps_quality_csv(summarize_gps_quality([machine]), Path(args.gps_stats))
+        lod = PlotLOD() if args.tsplot_lod else None
+        plot_cache = PlotCache(Path(args.tsplot_cache), args.tsplot_cache_mb * 1024 * 1024) if args.tsplot_cache else None
         if args.backsights:
             logger.info(pprint.pformat(machine.Backsights))
         if args.tsstations:
             logger.info(pprint.pformat(get_total_station_stations(machine)))
-        if args.tsplot and output_path:
-            image_bytes = plot_total_station_data(machine)
+        if args.tsresiduals:
+            for station_residuals in analyze_station_residuals(machine):
+                logger.info(pprint.pformat(station_residuals))
+                for point_id in station_residuals.flagged_point_ids():
+                    logger.warning("Blunder from %s to %s.", station_residuals.OccupiedPointID, point_id)
+        if args.tsplot and output_path and args.tsplot_renderer == "svg":
+            output_path.write_text(plot_total_station_svg(machine, lod), encoding="utf-8")
+        elif args.tsplot and output_path:
+            from rw5_to_csv.plot import plot_total_station_data
+
+            image_bytes = plot_total_station_data(machine, lod, plot_cache)
             output_path.write_bytes(image_bytes.read())
+        if args.tsplot_tiles:
+            from rw5_to_csv.plot import plot_total_station_tiles
+
+            tiles_path = Path(args.tsplot_tiles)
+            tiles_path.mkdir(parents=True, exist_ok=True)
+            tiles = plot_total_station_tiles(machine, lod, plot_cache)
+            (tiles_path / "overview.png").write_bytes(tiles.Overview.read())
+            for file_name, image_bytes in zip(station_plot_file_names(tiles.Stations, "png"), tiles.Stations.values()):
+                (tiles_path / file_name).write_bytes(image_bytes.read())
+        if args.tsplot_stations and args.tsplot_renderer == "svg":
+            for image_path in render_station_svgs(get_total_station_stations(machine), Path(args.tsplot_stations), lod):
+                logger.info("Wrote %s", image_path)
+        elif args.tsplot_stations:
+            from rw5_to_csv.plot import render_station_plots
+
+            stations = get_total_station_stations(machine)
+            for image_path in render_station_plots(
+                stations,
+                Path(args.tsplot_stations),
+                image_format=args.tsplot_format,
+                max_workers=args.workers,
+                lod=lod,
+                cache=plot_cache,
+            ):
+                logger.info("Wrote %s", image_path)
@@ -3,11 +3,17 @@
 Copyright (C) 2024 Joseph Long.
 """
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
 from rw5_to_csv.convert import convert
-from rw5_to_csv.plot import plot_total_station_data
 from rw5_to_csv.prelude import prelude
 from rw5_to_csv.total_station import TSStation, get_total_station_stations
 
+if TYPE_CHECKING:
+    from rw5_to_csv.plot import plot_total_station_data
+
 __all__ = [
     "TSStation",
     "convert",
@@ -15,3 +21,13 @@ __all__ = [
     "plot_total_station_data",
     "prelude",
 ]
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    # matplotlib takes seconds to import, so only load it when plotting
+    if name == "plot_total_station_data":
+        from rw5_to_csv.plot import plot_total_station_data  # noqa: PLC0415
+
+        return plot_total_station_data
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
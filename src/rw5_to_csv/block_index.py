@@ -0,0 +1,278 @@
+"""Sidecar index of an RW5 file's command blocks, for looking up single points without converting the whole file.
+
+The index records the byte offset, record type and point id of every command
+block, plus which blocks change machine state. `get_point` seeks to the last
+block of a point and replays only the state blocks that row depends on.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import json
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from rw5_to_csv.convert import apply_machine_state
+from rw5_to_csv.machine_state import MachineState
+from rw5_to_csv.record_filter import POINT_ID_PARAMS
+from rw5_to_csv.records.common import get_prism_applied, get_standard_record_params_dict
+from rw5_to_csv.records.records_parsers import RECORD_CSV_PARSERS, STATEFUL_RECORD_TYPES
+from rw5_to_csv.utils.atomic_write import write_atomically
+from rw5_to_csv.utils.command_blocks import group_lines_into_command_blocks, iter_command_block_offsets
+from rw5_to_csv.utils.compression import open_rw5
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import BinaryIO
+
+    from rw5_to_csv.records.record import RW5Row
+
+logger = getLogger(__name__)
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+"""Appended to the RW5 file name, e.g. `job.rw5.idx`."""
+ROVER_HEIGHT_PREFIX = "--Entered Rover HR:"
+
+
+@dataclass
+class BlockIndex:
+    """Offsets, record types and point ids of every command block of one RW5 file."""
+
+    Size: int
+    """File size the index was built from."""
+    MtimeNs: int
+    """File modification time the index was built from."""
+    Offsets: list[int]
+    """Byte offset of each command block's first line."""
+    RecordTypes: list[str]
+    PointIDs: list[str | None]
+    """`PN`, `FP` or `OP` of each block."""
+    Prisms: dict[int, str] = field(default_factory=dict)
+    """Prism label of each block with a prism change notice, by block number."""
+    RodHeightBlocks: list[int] = field(default_factory=list)
+    """LS blocks that set the rod height, ascending."""
+    _positions: dict[str, list[int]] = field(init=False, repr=False, default_factory=dict)
+    _state_blocks: dict[str, list[int]] = field(init=False, repr=False, default_factory=dict)
+    _prism_blocks: list[int] = field(init=False, repr=False, default_factory=list)
+
+    def __post_init__(self) -> None:  # noqa: D105
+        self._prism_blocks = sorted(self.Prisms)
+        for block_number, (record_type, point_id) in enumerate(zip(self.RecordTypes, self.PointIDs)):
+            if point_id is not None:
+                self._positions.setdefault(point_id, []).append(block_number)
+            if record_type in STATEFUL_RECORD_TYPES:
+                self._state_blocks.setdefault(record_type, []).append(block_number)
+
+    def is_current(self, rw5_path: Path) -> bool:
+        """Check the index was built from the file as it is now."""  # noqa: DOC201
+        stat = rw5_path.stat()
+        return stat.st_size == self.Size and stat.st_mtime_ns == self.MtimeNs
+
+    def positions(self, point_id: str) -> list[int]:
+        """Return the block numbers with `point_id`, ascending."""  # noqa: DOC201
+        return self._positions.get(point_id, [])
+
+    def last_before(self, record_type: str, block_number: int, point_id: str | None = None) -> int | None:
+        """Return the last state changing block of `record_type` before `block_number`."""  # noqa: DOC201
+        if point_id is not None:
+            candidates = [i for i in self.positions(point_id) if self.RecordTypes[i] == record_type]
+        else:
+            candidates = self._state_blocks.get(record_type, [])
+        i = bisect.bisect_left(candidates, block_number)
+        return candidates[i - 1] if i > 0 else None
+
+    def prism_at(self, block_number: int) -> str | None:
+        """Return the prism applied when `block_number` is parsed."""  # noqa: DOC201
+        i = bisect.bisect_right(self._prism_blocks, block_number)
+        return self.Prisms[self._prism_blocks[i - 1]] if i > 0 else None
+
+    def block_span(self, block_number: int) -> tuple[int, int | None]:
+        """Return the byte range of a block, open ended for the last one."""  # noqa: DOC201
+        end = self.Offsets[block_number + 1] if block_number + 1 < len(self.Offsets) else None
+        return self.Offsets[block_number], end
+
+
+def index_path_for(rw5_path: Path) -> Path:
+    """Return the sidecar index path of an RW5 file."""  # noqa: DOC201
+    return rw5_path.with_name(rw5_path.name + INDEX_SUFFIX)
+
+
+def build_block_index(rw5_path: Path) -> BlockIndex:
+    """Scan an RW5 file once and index its command blocks."""  # noqa: DOC201
+    stat = rw5_path.stat()
+    offsets: list[int] = []
+    record_types: list[str] = []
+    point_ids: list[str | None] = []
+    prisms: dict[int, str] = {}
+    rod_height_blocks: list[int] = []
+
+    previous_block: list[str] = []
+    with open_rw5(rw5_path, "rb") as input_file:
+        for block_number, (offset, command_block) in enumerate(iter_command_block_offsets(input_file)):
+            record_type = command_block[0].split(",")[0]
+            params = get_standard_record_params_dict(command_block[0])
+            offsets.append(offset)
+            record_types.append(record_type)
+            point_ids.append(next((params[p] for p in POINT_ID_PARAMS if p in params), None))
+
+            prism = get_prism_applied(command_block)
+            if prism:
+                prisms[block_number] = prism
+            # same conditions `parse_ls_record` sets HR on
+            if record_type == "LS" and "HR" in params and (
+                "HI" in params or any(line.startswith(ROVER_HEIGHT_PREFIX) for line in previous_block)
+            ):
+                rod_height_blocks.append(block_number)
+            previous_block = command_block
+
+    return BlockIndex(
+        Size=stat.st_size,
+        MtimeNs=stat.st_mtime_ns,
+        Offsets=offsets,
+        RecordTypes=record_types,
+        PointIDs=point_ids,
+        Prisms=prisms,
+        RodHeightBlocks=rod_height_blocks,
+    )
+
+
+def save_block_index(block_index: BlockIndex, index_path: Path) -> None:
+    """Write an index as compact JSON, atomically so readers never see a partial index."""
+    text = json.dumps({
+        "version": INDEX_VERSION,
+        "size": block_index.Size,
+        "mtime_ns": block_index.MtimeNs,
+        "offsets": block_index.Offsets,
+        "record_types": block_index.RecordTypes,
+        "point_ids": block_index.PointIDs,
+        "prisms": block_index.Prisms,
+        "rod_height_blocks": block_index.RodHeightBlocks,
+    }, separators=(",", ":"))
+    write_atomically(index_path, lambda tmp_path: tmp_path.write_text(text))
+
+
+def _read_block_index(index_path: Path) -> BlockIndex | None:
+    """Read a saved index, or return None if it is unreadable or from another version."""  # noqa: DOC201
+    try:
+        data = json.loads(index_path.read_text())
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return BlockIndex(
+            Size=data["size"],
+            MtimeNs=data["mtime_ns"],
+            Offsets=data["offsets"],
+            RecordTypes=data["record_types"],
+            PointIDs=data["point_ids"],
+            Prisms={int(block_number): prism for block_number, prism in data["prisms"].items()},
+            RodHeightBlocks=data["rod_height_blocks"],
+        )
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # JSONDecodeError is a ValueError; the others come from valid JSON of the wrong shape
+        logger.debug("Rebuilding unreadable block index %s.", index_path)
+        return None
+
+
+def load_block_index(rw5_path: Path) -> BlockIndex:
+    """Load the sidecar index of an RW5 file, rebuilding it if it is missing, stale, unreadable or from another version."""  # noqa: DOC201
+    index_path = index_path_for(rw5_path)
+    if index_path.exists():
+        block_index = _read_block_index(index_path)
+        if block_index is not None and block_index.is_current(rw5_path):
+            return block_index
+
+    block_index = build_block_index(rw5_path)
+    save_block_index(block_index, index_path)
+    return block_index
+
+
+def _read_block(input_file: BinaryIO, block_index: BlockIndex, block_number: int) -> list[str]:
+    start, end = block_index.block_span(block_number)
+    input_file.seek(start)
+    text = input_file.read(-1 if end is None else end - start).decode("iso8859-1")
+    return group_lines_into_command_blocks(text.splitlines())[0]
+
+
+def _parse_block(
+    input_file: BinaryIO,
+    block_index: BlockIndex,
+    block_number: int,
+    tzinfo: datetime.tzinfo | None,
+    crdb_path: Path | None,
+) -> list[RW5Row]:
+    """Parse one block after replaying the state blocks before it that its rows depend on."""
+    machine_state = MachineState(tzinfo=tzinfo, crdb_path=crdb_path)
+
+    replay: set[int] = set()
+    last_ls = block_index.last_before("LS", block_number)
+    if last_ls is not None:
+        # the last LS sets instrument height and type, the last one that set HR the rod height
+        replay.add(last_ls)
+        i = bisect.bisect_left(block_index.RodHeightBlocks, block_number)
+        if i > 0:
+            replay.add(block_index.RodHeightBlocks[i - 1])
+    last_bp = block_index.last_before("BP", block_number)
+    if last_bp is not None:
+        replay.add(last_bp)
+    last_oc = block_index.last_before("OC", block_number)
+    if last_oc is not None:
+        replay.add(last_oc)
+    last_bk = block_index.last_before("BK", block_number)
+    if last_bk is not None:
+        replay.add(last_bk)
+        # sideshots are from the OC the backsight was taken on
+        bk_oc = block_index.last_before("OC", last_bk, point_id=block_index.PointIDs[last_bk])
+        if bk_oc is not None:
+            replay.add(bk_oc)
+
+    for state_block_number in sorted(replay):
+        command_block = _read_block(input_file, block_index, state_block_number)
+        if block_index.RecordTypes[state_block_number] == "LS" and state_block_number > 0:
+            machine_state.ProcessedCommandBlocks.append(_read_block(input_file, block_index, state_block_number - 1))
+        RECORD_CSV_PARSERS[block_index.RecordTypes[state_block_number]](command_block, machine_state)
+
+    machine_state.PrismApplied = block_index.prism_at(block_number)
+    command_block = _read_block(input_file, block_index, block_number)
+    rows = RECORD_CSV_PARSERS[block_index.RecordTypes[block_number]](command_block, machine_state)
+    for row in rows:
+        apply_machine_state(row, machine_state)
+    return rows
+
+
+def get_point(
+    rw5_path: Path,
+    point_id: str,
+    tzinfo: datetime.tzinfo | None = None,
+    crdb_path: Path | None = None,
+) -> RW5Row:
+    """Return the row `convert()` would give `point_id`, without converting the whole file.
+
+    Uses the file's sidecar index, building it first if needed.
+    """  # noqa: DOC201, DOC501
+    block_index = load_block_index(rw5_path)
+    candidates = [i for i in block_index.positions(point_id) if block_index.RecordTypes[i] in RECORD_CSV_PARSERS]
+
+    with open_rw5(rw5_path, "rb") as input_file:
+        # the last block that gives a row wins, and is overwritten if any earlier one gave a row too
+        found: RW5Row | None = None
+        for block_number in reversed(candidates):
+            rows = [
+                row for row in _parse_block(input_file, block_index, block_number, tzinfo, crdb_path)
+                if row.PointID == point_id
+            ]
+            if not rows:
+                continue
+            if found is not None:
+                found.Overwritten = True
+                return found
+            found = rows[-1]
+            if len(rows) > 1:
+                found.Overwritten = True
+                return found
+
+    if found is None:
+        msg = f"Point {point_id!r} not found in {rw5_path}."
+        raise KeyError(msg)
+    return found
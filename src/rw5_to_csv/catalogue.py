@@ -0,0 +1,230 @@
+"""Archive-wide catalogue of which RW5 jobs shot which points.
+
+Each job is scanned once, in parallel, for its prelude and the point id, record
+type and time of every shot. Results are kept in an indexed SQLite file, and
+refreshing only rescans jobs whose size or mtime changed.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rw5_to_csv.prelude import prelude
+from rw5_to_csv.record_filter import POINT_ID_PARAMS
+from rw5_to_csv.records.common import get_date_time, get_standard_record_params_dict
+from rw5_to_csv.utils.command_blocks import iter_command_blocks
+from rw5_to_csv.utils.compression import open_rw5
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+logger = getLogger(__name__)
+
+POINT_RECORD_TYPES = {"GPS", "SS", "SP", "OC", "BP"}
+"""Record types that give a point a row in the converted output."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    job_name TEXT,
+    job_date TEXT,
+    equipment TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS points (
+    point_id TEXT NOT NULL,
+    job_id INTEGER NOT NULL REFERENCES jobs (job_id),
+    record_type TEXT NOT NULL,
+    date_time TEXT
+);
+CREATE INDEX IF NOT EXISTS points_point_id ON points (point_id);
+CREATE INDEX IF NOT EXISTS points_job_id ON points (job_id);
+"""
+
+
+@dataclass
+class CataloguedShot:
+    """A point shot by one job."""
+
+    PointID: str
+    RecordType: str
+    DateTime: str | None
+    """ISO format, None for records without a time."""
+
+
+@dataclass
+class CataloguedJob:
+    """What a scan of one RW5 file found."""
+
+    Path: str
+    Size: int
+    MtimeNs: int
+    JobName: str | None = None
+    JobDate: str | None = None
+    """ISO format date and time of the JB record."""
+    Equipment: str | None = None
+    Error: str | None = None
+    """Why the prelude couldn't be read, if it couldn't."""
+    Shots: list[CataloguedShot] = field(default_factory=list)
+
+
+@dataclass
+class PointLocation:
+    """Result of a point lookup: a shot and the job it's in."""
+
+    PointID: str
+    RecordType: str
+    DateTime: str | None
+    JobPath: Path
+    JobName: str | None
+    JobDate: str | None
+    Equipment: str | None
+
+
+def scan_job(rw5_path: Path, tzinfo: datetime.tzinfo = datetime.UTC) -> CataloguedJob:
+    """Read an RW5 file's header prelude and the point id of each shot, without parsing the shots."""  # noqa: DOC201
+    stat = rw5_path.stat()
+    job = CataloguedJob(Path=str(rw5_path), Size=stat.st_size, MtimeNs=stat.st_mtime_ns)
+    try:
+        rw5_prelude = prelude(rw5_path, header_only=True)
+        job.JobName = rw5_prelude.JobName
+        job.JobDate = rw5_prelude.ISODateTime
+        job.Equipment = rw5_prelude.Equipment or None
+    except (ValueError, KeyError) as e:
+        job.Error = str(e)
+
+    with open_rw5(rw5_path) as input_file:
+        for command_block in iter_command_blocks(input_file):
+            record_type = command_block[0].split(",")[0]
+            if record_type not in POINT_RECORD_TYPES:
+                continue
+            params = get_standard_record_params_dict(command_block[0])
+            point_id = next((params[p] for p in POINT_ID_PARAMS if p in params), None)
+            if point_id is None:
+                continue
+            dt = get_date_time(command_block, tzinfo)
+            job.Shots.append(CataloguedShot(
+                PointID=point_id,
+                RecordType=record_type,
+                DateTime=dt.isoformat() if dt else None,
+            ))
+    return job
+
+
+class PointCatalogue:
+    """SQLite catalogue of the points shot by every RW5 job in an archive."""
+
+    def __init__(self, catalogue_path: Path) -> None:
+        self.catalogue_path = catalogue_path
+        self._connection = sqlite3.connect(catalogue_path)
+        self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:  # noqa: D102
+        self._connection.close()
+
+    def __enter__(self) -> PointCatalogue:  # noqa: D105
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:  # noqa: D105
+        self.close()
+
+    def _delete_job(self, job_id: int) -> None:
+        self._connection.execute("DELETE FROM points WHERE job_id = ?", (job_id,))
+        self._connection.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def _store_job(self, job: CataloguedJob) -> None:
+        existing = self._connection.execute("SELECT job_id FROM jobs WHERE path = ?", (job.Path,)).fetchone()
+        if existing is not None:
+            self._delete_job(existing[0])
+        job_id = self._connection.execute(
+            "INSERT INTO jobs (path, size, mtime_ns, job_name, job_date, equipment, error)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job.Path, job.Size, job.MtimeNs, job.JobName, job.JobDate, job.Equipment, job.Error),
+        ).lastrowid
+        self._connection.executemany(
+            "INSERT INTO points (point_id, job_id, record_type, date_time) VALUES (?, ?, ?, ?)",
+            ((shot.PointID, job_id, shot.RecordType, shot.DateTime) for shot in job.Shots),
+        )
+
+    def refresh(
+        self,
+        rw5_paths: Iterable[Path],
+        max_workers: int | None = None,
+        tzinfo: datetime.tzinfo = datetime.UTC,
+    ) -> tuple[list[Path], list[Path]]:
+        """Bring the catalogue up to date with `rw5_paths`, which should be every job in the archive.
+
+        New jobs and jobs whose size or mtime changed are scanned in parallel,
+        and jobs no longer in `rw5_paths` are dropped.
+        Returns the rescanned and dropped paths.
+        """  # noqa: DOC201
+        known = {
+            path: (job_id, size, mtime_ns)
+            for job_id, path, size, mtime_ns in self._connection.execute(
+                "SELECT job_id, path, size, mtime_ns FROM jobs",
+            )
+        }
+        current = {str(rw5_path): rw5_path for rw5_path in rw5_paths}
+
+        stale = []
+        for path_str, rw5_path in current.items():
+            stat = rw5_path.stat()
+            if known.get(path_str, (None, None, None))[1:] != (stat.st_size, stat.st_mtime_ns):
+                stale.append(rw5_path)
+        removed = [Path(path_str) for path_str in known if path_str not in current]
+
+        with self._connection:
+            for path in removed:
+                self._delete_job(known[str(path)][0])
+
+        if stale:
+            workers = max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunksize = max(1, len(stale) // (4 * workers))
+                for job in executor.map(scan_job, stale, [tzinfo] * len(stale), chunksize=chunksize):
+                    if job.Error:
+                        logger.warning("Catalogued %s without its prelude: %s", job.Path, job.Error)
+                    with self._connection:
+                        self._store_job(job)
+
+        return stale, removed
+
+    def refresh_folder(
+        self,
+        archive_dir: Path,
+        pattern: str = "**/*.rw5",
+        max_workers: int | None = None,
+        tzinfo: datetime.tzinfo = datetime.UTC,
+    ) -> tuple[list[Path], list[Path]]:
+        """Refresh from every file under `archive_dir` matching `pattern`."""  # noqa: DOC201
+        return self.refresh(sorted(archive_dir.glob(pattern)), max_workers=max_workers, tzinfo=tzinfo)
+
+    def find(self, point_id: str) -> list[PointLocation]:
+        """Return every shot of `point_id` in the archive, oldest job first."""  # noqa: DOC201
+        return [
+            PointLocation(
+                PointID=point_id,
+                RecordType=record_type,
+                DateTime=date_time,
+                JobPath=Path(path),
+                JobName=job_name,
+                JobDate=job_date,
+                Equipment=equipment,
+            )
+            for record_type, date_time, path, job_name, job_date, equipment in self._connection.execute(
+                "SELECT points.record_type, points.date_time, jobs.path, jobs.job_name, jobs.job_date, jobs.equipment"
+                " FROM points JOIN jobs USING (job_id) WHERE points.point_id = ?"
+                " ORDER BY jobs.job_date, points.date_time",
+                (point_id,),
+            )
+        ]
@@ -8,29 +8,45 @@ from __future__ import annotations
 
 import csv
 import datetime
-import logging
-import sys
-from dataclasses import asdict
+import queue
+import threading
+from collections import deque
+from logging import getLogger
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from rw5_to_csv.machine_state import MachineState
+from rw5_to_csv.record_filter import block_point_id
+from rw5_to_csv.record_store import SpillingRecordStore
 from rw5_to_csv.records.common import get_prism_applied
 from rw5_to_csv.records.record import (
     RW5Row,
+    row_dict,
 )
-from rw5_to_csv.records.records_parsers import RECORD_CSV_PARSERS
-from rw5_to_csv.utils.command_blocks import group_lines_into_command_blocks
+from rw5_to_csv.records.records_parsers import RECORD_CSV_PARSERS, STATEFUL_RECORD_TYPES, get_command_block_lookback
+from rw5_to_csv.time_index import TimeIndex
+from rw5_to_csv.utils.command_blocks import group_lines_into_command_blocks, iter_numbered_command_blocks  # noqa: F401
+from rw5_to_csv.utils.compression import open_rw5
 
-logging.basicConfig(level=logging.DEBUG, stream=sys.stdout)
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from rw5_to_csv.record_filter import RecordFilter
+    from rw5_to_csv.sinks import RecordSink
+
+logger = getLogger(__name__)
 
 
 def parse_command(
     command_block: list[str],
     machine_state: MachineState,
+    record_filter: RecordFilter | None = None,
 ) -> list[RW5Row] | None:
     """Create a CSV row form an RW5 command block.
 
+    Blocks rejected by `record_filter` are not parsed, unless their record changes machine state.
+    However a record is rejected, any earlier row with its point id is dropped too, see `_drop_rejected`.
+
     Returns
     -------
     CSV Record
@@ -41,49 +57,249 @@ def parse_command(
     prism = get_prism_applied(command_block)
     machine_state.PrismApplied = prism or machine_state.PrismApplied
 
-    if record_type in RECORD_CSV_PARSERS:
-        return RECORD_CSV_PARSERS[record_type](command_block, machine_state)
-    return None
+    if record_type not in RECORD_CSV_PARSERS:
+        return None
+    parser = RECORD_CSV_PARSERS[record_type]
+    if record_filter is None:
+        return parser(command_block, machine_state)
 
+    if not record_filter.accepts_block(record_type, command_block, machine_state.tzinfo or datetime.UTC):
+        if record_type in STATEFUL_RECORD_TYPES:
+            rejected_point_ids = [row.PointID for row in parser(command_block, machine_state)]
+        else:
+            rejected_point_ids = [block_point_id(command_block)]
+        for point_id in rejected_point_ids:
+            if point_id is not None:
+                _drop_rejected(point_id, machine_state)
+        return None
+    rows = []
+    for row in parser(command_block, machine_state):
+        if record_filter.accepts_row(row):
+            rows.append(row)
+        else:
+            _drop_rejected(row.PointID, machine_state)
+    return rows
 
-def convert(rw5_path: Path, output_path: Path | None, tzinfo: datetime._TzInfo | None = None, crdb_path: Path | None = None, ignore_missing_shots: bool = False):
-    """Convert rw5 file to a csv file."""  # noqa: DOC201
-    machine_state = MachineState(
-        tzinfo=tzinfo,
-        crdb_path=crdb_path,
-    )
 
-    with rw5_path.open("r", encoding="iso8859-1") as input_file:
-        command_blocks = group_lines_into_command_blocks(input_file.readlines())
+def _drop_rejected(point_id: str, machine_state: MachineState) -> None:
+    """Drop the row with `point_id` and the base point or occupied point recorded for it.
+
+    A rejected re-shot supersedes earlier shots, so this leaves the same rows as
+    filtering after conversion would, except that a point id shot again and
+    accepted moves to the end of `machine_state.Records`.
+    """
+    machine_state.Records.pop(point_id, None)
+    machine_state.GPSIDBasePointID.pop(point_id, None)
+    machine_state.SideshotIDOccupiedPointID.pop(point_id, None)
+    if machine_state.TimeIndex is not None:
+        machine_state.TimeIndex.discard(point_id)
+    machine_state.RejectedPointIDs.add(point_id)
+
+
+def apply_machine_state(row: RW5Row, machine_state: MachineState) -> None:
+    """Set the fields of a row that come from machine state rather than the record itself."""
+    row.InstrumentHeight = machine_state.HI
+    row.RodHeight = machine_state.HR
+    row.InstrumentType = machine_state.InstrumentType
+    row.PrismApplied = machine_state.PrismApplied
+
+
+SinkEvent = tuple[str, tuple[Any, ...]]
+"""Name of the `RecordSink` method to call, and its arguments."""
+
+PIPELINE_BATCH_SIZE = 256
+"""Command blocks, or the sink events of that many blocks, passed between pipeline stages at a time."""
+PIPELINE_QUEUE_SIZE = 8
+"""Batches each pipeline queue holds before the stage feeding it waits."""
+_END_OF_STREAM = object()
+
+
+def _process_command_block(  # noqa: PLR0913
+    line_number: int,
+    command_block: list[str],
+    machine_state: MachineState,
+    record_filter: RecordFilter | None,
+    ignore_missing_shots: bool,
+    emit_events: bool,
+) -> list[SinkEvent]:
+    """Parse a command block into `machine_state.Records`, returning what to feed the sinks if `emit_events`."""  # noqa: DOC201, DOC501
+    events: list[SinkEvent] = []
+    num_backsights = len(machine_state.Backsights)
+    machine_state.LineNumber = line_number
+    try:
+        command_rows = parse_command(command_block, machine_state, record_filter)
+    except KeyError as e:
+        if ignore_missing_shots:
+            machine_state.Diagnostics.add(command_block[0].split(",")[0], line_number, f"Missing shot {e}.")
+            return events
+        raise
+    machine_state.ProcessedCommandBlocks.append(command_block)
+    if emit_events:
+        events.extend(("write_backsight", (backsight,)) for backsight in machine_state.Backsights[num_backsights:])
+    if not command_rows:
+        return events
+
+    for row in command_rows:
+        # share one string per point id between rows, record keys and point id maps
+        row.PointID = machine_state.PointIDs.canonical(row.PointID)
+        # set some fields on record from machine state
+        apply_machine_state(row, machine_state)
+
+        # if we've seen a record with this point ID before, replace the old one
+        old_row = machine_state.Records.get(row.PointID)
+        if old_row is not None or row.PointID in machine_state.RejectedPointIDs:
+            # set overwritten flag
+            row.Overwritten = True
+            if emit_events and old_row is not None:
+                events.append(("write_overwrite", (old_row, row)))
+
+        # new point ids are added to the end, overwrites keep the old row's position
+        machine_state.Records[row.PointID] = row
+        if machine_state.TimeIndex is not None:
+            machine_state.TimeIndex.add(row)
+        if emit_events:
+            events.append(("write_row", (row,)))
+    return events
 
-    for command_block in command_blocks:
+
+def _dispatch(events: list[SinkEvent], sinks: Sequence[RecordSink]) -> None:
+    for method, args in events:
+        for sink in sinks:
+            getattr(sink, method)(*args)
+
+
+def _put_unless_stopped(items: queue.Queue, item: object, stop: threading.Event) -> bool:
+    """Put `item`, waiting for room until `stop` is set. Returns whether it was put."""  # noqa: DOC201
+    while not stop.is_set():
         try:
-            command_rows = parse_command(command_block, machine_state)
-        except KeyError:
-            if ignore_missing_shots:
-                continue
-            raise
-        machine_state.ProcessedCommandBlocks.append(command_block)
-        if not command_rows:
+            items.put(item, timeout=0.1)
+        except queue.Full:
+            continue
+        return True
+    return False
+
+
+def _read_stage(rw5_path: Path, blocks: queue.Queue, stop: threading.Event) -> None:
+    """Read and group command blocks into `blocks` in batches, ending with `_END_OF_STREAM` or the exception raised."""
+    try:
+        with open_rw5(rw5_path) as input_file:
+            batch: list[tuple[int, list[str]]] = []
+            for numbered_block in iter_numbered_command_blocks(input_file):
+                batch.append(numbered_block)
+                if len(batch) == PIPELINE_BATCH_SIZE:
+                    if not _put_unless_stopped(blocks, batch, stop):
+                        return
+                    batch = []
+            if batch and not _put_unless_stopped(blocks, batch, stop):
+                return
+        _put_unless_stopped(blocks, _END_OF_STREAM, stop)
+    except BaseException as e:  # noqa: BLE001
+        # handed to the parse stage to raise
+        _put_unless_stopped(blocks, e, stop)
+
+
+def _output_stage(events: queue.Queue, sinks: Sequence[RecordSink], errors: list[BaseException]) -> None:
+    """Feed batches of sink events to `sinks` until `_END_OF_STREAM`.
+
+    After a sink fails, the exception is kept in `errors` and later batches are
+    only drained, so the parse stage never blocks on a full queue.
+    """
+    while True:
+        batch = events.get()
+        if batch is _END_OF_STREAM:
+            return
+        if errors:
             continue
+        try:
+            _dispatch(batch, sinks)
+        except BaseException as e:  # noqa: BLE001
+            errors.append(e)
+
+
+def _convert_pipelined(
+    rw5_path: Path,
+    machine_state: MachineState,
+    sinks: Sequence[RecordSink],
+    record_filter: RecordFilter | None,
+    ignore_missing_shots: bool,
+) -> None:
+    """Parse `rw5_path` with reading and sink output in their own threads, joined by bounded queues.
+
+    Parsing stays on the calling thread and in file order, as each block depends
+    on the machine state the blocks before it left. An exception in any stage
+    stops the others and is raised here once both threads have finished.
+    """  # noqa: DOC501
+    blocks: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    events: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    output_errors: list[BaseException] = []
+    reader = threading.Thread(target=_read_stage, args=(rw5_path, blocks, stop), name="rw5-reader", daemon=True)
+    writer = threading.Thread(target=_output_stage, args=(events, sinks, output_errors), name="rw5-writer", daemon=True)
+    reader.start()
+    writer.start()
+    try:
+        while True:
+            batch = blocks.get()
+            if batch is _END_OF_STREAM:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            if output_errors:
+                raise output_errors[0]
+            batch_events: list[SinkEvent] = []
+            for line_number, command_block in batch:
+                batch_events.extend(
+                    _process_command_block(line_number, command_block, machine_state, record_filter, ignore_missing_shots, bool(sinks)),
+                )
+            if batch_events:
+                events.put(batch_events)
+    finally:
+        stop.set()
+        # the writer drains everything before the end marker, so this never blocks for long
+        events.put(_END_OF_STREAM)
+        writer.join()
+        reader.join()
+    if output_errors:
+        raise output_errors[0]
 
-        for row in command_rows:
-            # set some fields on record from machine state
-            row.InstrumentHeight = machine_state.HI
-            row.RodHeight = machine_state.HR
-            row.InstrumentType = machine_state.InstrumentType
-            row.PrismApplied = machine_state.PrismApplied
 
-            # if we've seen a record with this point ID before, replace the old one
-            if row.PointID in machine_state.Records:
-                # set overwritten flag
-                row.Overwritten = True
-                machine_state.Records[row.PointID] = row
-                # skip rest of iteration
-                continue
+def convert(rw5_path: Path, output_path: Path | None, tzinfo: datetime._TzInfo | None = None, crdb_path: Path | None = None, ignore_missing_shots: bool = False, lazy_rows: bool = False, keep_command_history: bool = False, sinks: Sequence[RecordSink] = (), record_filter: RecordFilter | None = None, build_time_index: bool = False, memory_budget: int | None = None, pipelined: bool = False):
+    """Convert rw5 file to a csv file.
+
+    With `lazy_rows`, GPS rows keep their command block and only parse fields when they are read.
+    With `keep_command_history`, every processed command block is kept on the machine state for debugging.
+    Each of `sinks` is fed rows, overwrites and backsights as they are parsed, and is closed when done.
+    Only rows accepted by `record_filter` are kept, rejected records skip parsing where possible.
+    With `build_time_index`, `machine_state.TimeIndex` is set for querying rows by shot time.
+    With `memory_budget`, rows beyond roughly that many bytes, by pickled size, spill to a temporary file.
+    The RW5 file may be gzip, bzip2 or xz compressed, and is decompressed as it is read,
+    or a `zipfile.Path` member of a job archive, see `job_archive.convert_job_archive`.
+    Blocks that are skipped, such as GPS records missing their RMS lines, are listed in `machine_state.Diagnostics`.
+    With `pipelined`, reading, parsing and feeding `sinks` run concurrently, so file I/O overlaps parsing.
+    The output CSV is still written once parsing is done, as overwrites keep the position of the old row.
+    """  # noqa: DOC201
+    machine_state = MachineState(
+        tzinfo=tzinfo,
+        crdb_path=crdb_path,
+        LazyRows=lazy_rows,
+        ProcessedCommandBlocks=deque(maxlen=None if keep_command_history else get_command_block_lookback()),
+    )
+    if memory_budget is not None:
+        machine_state.Records = SpillingRecordStore(memory_budget)
+    if build_time_index:
+        machine_state.TimeIndex = TimeIndex(machine_state.Records, tzinfo or datetime.UTC)
 
-            # we've never seen this point id before, so just add it to end of lists
-            machine_state.Records[row.PointID] = row
+    try:
+        if pipelined:
+            _convert_pipelined(rw5_path, machine_state, sinks, record_filter, ignore_missing_shots)
+        else:
+            with open_rw5(rw5_path) as input_file:
+                for line_number, command_block in iter_numbered_command_blocks(input_file):
+                    events = _process_command_block(line_number, command_block, machine_state, record_filter, ignore_missing_shots, bool(sinks))
+                    _dispatch(events, sinks)
+    finally:
+        for sink in sinks:
+            sink.close()
 
     if output_path:
         with output_path.open("w") as csv_file:
@@ -94,6 +310,6 @@ def convert(rw5_path: Path, output_path: Path | None, tzinfo: datetime._TzInfo |
                 lineterminator="\n",
             )
             writer.writeheader()
-            writer.writerows([asdict(r) for r in machine_state.Records.values()])
+            writer.writerows(map(row_dict, machine_state.Records.values()))
 
     return machine_state
@@ -0,0 +1,63 @@
+"""Structured record of why command blocks were skipped during conversion.
+
+Parsers add one small entry per skipped block rather than logging a traceback,
+so noisy files cost a list append per bad record.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class MissingFieldError(ValueError):
+    """A field a record can't be parsed without isn't in its command block."""
+
+    def __init__(self, field_name: str) -> None:
+        super().__init__(f"{field_name} line not found.")
+        self.Field = field_name
+
+
+@dataclass
+class Diagnostic:
+    """One skipped command block."""
+
+    RecordType: str
+    LineNumber: int | None
+    """1-based line of the block's first line in the RW5 file, None when unknown."""
+    Reason: str
+    Field: str | None = None
+    """Missing field, when that is why the block was skipped."""
+    PointID: str | None = None
+
+
+@dataclass
+class Diagnostics:
+    """Collects a `Diagnostic` for every command block skipped while converting a file."""
+
+    Entries: list[Diagnostic] = field(default_factory=list)
+
+    def add(
+        self,
+        record_type: str,
+        line_number: int | None,
+        reason: str,
+        field_name: str | None = None,
+        point_id: str | None = None,
+    ) -> None:
+        """Record a skipped block."""
+        self.Entries.append(Diagnostic(record_type, line_number, reason, field_name, point_id))
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.Entries)
+
+    def __iter__(self) -> Iterator[Diagnostic]:  # noqa: D105
+        return iter(self.Entries)
+
+    def counts(self) -> Counter[tuple[str, str]]:
+        """Return the number of skipped blocks by record type and reason."""  # noqa: DOC201
+        return Counter((entry.RecordType, entry.Reason) for entry in self.Entries)
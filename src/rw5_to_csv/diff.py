@@ -0,0 +1,157 @@
+"""Compare two versions of a job and report only the rows that changed.
+
+Rows are compared by their CSV text, so a diff sees exactly what a reload of
+the CSV output would see. The old version can be an RW5 file or a checkpoint
+saved from a previous conversion.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Literal
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.records.record import RW5Row
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from rw5_to_csv.machine_state import MachineState
+
+CHECKPOINT_VERSION = 1
+
+ChangeType = Literal["added", "removed", "modified"]
+
+
+@dataclass
+class RowSnapshot:
+    """CSV text of a row's fields, and a fingerprint of that text."""
+
+    Fingerprint: str
+    Values: dict[str, str]
+
+
+@dataclass
+class RowChange:
+    """A row present in both versions whose content differs."""
+
+    PointID: str
+    ChangedFields: dict[str, tuple[str, str]]
+    """Old and new CSV text of each field that changed."""
+    Values: dict[str, str]
+    """CSV text of the new row."""
+
+
+@dataclass
+class RW5Diff:
+    """Rows added, removed and modified between two versions of a job."""
+
+    Added: dict[str, dict[str, str]] = field(default_factory=dict)
+    """CSV text of each added row, by point id."""
+    Removed: dict[str, dict[str, str]] = field(default_factory=dict)
+    """CSV text of each removed row as it was, by point id."""
+    Modified: dict[str, RowChange] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:  # noqa: D105
+        return bool(self.Added or self.Removed or self.Modified)
+
+
+def _csv_text(value: object) -> str:
+    # same text csv.DictWriter writes
+    return "" if value is None else str(value)
+
+
+def snapshot_row(row: RW5Row) -> RowSnapshot:
+    """Fingerprint a row's CSV text."""  # noqa: DOC201
+    values = {name: _csv_text(value) for name, value in asdict(row).items()}
+    digest = hashlib.blake2b("\x1f".join(values.values()).encode(), digest_size=16)
+    return RowSnapshot(Fingerprint=digest.hexdigest(), Values=values)
+
+
+def snapshot_records(rows: Iterable[RW5Row]) -> dict[str, RowSnapshot]:
+    """Fingerprint every row, keyed by point id."""  # noqa: DOC201
+    return {row.PointID: snapshot_row(row) for row in rows}
+
+
+def save_checkpoint(machine: MachineState, checkpoint_path: Path) -> None:
+    """Save the fingerprints and CSV text of every row of a converted job."""
+    snapshot = snapshot_records(machine.Records.values())
+    checkpoint_path.write_text(json.dumps({
+        "version": CHECKPOINT_VERSION,
+        "rows": {point_id: asdict(row) for point_id, row in snapshot.items()},
+    }))
+
+
+def load_checkpoint(checkpoint_path: Path) -> dict[str, RowSnapshot]:
+    """Load row snapshots saved by `save_checkpoint`."""  # noqa: DOC201, DOC501
+    data = json.loads(checkpoint_path.read_text())
+    if data.get("version") != CHECKPOINT_VERSION:
+        msg = f"Unsupported checkpoint version {data.get('version')}."
+        raise ValueError(msg)
+    return {point_id: RowSnapshot(**row) for point_id, row in data["rows"].items()}
+
+
+def diff_snapshots(old: dict[str, RowSnapshot], new: dict[str, RowSnapshot]) -> RW5Diff:
+    """Compare two snapshots in linear time."""  # noqa: DOC201
+    diff = RW5Diff()
+    for point_id, new_row in new.items():
+        old_row = old.get(point_id)
+        if old_row is None:
+            diff.Added[point_id] = new_row.Values
+        elif old_row.Fingerprint != new_row.Fingerprint:
+            diff.Modified[point_id] = RowChange(
+                PointID=point_id,
+                ChangedFields={
+                    name: (old_row.Values.get(name, ""), value)
+                    for name, value in new_row.Values.items()
+                    if old_row.Values.get(name, "") != value
+                },
+                Values=new_row.Values,
+            )
+    for point_id, old_row in old.items():
+        if point_id not in new:
+            diff.Removed[point_id] = old_row.Values
+    return diff
+
+
+def diff_rw5(
+    old_path: Path,
+    new_path: Path,
+    crdb_path: Path | None = None,
+    old_crdb_path: Path | None = None,
+) -> RW5Diff:
+    """Diff a new RW5 file against an old RW5 file or a `.json` checkpoint.
+
+    `old_crdb_path` defaults to `crdb_path`.
+    """  # noqa: DOC201
+    if old_path.suffix.lower() == ".json":
+        old = load_checkpoint(old_path)
+    else:
+        old = snapshot_records(convert(old_path, None, crdb_path=old_crdb_path or crdb_path).Records.values())
+    new = snapshot_records(convert(new_path, None, crdb_path=crdb_path).Records.values())
+    return diff_snapshots(old, new)
+
+
+def write_diff_csv(diff: RW5Diff, output_path: Path) -> None:
+    """Write the changed rows as CSV with a leading `Change` column.
+
+    Removed rows carry their old values.
+    """
+    changes: list[tuple[ChangeType, dict[str, str]]] = [
+        *(("added", values) for values in diff.Added.values()),
+        *(("modified", change.Values) for change in diff.Modified.values()),
+        *(("removed", values) for values in diff.Removed.values()),
+    ]
+    with output_path.open("w") as csv_file:
+        writer = csv.DictWriter(
+            csv_file,
+            fieldnames=["Change", *RW5Row.__annotations__.keys()],
+            delimiter=",",
+            lineterminator="\n",
+        )
+        writer.writeheader()
+        writer.writerows({"Change": change, **values} for change, values in changes)
@@ -0,0 +1,186 @@
+"""Vectorized projection of GPS latitude/longitude onto grid coordinates.
+
+Used to cross-check the `LA`/`LN` of each GPS record against the grid `N`/`E`
+on its `--GS` line. Grid systems are looked up by the `--User Defined:` (SurvCE) or
+`--Projection:` (SurvPC) line of the MO record.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from rw5_to_csv.utils.fixed_point import to_float_array
+
+if TYPE_CHECKING:
+    from rw5_to_csv.machine_state import MachineState
+    from rw5_to_csv.prelude import RW5Prelude
+
+
+@dataclass(frozen=True)
+class Ellipsoid:
+    """Reference ellipsoid."""
+
+    A: float
+    """Semi-major axis in metres."""
+    InverseFlattening: float
+
+    @property
+    def e2(self) -> float:
+        """First eccentricity squared."""  # noqa: DOC201
+        f = 1 / self.InverseFlattening
+        return f * (2 - f)
+
+
+GRS80 = Ellipsoid(A=6378137.0, InverseFlattening=298.257222101)
+
+
+@dataclass(frozen=True)
+class ObliqueStereographic:
+    """Oblique (double) stereographic projection, EPSG method 9809."""
+
+    Name: str
+    LatitudeOfOrigin: float
+    """Decimal degrees."""
+    CentralMeridian: float
+    """Decimal degrees."""
+    ScaleFactor: float
+    FalseEasting: float
+    FalseNorthing: float
+    Ellipsoid: Ellipsoid = GRS80
+    _constants: tuple[float, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:  # noqa: D105
+        e2 = self.Ellipsoid.e2
+        e = math.sqrt(e2)
+        lat0 = math.radians(self.LatitudeOfOrigin)
+        sin_lat0 = math.sin(lat0)
+        rho0 = self.Ellipsoid.A * (1 - e2) / (1 - e2 * sin_lat0**2) ** 1.5
+        nu0 = self.Ellipsoid.A / math.sqrt(1 - e2 * sin_lat0**2)
+        radius = math.sqrt(rho0 * nu0)
+        n = math.sqrt(1 + e2 * math.cos(lat0) ** 4 / (1 - e2))
+        s1 = (1 + sin_lat0) / (1 - sin_lat0)
+        s2 = (1 - e * sin_lat0) / (1 + e * sin_lat0)
+        w1 = (s1 * s2**e) ** n
+        sin_chi0 = (w1 - 1) / (w1 + 1)
+        c = (n + sin_lat0) * (1 - sin_chi0) / ((n - sin_lat0) * (1 + sin_chi0))
+        w2 = c * w1
+        chi0 = math.asin((w2 - 1) / (w2 + 1))
+        object.__setattr__(self, "_constants", (e, radius, n, c, chi0))
+
+    def project(self, lat: np.ndarray, lng: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Project decimal degree latitudes and longitudes to (northing, easting) arrays."""  # noqa: DOC201
+        e, radius, n, c, chi0 = self._constants
+        lat = np.radians(lat)
+        lng0 = math.radians(self.CentralMeridian)
+        d_lng = n * (np.radians(lng) - lng0)
+
+        sin_lat = np.sin(lat)
+        w = c * (((1 + sin_lat) / (1 - sin_lat)) * ((1 - e * sin_lat) / (1 + e * sin_lat)) ** e) ** n
+        chi = np.arcsin((w - 1) / (w + 1))
+
+        b = 1 + np.sin(chi) * math.sin(chi0) + np.cos(chi) * math.cos(chi0) * np.cos(d_lng)
+        two_rk = 2 * radius * self.ScaleFactor
+        easting = self.FalseEasting + two_rk * np.cos(chi) * np.sin(d_lng) / b
+        northing = self.FalseNorthing + two_rk * (
+            np.sin(chi) * math.cos(chi0) - np.cos(chi) * math.sin(chi0) * np.cos(d_lng)
+        ) / b
+        return northing, easting
+
+
+GRID_SYSTEMS: dict[str, ObliqueStereographic] = {
+    "CANADA/NAD83/New Brunswick": ObliqueStereographic(
+        Name="NAD83(CSRS) / New Brunswick Stereographic",
+        LatitudeOfOrigin=46.5,
+        CentralMeridian=-66.5,
+        ScaleFactor=0.999912,
+        FalseEasting=2500000.0,
+        FalseNorthing=7500000.0,
+    ),
+    "CANADA/NAD83/Prince Edward Island": ObliqueStereographic(
+        Name="NAD83(CSRS) / Prince Edward Isl. Stereographic",
+        LatitudeOfOrigin=47.25,
+        CentralMeridian=-63.0,
+        ScaleFactor=0.999912,
+        FalseEasting=400000.0,
+        FalseNorthing=800000.0,
+    ),
+}
+"""Grid systems by the value of the MO record's `--User Defined:` or `--Projection:` line."""
+
+
+def get_grid_system(rw5_prelude: RW5Prelude) -> ObliqueStereographic:
+    """Look up the grid system a job's GS coordinates are in."""  # noqa: DOC201, DOC501
+    name = rw5_prelude.UserDefined or rw5_prelude.Projection
+    if name not in GRID_SYSTEMS:
+        msg = f"Unsupported grid system {name!r}."
+        raise ValueError(msg)
+    return GRID_SYSTEMS[name]
+
+
+def packed_dms_to_dd(values: np.ndarray) -> np.ndarray:
+    """Vectorized `dms_to_dd` for RW5 `LA`/`LN` values, which are packed as DDD.MMSSsss."""  # noqa: DOC201
+    sign = np.sign(values)
+    values = np.abs(values)
+    degrees = np.floor(values)
+    minutes_seconds = (values - degrees) * 100
+    # nudge so values like 45.30 don't floor to 29 minutes
+    minutes = np.floor(minutes_seconds + 1e-9)
+    seconds = (minutes_seconds - minutes) * 100
+    return sign * (degrees + minutes / 60 + seconds / 3600)
+
+
+@dataclass
+class GridCheck:
+    """Projected grid coordinates of GPS rows compared with the grid coordinates the RW5 recorded."""
+
+    PointIDs: list[str]
+    ProjectedNorthing: np.ndarray
+    ProjectedEasting: np.ndarray
+    DeltaNorthing: np.ndarray
+    """Recorded minus projected northing."""
+    DeltaEasting: np.ndarray
+    """Recorded minus projected easting."""
+    HorizontalError: np.ndarray
+    Flagged: np.ndarray
+    """True where the horizontal error is beyond tolerance."""
+
+    def flagged_point_ids(self) -> list[str]:
+        """Return the point ids of rows beyond tolerance."""  # noqa: DOC201
+        return [self.PointIDs[i] for i in np.flatnonzero(self.Flagged)]
+
+
+def check_gps_grid_coordinates(
+    machine: MachineState,
+    grid_system: ObliqueStereographic,
+    tolerance: float = 0.05,
+) -> GridCheck:
+    """Project every GPS row at once and flag rows whose `--GS` coordinates disagree by more than `tolerance` metres."""  # noqa: DOC201, E501
+    rows = [
+        row for row in machine.Records.values()
+        if row.RW5RecordType == "GPS"
+        and row.Lat is not None and row.Lng is not None
+        and row.LocalX is not None and row.LocalY is not None
+    ]
+    lat = packed_dms_to_dd(np.fromiter((row.Lat for row in rows), dtype=float, count=len(rows)))
+    lng = packed_dms_to_dd(np.fromiter((row.Lng for row in rows), dtype=float, count=len(rows)))
+    recorded_n = to_float_array([row.LocalY for row in rows])
+    recorded_e = to_float_array([row.LocalX for row in rows])
+
+    projected_n, projected_e = grid_system.project(lat, lng)
+    delta_n = recorded_n - projected_n
+    delta_e = recorded_e - projected_e
+    horizontal_error = np.hypot(delta_n, delta_e)
+
+    return GridCheck(
+        PointIDs=[row.PointID for row in rows],
+        ProjectedNorthing=projected_n,
+        ProjectedEasting=projected_e,
+        DeltaNorthing=delta_n,
+        DeltaEasting=delta_e,
+        HorizontalError=horizontal_error,
+        Flagged=horizontal_error > tolerance,
+    )
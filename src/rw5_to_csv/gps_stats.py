@@ -0,0 +1,140 @@
+"""GPS quality statistics over converted jobs, grouped by base station, instrument, status and date."""
+
+from __future__ import annotations
+
+import csv
+import warnings
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from pathlib import Path
+
+    from rw5_to_csv.machine_state import MachineState
+
+GroupField = Literal["BasePointID", "InstrumentType", "Status", "Date"]
+
+QUALITY_METRICS = ("HRMS", "VRMS", "PDOP", "NumSatellites", "Age")
+"""`RW5Row` fields summarized. `NumSatellites` and `Age` are stored as strings and converted to numbers."""
+
+DEFAULT_GROUP_BY: tuple[GroupField, ...] = ("BasePointID", "InstrumentType", "Status", "Date")
+DEFAULT_PERCENTILES = (50.0, 95.0, 100.0)
+DEFAULT_THRESHOLDS: dict[str, float] = {
+    "HRMS": 0.02,
+    "VRMS": 0.03,
+    "PDOP": 3.0,
+    "Age": 5.0,
+}
+"""Values above which a shot counts towards the exceedance rate of that metric."""
+
+
+@dataclass
+class GPSQualitySummary:
+    """Statistics for one group of GPS shots."""
+
+    Group: dict[GroupField, str | None]
+    Count: int
+    Percentiles: dict[str, dict[float, float]]
+    """Percentile values by metric, NaN where no shot in the group has the metric."""
+    ExceedanceRates: dict[str, float]
+    """Fraction of shots with the metric above its threshold, out of shots that have the metric."""
+
+    def as_row(self) -> dict[str, str | int | float | None]:
+        """Flatten into a single table row, e.g. `HRMS_p95` and `HRMS_over`."""  # noqa: DOC201
+        row: dict[str, str | int | float | None] = {**self.Group, "Count": self.Count}
+        for metric, percentiles in self.Percentiles.items():
+            for q, value in percentiles.items():
+                row[f"{metric}_p{q:g}"] = value
+        for metric, rate in self.ExceedanceRates.items():
+            row[f"{metric}_over"] = rate
+        return row
+
+
+def _to_number(value: str | float | None) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def summarize_gps_quality(
+    machines: Iterable[MachineState],
+    group_by: Sequence[GroupField] = DEFAULT_GROUP_BY,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    thresholds: dict[str, float] | None = None,
+) -> list[GPSQualitySummary]:
+    """Summarize the quality of every GPS shot of one or many converted jobs.
+
+    Returns one summary per group, sorted by group.
+    """  # noqa: DOC201
+    thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+
+    group_ids: list[int] = []
+    groups: dict[tuple[str | None, ...], int] = {}
+    values: list[list[float]] = []
+    for machine in machines:
+        for row in machine.Records.values():
+            if row.RW5RecordType != "GPS":
+                continue
+            fields: dict[GroupField, str | None] = {
+                "BasePointID": machine.GPSIDBasePointID.get(row.PointID),
+                "InstrumentType": row.InstrumentType,
+                "Status": row.Status,
+                "Date": row.DateTime.date().isoformat() if row.DateTime else None,
+            }
+            key = tuple(fields[name] for name in group_by)
+            group_ids.append(groups.setdefault(key, len(groups)))
+            values.append([_to_number(getattr(row, metric)) for metric in QUALITY_METRICS])
+
+    if not values:
+        return []
+
+    metrics = np.array(values, dtype=float)
+    ids = np.array(group_ids)
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    splits = np.flatnonzero(np.diff(sorted_ids)) + 1
+    threshold_row = np.array([thresholds.get(metric, np.inf) for metric in QUALITY_METRICS])
+
+    keys_by_id = {group_id: key for key, group_id in groups.items()}
+    summaries = []
+    for block_ids, block_order in zip(np.split(sorted_ids, splits), np.split(order, splits)):
+        block = metrics[block_order]
+        counts = (~np.isnan(block)).sum(axis=0)
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            # metrics no shot in the group has come out as NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            block_percentiles = np.nanpercentile(block, percentiles, axis=0)
+            exceedance = (block > threshold_row).sum(axis=0) / counts
+
+        key = keys_by_id[int(block_ids[0])]
+        summaries.append(GPSQualitySummary(
+            Group=dict(zip(group_by, key)),
+            Count=len(block),
+            Percentiles={
+                metric: {q: float(block_percentiles[i, j]) for i, q in enumerate(percentiles)}
+                for j, metric in enumerate(QUALITY_METRICS)
+            },
+            ExceedanceRates={
+                metric: float(exceedance[j])
+                for j, metric in enumerate(QUALITY_METRICS)
+                if metric in thresholds
+            },
+        ))
+
+    return sorted(summaries, key=lambda s: tuple("" if v is None else v for v in s.Group.values()))
+
+
+def write_gps_quality_csv(summaries: list[GPSQualitySummary], output_path: Path) -> None:
+    """Write summaries as a compact CSV table, one row per group."""
+    rows = [summary.as_row() for summary in summaries]
+    fieldnames = list(rows[0].keys()) if rows else []
+    with output_path.open("w") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames, delimiter=",", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
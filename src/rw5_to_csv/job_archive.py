@@ -0,0 +1,135 @@
+"""Convert zipped job archives, one `.zip` per job holding its `.rw5`, `.crdb` and other files.
+
+The RW5 member is streamed out of the archive without extracting it. SQLite
+can only open a CRDB from a file, so that member is copied once to a temporary
+file, which is deleted when the converted machine state is.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import weakref
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.utils.atomic_write import write_atomically
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from rw5_to_csv.machine_state import MachineState
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class JobArchive:
+    """Names of the RW5 and CRDB members of a job archive."""
+
+    ZipPath: Path
+    RW5Member: str
+    CRDBMember: str | None
+
+
+def _members_with_suffix(archive: zipfile.ZipFile, suffix: str) -> list[str]:
+    return [
+        info.filename for info in archive.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and info.filename.lower().endswith(suffix)
+    ]
+
+
+def find_job_members(zip_path: Path) -> JobArchive:
+    """Find the RW5 member of a job archive, and the CRDB that goes with it if there is one.
+
+    A CRDB named like the RW5 is preferred, otherwise an archive's only CRDB is used.
+    Raises ValueError if the archive doesn't hold exactly one RW5 file.
+    """  # noqa: DOC201, DOC501
+    with zipfile.ZipFile(zip_path) as archive:
+        rw5_members = _members_with_suffix(archive, ".rw5")
+        crdb_members = _members_with_suffix(archive, ".crdb")
+    if len(rw5_members) != 1:
+        msg = f"Expected one RW5 file in {zip_path}, found {len(rw5_members)}."
+        raise ValueError(msg)
+
+    rw5_stem = PurePosixPath(rw5_members[0]).stem.lower()
+    crdb_member = next((m for m in crdb_members if PurePosixPath(m).stem.lower() == rw5_stem), None)
+    if crdb_member is None and len(crdb_members) == 1:
+        crdb_member = crdb_members[0]
+    return JobArchive(ZipPath=zip_path, RW5Member=rw5_members[0], CRDBMember=crdb_member)
+
+
+def _copy_member_to_temp_file(archive: zipfile.ZipFile, member: str, suffix: str) -> Path:
+    fd, tmp_name = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as tmp_file, archive.open(member) as member_file:
+        shutil.copyfileobj(member_file, tmp_file, 1 << 20)
+    return Path(tmp_name)
+
+
+def convert_job_archive(zip_path: Path, output_path: Path | None, **convert_kwargs: Any) -> MachineState:  # noqa: ANN401
+    """Convert the job in a zip archive, like `convert()` on its extracted RW5 and CRDB files.
+
+    Keyword arguments are passed on to `convert()`. The returned machine state's
+    `crdb_path` is a temporary copy of the CRDB member, deleted along with it.
+    """  # noqa: DOC201
+    job = find_job_members(zip_path)
+    with zipfile.ZipFile(zip_path) as archive:
+        crdb_path = _copy_member_to_temp_file(archive, job.CRDBMember, ".crdb") if job.CRDBMember else None
+        try:
+            machine_state = convert(
+                zipfile.Path(archive, job.RW5Member),
+                output_path,
+                crdb_path=crdb_path,
+                **convert_kwargs,
+            )
+        except BaseException:
+            if crdb_path is not None:
+                crdb_path.unlink(missing_ok=True)
+            raise
+    if crdb_path is not None:
+        weakref.finalize(machine_state, crdb_path.unlink, missing_ok=True)
+    return machine_state
+
+
+def _convert_archive_to(zip_path: Path, output_path: Path, convert_kwargs: dict[str, Any]) -> Path:
+    write_atomically(output_path, lambda tmp_path: convert_job_archive(zip_path, tmp_path, **convert_kwargs))
+    return output_path
+
+
+def convert_job_archives(
+    zip_paths: Iterable[Path],
+    output_dir: Path,
+    max_workers: int | None = None,
+    **convert_kwargs: Any,  # noqa: ANN401
+) -> dict[Path, Path]:
+    """Convert many job archives concurrently, each to a CSV named after the archive in `output_dir`.
+
+    Archives that fail to convert are logged and left out.
+    Returns the CSV written for each archive that converted.
+    """  # noqa: DOC201
+    output_dir.mkdir(parents=True, exist_ok=True)
+    converted = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            zip_path: executor.submit(
+                _convert_archive_to,
+                zip_path,
+                output_dir / zip_path.with_suffix(".csv").name,
+                convert_kwargs,
+            )
+            for zip_path in zip_paths
+        }
+        for zip_path, future in futures.items():
+            try:
+                converted[zip_path] = future.result()
+            except Exception:
+                logger.exception("Failed to convert %s.", zip_path)
+    return converted
@@ -1,15 +1,28 @@
 from __future__ import annotations
 
 import dataclasses
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING, Literal
 
+from rw5_to_csv.diagnostics import Diagnostics
+from rw5_to_csv.point_ids import PointIDTable, SymbolMap
+
 if TYPE_CHECKING:
     import datetime
+    from collections.abc import MutableMapping
 
     from rw5_to_csv.records.record import RW5Row
+    from rw5_to_csv.time_index import TimeIndex
+
+
+GPSLayout = Literal["single-line", "multi-line"]
+"""How a file's GPS records hold their statistics.
+
+SurvCE writes one `--HRMS:0.011, VRMS:0.024, STATUS:FIXED, ...` line, SurvPC one
+`--HRMS Avg: ... SD: ...` line per statistic.
+"""
 
 
 @dataclass
@@ -21,24 +34,81 @@ class BacksightRow:
     OccupiedPointID: str
     BacksightAngleDD: float
     BacksightDistance: float
+    BacksightCircleDD: float = 0.0
+    """Horizontal circle reading on the backsight, `BC`."""
+
+
+@dataclass
+class AngleObservation:
+    """Angles and slope distance measured by a BD (backsight check) or SS record."""
+
+    RecordType: Literal["BD", "SS"]
+    OccupiedPointID: str
+    ForesightPointID: str
+    AngleRightDD: float
+    """`AR`, clockwise from the backsight."""
+    ZenithDD: float
+    """`ZE`"""
+    SlopeDistance: float
+    """`SD`"""
+    InstrumentHeight: float | None
+    RodHeight: float | None
+    Backsight: BacksightRow | None
+    """Backsight in effect when the observation was made."""
 
 
 @dataclass
 class MachineState:
     """State of the machine at the point in time of a record."""
 
-    SideshotIDOccupiedPointID: dict[str, str] = dataclasses.field(default_factory=dict)
+    PointIDs: PointIDTable = dataclasses.field(default_factory=PointIDTable)
+    """Symbols of every point id seen, shared by the point id maps below."""
+    SideshotIDOccupiedPointID: SymbolMap = dataclasses.field(init=False)
+    """Occupied point each sideshot was taken from."""
+    GPSIDBasePointID: SymbolMap = dataclasses.field(init=False)
+    """Base station (BP record) in effect for each GPS shot."""
+    RejectedPointIDs: set[str] = dataclasses.field(default_factory=set)
+    """Point ids of rows dropped by a record filter, so later shots of them are still marked as overwrites."""
     Backsights: list[BacksightRow] = dataclasses.field(default_factory=list)
     """List of backsights. Current backsight is the last in the list."""
-    Records: OrderedDict[str, RW5Row] = dataclasses.field(default_factory=OrderedDict)
-    """Finalized CSV rows, indexed by point id."""
-    ProcessedCommandBlocks: list[list[str]] = dataclasses.field(default_factory=list)
+    Observations: list[AngleObservation] = dataclasses.field(default_factory=list)
+    """BD and SS measurements, in file order."""
+    Records: MutableMapping[str, RW5Row] = dataclasses.field(default_factory=OrderedDict)
+    """Finalized CSV rows, indexed by point id, in the order each point id was first seen.
+
+    A `SpillingRecordStore` when conversion was given a memory budget.
+    """
+    OccupiedPoints: dict[str, RW5Row] = dataclasses.field(default_factory=dict)
+    """OC rows by point id, kept even when filtered out of `Records`."""
+    ProcessedCommandBlocks: deque[list[str]] = dataclasses.field(default_factory=lambda: deque(maxlen=1))
+    """Most recently processed command blocks, newest last.
+
+    Bounded to the lookback parsers declare in `RECORD_LOOKBACK`, unless full history was requested.
+    """
     HR: float | None = None
     """Machine measured rod height from LS command."""
     HI: float | None = None
     """Machine instrument height."""
     InstrumentType: Literal["GPS", "TotalStation", ""] = ""
     OccupiedPointID: str | None = None
+    BasePointID: str | None = None
+    """Point id of the most recent BP record."""
     PrismApplied: str | None = None
+    DataCollector: str | None = None
+    """Software that wrote the file, e.g. "SurvCE", from the MO record's version line."""
+    GPSLayout: GPSLayout | None = None
+    """Layout of GPS statistics expected in this file, set by its first GPS record."""
     tzinfo: datetime._TzInfo | None = None
     crdb_path: Path | None = None
+    LazyRows: bool = False
+    """Create GPS rows that parse their fields on first access."""
+    TimeIndex: TimeIndex | None = None
+    """`Records` indexed by shot time, when conversion was asked to build it."""
+    Diagnostics: Diagnostics = dataclasses.field(default_factory=Diagnostics)
+    """Why each skipped command block was skipped."""
+    LineNumber: int | None = None
+    """Line of the RW5 file the command block being parsed starts on, if known."""
+
+    def __post_init__(self) -> None:  # noqa: D105
+        self.SideshotIDOccupiedPointID = SymbolMap(self.PointIDs)
+        self.GPSIDBasePointID = SymbolMap(self.PointIDs)
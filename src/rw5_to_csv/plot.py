@@ -1,35 +1,52 @@
 """Functions regarding the plotting of totalstation data on matplotlib."""
 
+from __future__ import annotations
+
 import io
-import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
 
+import matplotlib as mpl
 import matplotlib.pyplot as plt  # v 3.3.2
+import numpy as np
+from matplotlib.collections import LineCollection
 
-from rw5_to_csv.machine_state import MachineState
-from rw5_to_csv.records.record import RW5Row
-from rw5_to_csv.utils.crdb import get_crdb_point
+from rw5_to_csv.plot_cache import plot_key
+from rw5_to_csv.plot_data import (
+    ExtentType,
+    ImageFormat,
+    PlotLOD,
+    Point2DType,
+    StationPlotData,
+    get_extent,
+    get_points_extent,
+    get_station_plot_data,
+    scale_points,
+    station_plot_file_names,
+    thin_points,
+)
 
-Point2DType = tuple[float, float]
-ExtentType = tuple[float, float, float, float]
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
 
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
 
-def get_extent(rows: list[RW5Row]) -> ExtentType:
-    minx = math.inf
-    miny = math.inf
-    maxx = -math.inf
-    maxy = -math.inf
+    from rw5_to_csv.machine_state import MachineState
+    from rw5_to_csv.plot_cache import PlotCache
+    from rw5_to_csv.total_station import TSStation
 
-    for row in rows:
-        if row.LocalX and row.LocalX < minx:
-            minx = float(row.LocalX)
-        if row.LocalX and row.LocalX > maxx:
-            maxx = float(row.LocalX)
-        if row.LocalY and row.LocalY < miny:
-            miny = float(row.LocalY)
-        if row.LocalY and row.LocalY > maxy:
-            maxy = float(row.LocalY)
+PLOT_STYLE_VERSION = 2
+"""Bump when drawing code changes, so cached plots are redrawn."""
 
-    return (minx, miny, maxx, maxy)
+FIGURE_EXTENT: ExtentType = (0, 0, 10, 10)
+"""Plots are drawn into this extent, on a figure of the same size in inches."""
+FIGURE_DPI = 128
+LAYER_PADDING = round(0.1 * FIGURE_DPI)
+"""Pixels kept around the content of a composited plot, as `bbox_inches="tight"` does."""
 
 
 def scale_to_new_dimensions(p: Point2DType, old_extent: ExtentType, new_extent: ExtentType) -> Point2DType:
@@ -51,73 +68,342 @@ def scale_to_new_dimensions(p: Point2DType, old_extent: ExtentType, new_extent:
     return (scaled_x, scaled_y)
 
 
-def plot_total_station_data(machine: MachineState) -> io.BytesIO:
-    """Plot ts data with matplotlib.
+@dataclass
+class PlotTiles:
+    """Overview image of a whole job plus one image per station."""
+
+    Overview: io.BytesIO
+    Stations: dict[str, io.BytesIO]
+    """PNG data by occupied point id."""
 
-    Returns BytesIO object containing png data.
-    """  # noqa: DOC201, DOC501
-    if not machine.crdb_path:
-        msg = "CRDB file is required."
-        raise ValueError(msg)
-    # setup figure
-    extent = get_extent(list(machine.Records.values()))
-    new_extent = (0, 0, 10, 10)
-    fig, ax = plt.subplots(figsize=new_extent[2:], dpi=128)
-    plt.axis("off")
-    # create a plot for each OC record,
-    # assumeing that OC records are a good tell for when a nmew system has
-    #   been started.
-    oc_records = [r for r in machine.Records.values() if r.RW5RecordType == "OC"]
-
-    for oc_record in oc_records:
-        assert oc_record.LocalX is not None
-        assert oc_record.LocalY is not None
-        # find all backsights
-        backsights = [b for b in machine.Backsights if b.OccupiedPointID == oc_record.PointID]
-        backsight_points = [get_crdb_point(b.BacksightPointID, machine.crdb_path) for b in backsights]
-        # find all side shots
-        sideshot_ids = [ss for ss, oc in machine.SideshotIDOccupiedPointID.items() if oc == oc_record.PointID]
-        sideshots = [machine.Records[id] for id in sideshot_ids if id in machine.Records]
 
+def _draw_stations_full(ax: Axes, stations: list[StationPlotData], extent: ExtentType, new_extent: ExtentType) -> None:
+    for station in stations:
         #  add backsights
-        print(f"{backsight_points=}")
-        for b in backsight_points:
-            if not b.LocalX or not b.LocalY:
-                continue
-            from_scaled = scale_to_new_dimensions((float(oc_record.LocalX), float(oc_record.LocalY)), extent, new_extent)
-            to_scaled = scale_to_new_dimensions((float(b.LocalX), float(b.LocalY)), extent, new_extent)
+        for point_id, b in zip(station.BacksightPointIDs, station.BacksightPoints):
+            from_scaled = scale_to_new_dimensions(station.OccupiedPoint, extent, new_extent)
+            to_scaled = scale_to_new_dimensions(b, extent, new_extent)
             ax.plot([from_scaled[0], to_scaled[0]], [from_scaled[1], to_scaled[1]], "r", linewidth=4, alpha=0.3)
             # plot bs point
-            p = (float(b.LocalX), float(b.LocalY))
-            scaled_p = scale_to_new_dimensions(p, extent, new_extent)
+            scaled_p = scale_to_new_dimensions(b, extent, new_extent)
             ax.plot(scaled_p[0], scaled_p[1], "r^", alpha=0.7, markersize=22)
             # annotate marker with point id
-            ax.text(scaled_p[0] + 0.25, scaled_p[1] - 0.2, b.PointID, ha="left", va="center", color="r", fontsize="xx-large")
+            ax.text(scaled_p[0] + 0.25, scaled_p[1] - 0.2, point_id, ha="left", va="center", color="r", fontsize="xx-large")
 
         # add sideshot lines
-        for ss in sideshots:
-            if not ss.LocalX or not ss.LocalY:
-                continue
-            from_scaled = scale_to_new_dimensions((float(oc_record.LocalX), float(oc_record.LocalY)), extent, new_extent)
-            to_scaled = scale_to_new_dimensions((float(ss.LocalX), float(ss.LocalY)), extent, new_extent)
+        for ss in station.SideshotPoints:
+            from_scaled = scale_to_new_dimensions(station.OccupiedPoint, extent, new_extent)
+            to_scaled = scale_to_new_dimensions(ss, extent, new_extent)
             ax.plot([from_scaled[0], to_scaled[0]], [from_scaled[1], to_scaled[1]], "b", linewidth=4, alpha=0.1)
 
         # plot oc
-        p = (float(oc_record.LocalX), float(oc_record.LocalY))
-        scaled_p = scale_to_new_dimensions(p, extent, new_extent)
+        scaled_p = scale_to_new_dimensions(station.OccupiedPoint, extent, new_extent)
         ax.plot(scaled_p[0], scaled_p[1], "g^", alpha=0.7, markersize=22)
         # add label for OC
-        ax.annotate(oc_record.PointID, (scaled_p[0] + 0.25, scaled_p[1]), ha="left", va="center", fontsize="xx-large", color="g")
+        ax.annotate(station.OccupiedPointID, (scaled_p[0] + 0.25, scaled_p[1]), ha="left", va="center", fontsize="xx-large", color="g")
 
         # add sideshot points (on top of everything because they're smaller)
-        for ss in sideshots:
-            if not ss.LocalX or not ss.LocalY:
-                continue
-            p = (float(ss.LocalX), float(ss.LocalY))
-            scaled_p = scale_to_new_dimensions(p, extent, new_extent)
+        for ss in station.SideshotPoints:
+            scaled_p = scale_to_new_dimensions(ss, extent, new_extent)
             ax.plot(scaled_p[0], scaled_p[1], "bo", markersize=10)
 
+
+def _draw_stations_lod(  # noqa: PLR0914
+    ax: Axes,
+    stations: list[StationPlotData],
+    extent: ExtentType,
+    new_extent: ExtentType,
+    lod: PlotLOD,
+    dense: bool | None = None,
+    dense_labels: bool = True,
+) -> None:
+    if dense is None:
+        dense = _is_dense(stations, lod)
+    marker_size = 8 if dense else 22
+    sideshot_size = 3 if dense else 10
+    line_width = 1 if dense else 4
+
+    oc_points = scale_points(np.array([s.OccupiedPoint for s in stations], dtype=float).reshape(-1, 2), extent, new_extent)
+    bs_ids: list[str] = []
+    bs_points, bs_segments, ss_points, ss_segments = [], [], [], []
+    for oc, station in zip(oc_points, stations):
+        if station.BacksightPoints:
+            bs = scale_points(np.array(station.BacksightPoints, dtype=float), extent, new_extent)
+            bs_ids.extend(station.BacksightPointIDs)
+            bs_points.append(bs)
+            bs_segments.append(np.stack([np.broadcast_to(oc, bs.shape), bs], axis=1))
+        if station.SideshotPoints:
+            ss = scale_points(np.array(station.SideshotPoints, dtype=float), extent, new_extent)
+            ss = ss[thin_points(ss, new_extent, lod.GridCells)]
+            ss_points.append(ss)
+            ss_segments.append(np.stack([np.broadcast_to(oc, ss.shape), ss], axis=1))
+
+    # one artist per kind of element, drawn in the same order as the full plot
+    if bs_points:
+        ax.add_collection(LineCollection(np.concatenate(bs_segments), colors="r", linewidths=line_width, alpha=0.3))
+        all_bs = np.concatenate(bs_points)
+        ax.plot(all_bs[:, 0], all_bs[:, 1], "r^", alpha=0.7, markersize=marker_size, linestyle="none")
+    if ss_points:
+        ax.add_collection(LineCollection(np.concatenate(ss_segments), colors="b", linewidths=line_width, alpha=0.1))
+    ax.plot(oc_points[:, 0], oc_points[:, 1], "g^", alpha=0.7, markersize=marker_size, linestyle="none")
+    if ss_points:
+        all_ss = np.concatenate(ss_points)
+        ax.plot(all_ss[:, 0], all_ss[:, 1], "bo", markersize=sideshot_size, linestyle="none")
+    ax.autoscale_view()
+
+    # labels
+    if dense:
+        if dense_labels:
+            _draw_dense_labels(ax, stations, extent, new_extent, lod)
+        return
+    for point_id, p in zip(bs_ids, np.concatenate(bs_points) if bs_points else []):
+        ax.text(p[0] + 0.25, p[1] - 0.2, point_id, ha="left", va="center", color="r", fontsize="xx-large")
+    for station, p in zip(stations, oc_points):
+        ax.annotate(station.OccupiedPointID, (p[0] + 0.25, p[1]), ha="left", va="center", fontsize="xx-large", color="g")
+
+
+def _is_dense(stations: list[StationPlotData], lod: PlotLOD) -> bool:
+    return sum(1 + len(station.BacksightPoints) for station in stations) > lod.LabelDensityThreshold
+
+
+def _draw_dense_labels(ax: Axes, stations: list[StationPlotData], extent: ExtentType, new_extent: ExtentType, lod: PlotLOD) -> None:
+    # labels are thinned across all stations, so they can't be drawn one station at a time
+    oc_points = scale_points(np.array([s.OccupiedPoint for s in stations], dtype=float).reshape(-1, 2), extent, new_extent)
+    for i in thin_points(oc_points, new_extent, lod.LabelGridCells):
+        ax.annotate(stations[i].OccupiedPointID, (oc_points[i, 0] + 0.1, oc_points[i, 1]), ha="left", va="center", fontsize="small", color="g")
+
+
+def _render_stations(
+    stations: list[StationPlotData],
+    extent: ExtentType,
+    lod: PlotLOD | None,
+    image_format: ImageFormat = "png",
+) -> io.BytesIO:
+    fig, ax = plt.subplots(figsize=FIGURE_EXTENT[2:], dpi=FIGURE_DPI)
+    plt.axis("off")
+    if lod is None:
+        _draw_stations_full(ax, stations, extent, FIGURE_EXTENT)
+    else:
+        _draw_stations_lod(ax, stations, extent, FIGURE_EXTENT, lod)
+
     buffer = io.BytesIO()
-    fig.savefig(buffer, format="png", bbox_inches="tight")
+    fig.savefig(buffer, format=image_format, bbox_inches="tight")
+    plt.close(fig)
     buffer.seek(0)
     return buffer
+
+
+def _plot_style(lod: PlotLOD | None, image_format: ImageFormat) -> dict[str, object]:
+    return {
+        "renderer": "matplotlib",
+        "matplotlib": mpl.__version__,
+        "version": PLOT_STYLE_VERSION,
+        "lod": asdict(lod) if lod else None,
+        "format": image_format,
+    }
+
+
+def _render_stations_cached(
+    stations: list[StationPlotData],
+    extent: ExtentType,
+    lod: PlotLOD | None,
+    cache: PlotCache | None,
+    image_format: ImageFormat = "png",
+) -> io.BytesIO:
+    if cache is None:
+        return _render_stations(stations, extent, lod, image_format)
+    key = plot_key(stations, extent, _plot_style(lod, image_format))
+    data = cache.get(key)
+    if data is not None:
+        return io.BytesIO(data)
+    image = _render_stations(stations, extent, lod, image_format)
+    cache.put(key, image.getvalue())
+    return image
+
+
+def _layer_limits(extent: ExtentType) -> ExtentType:
+    # fixed axes limits, so that layers drawn separately line up when composited
+    x0, y0 = scale_to_new_dimensions((extent[0], extent[1]), extent, FIGURE_EXTENT)
+    x1, y1 = scale_to_new_dimensions((extent[2], extent[3]), extent, FIGURE_EXTENT)
+    # matplotlib's default autoscale margins
+    margin_x = (x1 - x0) * 0.05 or 0.5
+    margin_y = (y1 - y0) * 0.05 or 0.5
+    return (x0 - margin_x, y0 - margin_y, x1 + margin_x, y1 + margin_y)
+
+
+def _render_layer(fig: Figure, ax: Axes, draw: Callable[[Axes], None], limits: ExtentType) -> bytes:
+    ax.clear()
+    ax.axis("off")
+    draw(ax)
+    ax.set_xlim(limits[0], limits[2])
+    ax.set_ylim(limits[1], limits[3])
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", transparent=True)
+    return buffer.getvalue()
+
+
+def _composite_layers(layers: list[bytes]) -> io.BytesIO:
+    """Draw transparent PNG layers over each other in order, then crop and flatten onto white."""  # noqa: DOC201
+    # premultiplied alpha, so each layer is a single "over" operation
+    color = alpha = None
+    for data in layers:
+        image = plt.imread(io.BytesIO(data), format="png")
+        layer_alpha = image[..., 3:]
+        if color is None or alpha is None:
+            color, alpha = image[..., :3] * layer_alpha, layer_alpha
+            continue
+        color = image[..., :3] * layer_alpha + color * (1 - layer_alpha)
+        alpha = layer_alpha + alpha * (1 - layer_alpha)
+    if color is None or alpha is None:
+        msg = "No layers to composite."
+        raise ValueError(msg)
+
+    rows, cols = np.nonzero(alpha[..., 0])
+    if len(rows):
+        top, bottom = max(rows.min() - LAYER_PADDING, 0), rows.max() + LAYER_PADDING + 1
+        left, right = max(cols.min() - LAYER_PADDING, 0), cols.max() + LAYER_PADDING + 1
+        color, alpha = color[top:bottom, left:right], alpha[top:bottom, left:right]
+    buffer = io.BytesIO()
+    plt.imsave(buffer, np.clip(color + (1 - alpha), 0, 1), format="png", dpi=FIGURE_DPI)
+    buffer.seek(0)
+    return buffer
+
+
+def _render_job_cached(
+    stations: list[StationPlotData],
+    extent: ExtentType,
+    lod: PlotLOD | None,
+    cache: PlotCache | None,
+) -> io.BytesIO:
+    """Render a whole job as one cached layer per station, composited in station order.
+
+    Changing a station only redraws that station's layer. In LOD mode the dense
+    OC labels are thinned across all stations, so they get a layer of their own
+    that only depends on the OC points.
+    """  # noqa: DOC201
+    if cache is None or not stations:
+        return _render_stations_cached(stations, extent, lod, cache)
+    style = _plot_style(lod, "png")
+    dense = lod is not None and _is_dense(stations, lod)
+    layers: list[tuple[str, Callable[[Axes], None]]] = []
+    for station in stations:
+        key = plot_key([station], extent, {**style, "layer": "station", "dense": dense})
+        if lod is None:
+            draw = partial(_draw_stations_full, stations=[station], extent=extent, new_extent=FIGURE_EXTENT)
+        else:
+            draw = partial(_draw_stations_lod, stations=[station], extent=extent, new_extent=FIGURE_EXTENT, lod=lod, dense=dense, dense_labels=False)
+        layers.append((key, draw))
+    if lod is not None and dense:
+        label_stations = [StationPlotData(station.OccupiedPointID, station.OccupiedPoint) for station in stations]
+        key = plot_key(label_stations, extent, {**style, "layer": "labels"})
+        layers.append((key, partial(_draw_dense_labels, stations=label_stations, extent=extent, new_extent=FIGURE_EXTENT, lod=lod)))
+
+    limits = _layer_limits(extent)
+    fig = ax = None
+    images = []
+    for key, draw in layers:
+        data = cache.get(key)
+        if data is None:
+            if fig is None or ax is None:
+                fig, ax = plt.subplots(figsize=FIGURE_EXTENT[2:], dpi=FIGURE_DPI)
+            data = _render_layer(fig, ax, draw, limits)
+            cache.put(key, data)
+        images.append(data)
+    if fig is not None:
+        plt.close(fig)
+    return _composite_layers(images)
+
+
+def plot_total_station_data(machine: MachineState, lod: PlotLOD | None = None, cache: PlotCache | None = None) -> io.BytesIO:
+    """Plot ts data with matplotlib.
+
+    Pass `lod` to thin dense sideshots and labels on large jobs.
+    With `cache`, each station is cached as its own layer and only changed stations are drawn.
+
+    Returns BytesIO object containing png data.
+    """  # noqa: DOC201, DOC501
+    if not machine.crdb_path:
+        msg = "CRDB file is required."
+        raise ValueError(msg)
+    # setup figure
+    extent = get_extent(list(machine.Records.values()))
+    return _render_job_cached(get_station_plot_data(machine), extent, lod, cache)
+
+
+def plot_total_station_tiles(machine: MachineState, lod: PlotLOD | None = None, cache: PlotCache | None = None) -> PlotTiles:
+    """Plot an overview of the job plus one image per station, at the given level of detail.
+
+    Each station tile is scaled to the extent of that station's own points.
+    With `cache`, only tiles of changed stations are drawn.
+    """  # noqa: DOC201
+    lod = lod or PlotLOD()
+    stations = get_station_plot_data(machine)
+    return PlotTiles(
+        Overview=_render_job_cached(stations, get_extent(list(machine.Records.values())), lod, cache),
+        Stations={
+            station.OccupiedPointID: _render_stations_cached([station], get_points_extent(station.points()), lod, cache)
+            for station in stations
+        },
+    )
+
+
+def _use_agg_backend() -> None:
+    mpl.use("Agg", force=True)
+
+
+def _render_station_file(
+    station: StationPlotData,
+    output_path: Path,
+    lod: PlotLOD | None,
+    image_format: ImageFormat,
+) -> Path:
+    image = _render_stations([station], get_points_extent(station.points()), lod, image_format)
+    output_path.write_bytes(image.getbuffer())
+    return output_path
+
+
+def render_station_plots(
+    stations: Iterable[TSStation],
+    output_dir: Path,
+    image_format: ImageFormat = "png",
+    max_workers: int | None = None,
+    lod: PlotLOD | None = None,
+    cache: PlotCache | None = None,
+) -> Iterator[Path]:
+    """Render each station into its own image file on a process pool.
+
+    Workers only receive the station's coordinates, and use the Agg backend.
+    Yields each image path as soon as it has been written, in completion order.
+    With `cache`, stations whose plot is cached are copied from it first and
+    only the rest are rendered.
+    """  # noqa: DOC402
+    output_dir.mkdir(parents=True, exist_ok=True)
+    style = _plot_style(lod, image_format)
+    to_render: dict[Path, tuple[StationPlotData, str | None]] = {}
+    stations_data = [StationPlotData.from_ts_station(station) for station in stations]
+    file_names = station_plot_file_names([station_data.OccupiedPointID for station_data in stations_data], image_format)
+    for station_data, file_name in zip(stations_data, file_names):
+        output_path = output_dir / file_name
+        key = None
+        if cache is not None:
+            key = plot_key([station_data], get_points_extent(station_data.points()), style)
+            data = cache.get(key)
+            if data is not None:
+                output_path.write_bytes(data)
+                yield output_path
+                continue
+        to_render[output_path] = (station_data, key)
+    if not to_render:
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_agg_backend) as executor:
+        futures = [
+            executor.submit(_render_station_file, station_data, output_path, lod, image_format)
+            for output_path, (station_data, _) in to_render.items()
+        ]
+        for future in as_completed(futures):
+            output_path = future.result()
+            key = to_render[output_path][1]
+            if cache is not None and key is not None:
+                cache.put(key, output_path.read_bytes())
+            yield output_path
@@ -0,0 +1,120 @@
+"""On-disk cache of rendered station plots, keyed by a hash of what each plot is drawn from.
+
+A plot's key covers its stations' coordinates and point ids, the extent it is
+scaled to, and the renderer's style settings, so an unchanged station is never
+redrawn. The cache is bounded in bytes and evicts the least recently used images.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import asdict
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from rw5_to_csv.plot_data import ExtentType, StationPlotData
+
+logger = getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_SUFFIX = ".plot"
+
+
+def plot_key(stations: list[StationPlotData], extent: ExtentType, style: Mapping[str, Any]) -> str:
+    """Return the hash of everything a plot of `stations` depends on.
+
+    `style` holds the renderer's settings, e.g. its name, version, level of
+    detail and image format, and must be JSON serializable.
+    """  # noqa: DOC201
+    digest = hashlib.sha256()
+    digest.update(json.dumps(dict(style), sort_keys=True, separators=(",", ":")).encode())
+    # repr round-trips floats exactly, so any coordinate change changes the key
+    digest.update(repr(tuple(extent)).encode())
+    for station in stations:
+        digest.update(json.dumps(asdict(station), separators=(",", ":")).encode())
+    return digest.hexdigest()
+
+
+class PlotCache:
+    """Rendered images in a folder, evicting the least recently used beyond `max_bytes`.
+
+    Recency is kept in file modification times, so it survives between runs.
+    Writes are atomic, so several processes may share a cache folder.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        """Size of each cached image by key, least recently used first."""
+        entries = []
+        for path in self.cache_dir.glob(f"*{CACHE_SUFFIX}"):
+            stat = path.stat()
+            entries.append((stat.st_mtime_ns, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+        self._total_bytes = sum(self._sizes.values())
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._sizes)
+
+    def __contains__(self, key: object) -> bool:  # noqa: D105
+        return key in self._sizes
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes of images in the cache."""  # noqa: DOC201
+        return self._total_bytes
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached image for `key` and mark it recently used, or None on a miss."""  # noqa: DOC201
+        if key not in self._sizes:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            # evicted by another process sharing the folder
+            self._total_bytes -= self._sizes.pop(key)
+            self.misses += 1
+            return None
+        os.utime(path)
+        self._sizes.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an image, then evict least recently used images until the cache fits `max_bytes`."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            Path(tmp_name).replace(self._path(key))
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+        self._total_bytes += len(data) - self._sizes.pop(key, 0)
+        self._sizes[key] = len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self._path(key).unlink(missing_ok=True)
+            self._total_bytes -= size
+            logger.debug("Evicted plot %s from cache.", key)
@@ -0,0 +1,202 @@
+"""Plain coordinate data for total station diagrams, independent of any renderer."""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Literal
+
+import numpy as np
+
+from rw5_to_csv.utils.crdb import get_crdb_point
+from rw5_to_csv.utils.fixed_point import to_float_array
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from rw5_to_csv.machine_state import MachineState
+    from rw5_to_csv.records.record import RW5Row
+    from rw5_to_csv.total_station import TSStation
+
+Point2DType = tuple[float, float]
+ExtentType = tuple[float, float, float, float]
+ImageFormat = Literal["png", "svg"]
+
+
+@dataclass
+class PlotLOD:
+    """Level of detail settings for plots of jobs with many stations and sideshots.
+
+    The number of artists drawn is bounded by the grid sizes, so render time does
+    not grow with the number of sideshots.
+    """
+
+    GridCells: int = 100
+    """Sideshots are thinned to one point per cell of a GridCells x GridCells grid over the figure."""
+    LabelDensityThreshold: int = 20
+    """Above this many OC and backsight points, only OC points are labelled and markers are shrunk."""
+    LabelGridCells: int = 10
+    """When above the density threshold, at most one OC label is drawn per cell of this grid."""
+
+
+@dataclass
+class StationPlotData:
+    """Coordinates needed to draw one occupied point with its backsights and sideshots."""
+
+    OccupiedPointID: str
+    OccupiedPoint: Point2DType
+    BacksightPointIDs: list[str] = field(default_factory=list)
+    BacksightPoints: list[Point2DType] = field(default_factory=list)
+    SideshotPointIDs: list[str] = field(default_factory=list)
+    SideshotPoints: list[Point2DType] = field(default_factory=list)
+
+    @classmethod
+    def from_ts_station(cls, station: TSStation) -> StationPlotData:
+        """Take only the coordinates needed for plotting from a `TSStation`."""  # noqa: DOC201
+        occupied = station.OccupiedPoint
+        assert occupied.LocalX is not None
+        assert occupied.LocalY is not None
+        data = cls(
+            OccupiedPointID=occupied.PointID,
+            OccupiedPoint=(float(occupied.LocalX), float(occupied.LocalY)),
+        )
+        b = station.BacksightPoint
+        if b.LocalX and b.LocalY:
+            data.BacksightPointIDs.append(b.PointID)
+            data.BacksightPoints.append((float(b.LocalX), float(b.LocalY)))
+        for ss in station.ForesightPoints:
+            if not ss.LocalX or not ss.LocalY:
+                continue
+            data.SideshotPointIDs.append(ss.PointID)
+            data.SideshotPoints.append((float(ss.LocalX), float(ss.LocalY)))
+        return data
+
+    def points(self) -> np.ndarray:
+        """Return every point of the station as an (n, 2) array."""  # noqa: DOC201
+        return np.array([self.OccupiedPoint, *self.BacksightPoints, *self.SideshotPoints], dtype=float)
+
+
+def get_station_plot_data(machine: MachineState) -> list[StationPlotData]:
+    """Collect plot data for each OC record of a converted job.
+
+    OC records are assumed to be a good tell for when a new system has been started.
+    """  # noqa: DOC201, DOC501
+    if not machine.crdb_path:
+        msg = "CRDB file is required."
+        raise ValueError(msg)
+
+    stations = []
+    for oc_record in machine.Records.values():
+        if oc_record.RW5RecordType != "OC":
+            continue
+        assert oc_record.LocalX is not None
+        assert oc_record.LocalY is not None
+        station = StationPlotData(
+            OccupiedPointID=oc_record.PointID,
+            OccupiedPoint=(float(oc_record.LocalX), float(oc_record.LocalY)),
+        )
+
+        for backsight in machine.Backsights:
+            if backsight.OccupiedPointID != oc_record.PointID:
+                continue
+            b = get_crdb_point(backsight.BacksightPointID, machine.crdb_path)
+            if not b.LocalX or not b.LocalY:
+                continue
+            station.BacksightPointIDs.append(b.PointID)
+            station.BacksightPoints.append((float(b.LocalX), float(b.LocalY)))
+
+        for ss_id in machine.SideshotIDOccupiedPointID.keys_for(oc_record.PointID):
+            ss = machine.Records.get(ss_id)
+            if ss is None or not ss.LocalX or not ss.LocalY:
+                continue
+            station.SideshotPointIDs.append(ss.PointID)
+            station.SideshotPoints.append((float(ss.LocalX), float(ss.LocalY)))
+
+        stations.append(station)
+    return stations
+
+
+def get_extent(rows: list[RW5Row]) -> ExtentType:
+    """Return (minx, miny, maxx, maxy) of the local coordinates of rows."""  # noqa: DOC201
+    xs = to_float_array([row.LocalX for row in rows])
+    ys = to_float_array([row.LocalY for row in rows])
+    # missing and zero coordinates don't count
+    xs = xs[(xs != 0) & ~np.isnan(xs)]
+    ys = ys[(ys != 0) & ~np.isnan(ys)]
+
+    return (
+        float(xs.min()) if len(xs) else math.inf,
+        float(ys.min()) if len(ys) else math.inf,
+        float(xs.max()) if len(xs) else -math.inf,
+        float(ys.max()) if len(ys) else -math.inf,
+    )
+
+
+def get_points_extent(points: np.ndarray) -> ExtentType:
+    """Return (minx, miny, maxx, maxy) of an (n, 2) array of points."""  # noqa: DOC201
+    if len(points) == 0:
+        return (math.inf, math.inf, -math.inf, -math.inf)
+    minx, miny = points.min(axis=0)
+    maxx, maxy = points.max(axis=0)
+    return (float(minx), float(miny), float(maxx), float(maxy))
+
+
+def scale_points(points: np.ndarray, old_extent: ExtentType, new_extent: ExtentType) -> np.ndarray:
+    """Vectorized `plot.scale_to_new_dimensions` over an (n, 2) array of points."""  # noqa: DOC201
+    old_range_x = old_extent[2] - old_extent[0]
+    old_range_y = (old_extent[3] - old_extent[1]) or 1.0
+    new_range_x = new_extent[2] - new_extent[0]
+    new_range_y = new_extent[3] - new_extent[1]
+
+    scale = min(
+        new_range_x / old_range_y,
+        new_range_y / old_range_y,
+    )
+
+    margin_x = new_range_x - old_range_x * scale
+    margin_y = new_range_y - old_range_y * scale
+
+    scaled = np.empty_like(points, dtype=float)
+    scaled[:, 0] = new_extent[0] + (points[:, 0] - old_extent[0]) * scale + margin_x / 2
+    scaled[:, 1] = new_extent[1] + (points[:, 1] - old_extent[1]) * scale + margin_y / 2
+    return scaled
+
+
+def thin_points(points: np.ndarray, extent: ExtentType, grid_cells: int) -> np.ndarray:
+    """Keep the first point in each cell of a `grid_cells` x `grid_cells` grid over `extent`.
+
+    Returns the indices of the kept points, in their original order.
+    """  # noqa: DOC201
+    if len(points) == 0:
+        return np.arange(0)
+    cell_width = ((extent[2] - extent[0]) or 1.0) / grid_cells
+    cell_height = ((extent[3] - extent[1]) or 1.0) / grid_cells
+    cells_x = np.clip(((points[:, 0] - extent[0]) // cell_width).astype(np.int64), 0, grid_cells - 1)
+    cells_y = np.clip(((points[:, 1] - extent[1]) // cell_height).astype(np.int64), 0, grid_cells - 1)
+    _, kept = np.unique(cells_y * grid_cells + cells_x, return_index=True)
+    return np.sort(kept)
+
+
+def station_plot_file_name(occupied_point_id: str, image_format: ImageFormat) -> str:
+    """Return a file name for a station plot that is safe on any file system."""  # noqa: DOC201
+    return f"station_{re.sub(r'[^A-Za-z0-9_.-]', '_', occupied_point_id)}.{image_format}"
+
+
+def station_plot_file_names(occupied_point_ids: Iterable[str], image_format: ImageFormat) -> list[str]:
+    """Return a distinct `station_plot_file_name` for each station, in order.
+
+    Stations whose names collide, e.g. "A/1" and "A_1", or a point occupied
+    twice, get numbered names after the first.
+    """  # noqa: DOC201
+    file_names = []
+    used: set[str] = set()
+    for occupied_point_id in occupied_point_ids:
+        stem = station_plot_file_name(occupied_point_id, image_format).removesuffix(f".{image_format}")
+        unique_stem, n = stem, 1
+        while unique_stem.lower() in used:
+            n += 1
+            unique_stem = f"{stem}-{n}"
+        used.add(unique_stem.lower())
+        file_names.append(f"{unique_stem}.{image_format}")
+    return file_names
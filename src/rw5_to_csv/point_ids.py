@@ -0,0 +1,112 @@
+"""Point id symbol table, so cross references between points are stored as small integers."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator, MutableMapping
+
+MISSING = -1
+
+
+class PointIDTable:
+    """Maps each point id string to a dense integer symbol, assigned in order of first sight."""
+
+    def __init__(self) -> None:
+        self._symbols: dict[str, int] = {}
+        self._point_ids: list[str] = []
+
+    def intern(self, point_id: str) -> int:
+        """Return the symbol of `point_id`, assigning the next one if it hasn't been seen."""  # noqa: DOC201
+        symbol = self._symbols.get(point_id)
+        if symbol is None:
+            symbol = self._symbols[point_id] = len(self._point_ids)
+            self._point_ids.append(point_id)
+        return symbol
+
+    def symbol(self, point_id: str) -> int | None:
+        """Return the symbol of `point_id`, or None if it hasn't been interned."""  # noqa: DOC201
+        return self._symbols.get(point_id)
+
+    def canonical(self, point_id: str) -> str:
+        """Return the one string object kept for `point_id`, interning it if needed."""  # noqa: DOC201
+        return self._point_ids[self.intern(point_id)]
+
+    def __getitem__(self, symbol: int) -> str:  # noqa: D105
+        return self._point_ids[symbol]
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._point_ids)
+
+
+class SymbolMap(MutableMapping[str, str]):
+    """Point id to point id mapping stored as symbols of a shared `PointIDTable`.
+
+    Reads and writes with strings like the dict it replaces, and iterates in
+    insertion order. Values are kept in an array indexed by key symbol, with a
+    reverse index so `keys_for` doesn't scan the whole map.
+    """
+
+    def __init__(self, table: PointIDTable) -> None:
+        self.table = table
+        self._values = array("q")
+        """Value symbol by key symbol, `MISSING` for absent keys."""
+        self._order: dict[int, int] = {}
+        """Insertion position of each present key symbol, in insertion order."""
+        self._next_position = 0
+        self._keys_by_value: dict[int, dict[int, None]] = {}
+
+    def _value_symbol(self, key_symbol: int | None) -> int:
+        if key_symbol is None or key_symbol >= len(self._values):
+            return MISSING
+        return self._values[key_symbol]
+
+    def __getitem__(self, point_id: str) -> str:  # noqa: D105
+        value_symbol = self._value_symbol(self.table.symbol(point_id))
+        if value_symbol == MISSING:
+            raise KeyError(point_id)
+        return self.table[value_symbol]
+
+    def __setitem__(self, point_id: str, value: str) -> None:  # noqa: D105
+        key_symbol = self.table.intern(point_id)
+        value_symbol = self.table.intern(value)
+        if key_symbol >= len(self._values):
+            self._values.extend([MISSING] * (key_symbol + 1 - len(self._values)))
+
+        old_value_symbol = self._values[key_symbol]
+        if old_value_symbol == MISSING:
+            self._order[key_symbol] = self._next_position
+            self._next_position += 1
+        elif old_value_symbol != value_symbol:
+            del self._keys_by_value[old_value_symbol][key_symbol]
+        self._values[key_symbol] = value_symbol
+        self._keys_by_value.setdefault(value_symbol, {})[key_symbol] = None
+
+    def __delitem__(self, point_id: str) -> None:  # noqa: D105
+        key_symbol = self.table.symbol(point_id)
+        value_symbol = self._value_symbol(key_symbol)
+        if value_symbol == MISSING:
+            raise KeyError(point_id)
+        assert key_symbol is not None
+        self._values[key_symbol] = MISSING
+        del self._order[key_symbol]
+        del self._keys_by_value[value_symbol][key_symbol]
+
+    def __iter__(self) -> Iterator[str]:  # noqa: D105
+        return (self.table[key_symbol] for key_symbol in self._order)
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._order)
+
+    def __contains__(self, point_id: object) -> bool:  # noqa: D105
+        return isinstance(point_id, str) and self._value_symbol(self.table.symbol(point_id)) != MISSING
+
+    def __repr__(self) -> str:  # noqa: D105
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def keys_for(self, value: str) -> list[str]:
+        """Return the keys mapped to `value`, in insertion order."""  # noqa: DOC201
+        value_symbol = self.table.symbol(value)
+        if value_symbol is None:
+            return []
+        key_symbols = sorted(self._keys_by_value.get(value_symbol, ()), key=self._order.__getitem__)
+        return [self.table[key_symbol] for key_symbol in key_symbols]
@@ -4,8 +4,9 @@ import datetime
 from dataclasses import dataclass
 from pathlib import Path
 
-from rw5_to_csv.records.common import get_standard_record_params_dict
-from rw5_to_csv.utils.command_blocks import group_lines_into_command_blocks
+from rw5_to_csv.records.common import get_data_collector, get_standard_record_params_dict
+from rw5_to_csv.utils.command_blocks import iter_command_blocks
+from rw5_to_csv.utils.compression import open_rw5
 
 
 @dataclass
@@ -21,6 +22,10 @@ class RW5Prelude:
     AntennaType: str | None
     RTKMethod: str | None
     GeoidSeperationFile: str | None
+    Projection: str | None = None
+    """Grid system from the `--Projection:` line SurvPC writes in place of `--User Defined:`."""
+    DataCollector: str | None = None
+    """Software that wrote the file, e.g. "SurvCE" or "SurvPC"."""
 
 
 def _get_repeated_attr(command_blocks: list[list[str]], line_prefix: str) -> str:
@@ -47,14 +52,18 @@ def _get_repeated_attr(command_blocks: list[list[str]], line_prefix: str) -> str
     return ",\n".join(list(values))
 
 
-def prelude(rw5_path: Path) -> RW5Prelude:
+def prelude(rw5_path: Path, header_only: bool = False) -> RW5Prelude:
     """Get fields from the prelude of an RW5 file.
 
-    Parses JB and MO records.
+    Parses JB and MO records. With `header_only`, reading stops at the first shot,
+    so repeated attributes like `Equipment` only hold the ones in effect for that shot.
     """  # noqa: DOC201, DOC501
     command_blocks = []
-    with rw5_path.open("r", encoding="iso8859-1") as input_file:
-        command_blocks = group_lines_into_command_blocks(input_file.readlines())
+    with open_rw5(rw5_path) as input_file:
+        for command_block in iter_command_blocks(input_file):
+            command_blocks.append(command_block)
+            if header_only and command_block[0].startswith(("GPS,", "SS,")):
+                break
     jb_record_matches = [
         block for block in command_blocks if block[0].split(",")[0] == "JB"
     ]
@@ -93,10 +102,13 @@ def prelude(rw5_path: Path) -> RW5Prelude:
     antenna_type = _get_repeated_attr(command_blocks, "--Antenna Type:")
     rtk_method = _get_repeated_attr(command_blocks, "--RTK Method:")
     geoid_sep_file = None
+    projection = None
 
     for line in mo_record:
         if line.startswith("--User Defined:"):
             user_defined = line.removeprefix("--User Defined:").strip()
+        if line.startswith("--Projection:"):
+            projection = line.removeprefix("--Projection:").strip()
         if line.startswith("--Geoid Separation File:"):
             geoid_sep_file = line.removeprefix("--Geoid Separation File:")
             geoid_sep_file = geoid_sep_file.split("\\")[-1].split(" ")[0]
@@ -111,4 +123,6 @@ def prelude(rw5_path: Path) -> RW5Prelude:
         AntennaType=antenna_type,
         RTKMethod=rtk_method,
         GeoidSeperationFile=geoid_sep_file,
+        Projection=projection,
+        DataCollector=get_data_collector(mo_record),
     )
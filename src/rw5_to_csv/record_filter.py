@@ -0,0 +1,90 @@
+"""Filters applied while parsing, so rejected records skip the expensive parts of conversion."""
+
+from __future__ import annotations
+
+import datetime
+import fnmatch
+import re
+from dataclasses import dataclass, field
+
+from rw5_to_csv.records.common import get_date_time, get_standard_record_params_dict
+from rw5_to_csv.records.record import RW5Row
+
+POINT_ID_PARAMS = ("PN", "FP", "OP")
+"""First line params that hold a record's point id, in order of preference."""
+
+
+def block_point_id(command_block: list[str]) -> str | None:
+    """Return the point id on the first line of a command block, if it has one."""  # noqa: DOC201
+    params = get_standard_record_params_dict(command_block[0].strip())
+    return next((params[p] for p in POINT_ID_PARAMS if p in params), None)
+
+
+def _aware(dt: datetime.datetime, tzinfo: datetime.tzinfo) -> datetime.datetime:
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=tzinfo)
+
+
+@dataclass
+class RecordFilter:
+    """Which records `convert()` should keep. Unset criteria accept everything.
+
+    Record type and point id are checked on the first line of a command block,
+    and the date window on its `--DT`/`--TM` lines, before the record is parsed.
+    Quality thresholds are checked on the parsed row.
+    """
+
+    RecordTypes: set[str] | None = None
+    """e.g. {"GPS", "SS"}"""
+    PointIDPatterns: list[str] | None = None
+    """Shell style patterns, e.g. ["60*", "CP?"]"""
+    Start: datetime.datetime | None = None
+    """Inclusive. Naive datetimes are in the conversion's timezone.
+
+    Records without a date are rejected when a date window is set.
+    """
+    End: datetime.datetime | None = None
+    """Exclusive."""
+    Statuses: set[str] | None = None
+    """GPS solution statuses, e.g. {"FIXED"}"""
+    MaxHRMS: float | None = None
+    MaxVRMS: float | None = None
+    MaxPDOP: float | None = None
+    _point_id_regex: re.Pattern[str] | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self) -> None:  # noqa: D105
+        if self.PointIDPatterns is not None:
+            self._point_id_regex = re.compile("|".join(fnmatch.translate(p) for p in self.PointIDPatterns))
+
+    def accepts_block(self, record_type: str, command_block: list[str], tzinfo: datetime.tzinfo) -> bool:
+        """Check what can be checked without parsing the record."""  # noqa: DOC201
+        if self.RecordTypes is not None and record_type not in self.RecordTypes:
+            return False
+
+        if self._point_id_regex is not None:
+            point_id = block_point_id(command_block)
+            if point_id is None or not self._point_id_regex.match(point_id):
+                return False
+
+        if self.Start is not None or self.End is not None:
+            dt = get_date_time(command_block, tzinfo)
+            if dt is None:
+                return False
+            if self.Start is not None and dt < _aware(self.Start, tzinfo):
+                return False
+            if self.End is not None and dt >= _aware(self.End, tzinfo):
+                return False
+
+        return True
+
+    def accepts_row(self, row: RW5Row) -> bool:
+        """Check the quality thresholds of a parsed row. Rows without a value for a threshold pass it."""  # noqa: DOC201
+        if self.Statuses is not None and row.RW5RecordType == "GPS" and row.Status not in self.Statuses:
+            return False
+        for limit, value in (
+            (self.MaxHRMS, row.HRMS),
+            (self.MaxVRMS, row.VRMS),
+            (self.MaxPDOP, row.PDOP),
+        ):
+            if limit is not None and value is not None and value > limit:
+                return False
+        return True
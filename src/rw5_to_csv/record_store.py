@@ -0,0 +1,174 @@
+"""Record store that keeps roughly a set number of bytes of rows in memory and spills the rest to disk."""
+
+from __future__ import annotations
+
+import heapq
+import os
+import pickle
+import sqlite3
+import tempfile
+import weakref
+from collections.abc import ItemsView, Iterator, MutableMapping, ValuesView
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from rw5_to_csv.records.record import RW5Row
+
+logger = getLogger(__name__)
+
+SPILL_FRACTION = 0.5
+"""Fraction of the in-memory rows written to disk each time the budget is exceeded."""
+
+
+def _close_spill_file(connection: sqlite3.Connection, spill_path: Path) -> None:
+    connection.close()
+    spill_path.unlink(missing_ok=True)
+
+
+class _Values(ValuesView):
+    def __iter__(self) -> Iterator[RW5Row]:
+        return (row for _, row in self._mapping.iter_items())
+
+
+class _Items(ItemsView):
+    def __iter__(self) -> Iterator[tuple[str, RW5Row]]:
+        return self._mapping.iter_items()
+
+
+class SpillingRecordStore(MutableMapping[str, "RW5Row"]):
+    """Drop-in replacement for `MachineState.Records` with bounded memory use.
+
+    Behaves like the `OrderedDict` it replaces: rows iterate in the order their
+    point id was first set, and setting an existing point id replaces the row
+    in place. Once the rows held take more than `memory_budget` bytes, the
+    least recently set rows are pickled into a temporary SQLite file, which is
+    removed when the store is closed or garbage collected. Row sizes are
+    estimated from their pickled size, averaged over the rows spilled so far.
+
+    Rows read back from disk are copies, so changes to them are not kept unless
+    they are set again.
+    """
+
+    def __init__(self, memory_budget: int, spill_dir: Path | None = None) -> None:
+        if memory_budget < 1:
+            msg = f"Memory budget must be at least one byte, got {memory_budget}."
+            raise ValueError(msg)
+        self.MemoryBudget = memory_budget
+        """Bytes of rows to hold in memory, at least one row is always held."""
+        self._hot: dict[str, tuple[int, RW5Row]] = {}
+        """In-memory rows and their insertion sequence, least recently set first."""
+        self._next_seq = 0
+        self._len = 0
+        self._spilled = 0
+        self._pickled_bytes = 0
+        self._pickled_rows = 0
+        """Pickled size of rows spilled so far, for estimating the size of rows in memory."""
+
+        fd, spill_path = tempfile.mkstemp(prefix="rw5_records_", suffix=".sqlite", dir=spill_dir)
+        os.close(fd)
+        self.SpillPath = Path(spill_path)
+        self._connection = sqlite3.connect(spill_path)
+        self._connection.execute("PRAGMA journal_mode = OFF")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        self._connection.execute(
+            "CREATE TABLE records (point_id TEXT PRIMARY KEY, seq INTEGER NOT NULL, row BLOB NOT NULL)",
+        )
+        self._connection.execute("CREATE INDEX records_seq ON records (seq)")
+        self._finalizer = weakref.finalize(self, _close_spill_file, self._connection, self.SpillPath)
+
+    def close(self) -> None:
+        """Remove the spill file. The store can't be used afterwards."""
+        self._finalizer()
+
+    def _spilled_seq(self, point_id: str) -> int | None:
+        if not self._spilled:
+            return None
+        result = self._connection.execute("SELECT seq FROM records WHERE point_id = ?", (point_id,)).fetchone()
+        return None if result is None else result[0]
+
+    def _resident_bytes(self) -> float:
+        return len(self._hot) * self._pickled_bytes / max(1, self._pickled_rows)
+
+    def _spill(self) -> None:
+        count = max(1, int(len(self._hot) * SPILL_FRACTION))
+        spilled = [
+            (point_id, seq, pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL))
+            for point_id, (seq, row) in ((point_id, self._hot.pop(point_id)) for point_id in list(self._hot)[:count])
+        ]
+        with self._connection:
+            self._connection.executemany("INSERT INTO records (point_id, seq, row) VALUES (?, ?, ?)", spilled)
+        self._spilled += count
+        self._pickled_bytes += sum(len(row) for _, _, row in spilled)
+        self._pickled_rows += count
+        logger.debug("Spilled %d rows to %s", count, self.SpillPath)
+
+    def __getitem__(self, point_id: str) -> RW5Row:  # noqa: D105
+        if point_id in self._hot:
+            return self._hot[point_id][1]
+        result = None
+        if self._spilled:
+            result = self._connection.execute("SELECT row FROM records WHERE point_id = ?", (point_id,)).fetchone()
+        if result is None:
+            raise KeyError(point_id)
+        return pickle.loads(result[0])  # noqa: S301
+
+    def __setitem__(self, point_id: str, row: RW5Row) -> None:  # noqa: D105
+        if point_id in self._hot:
+            seq = self._hot.pop(point_id)[0]
+        else:
+            seq = self._spilled_seq(point_id)
+            if seq is None:
+                seq = self._next_seq
+                self._next_seq += 1
+                self._len += 1
+            else:
+                # the new row takes over the spilled row's position
+                self._connection.execute("DELETE FROM records WHERE point_id = ?", (point_id,))
+                self._spilled -= 1
+        self._hot[point_id] = (seq, row)
+        if not self._pickled_rows:
+            # seed the row size estimate until the first spill measures more rows
+            self._pickled_bytes = len(pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL))
+            self._pickled_rows = 1
+        if len(self._hot) > 1 and self._resident_bytes() > self.MemoryBudget:
+            self._spill()
+
+    def __delitem__(self, point_id: str) -> None:  # noqa: D105
+        if point_id in self._hot:
+            del self._hot[point_id]
+        elif self._spilled and self._connection.execute(
+            "DELETE FROM records WHERE point_id = ?", (point_id,),
+        ).rowcount:
+            self._spilled -= 1
+        else:
+            raise KeyError(point_id)
+        self._len -= 1
+
+    def __contains__(self, point_id: object) -> bool:  # noqa: D105
+        return point_id in self._hot or (isinstance(point_id, str) and self._spilled_seq(point_id) is not None)
+
+    def __len__(self) -> int:  # noqa: D105
+        return self._len
+
+    def iter_items(self) -> Iterator[tuple[str, RW5Row]]:
+        """Yield (point id, row) in insertion order, merging in-memory and spilled rows."""  # noqa: DOC402
+        hot = sorted(((seq, point_id, row) for point_id, (seq, row) in self._hot.items()), key=lambda entry: entry[0])
+        spilled = (
+            (seq, point_id, pickle.loads(row))  # noqa: S301
+            for seq, point_id, row in self._connection.execute(
+                "SELECT seq, point_id, row FROM records ORDER BY seq",
+            )
+        ) if self._spilled else ()
+        for _, point_id, row in heapq.merge(hot, spilled, key=lambda entry: entry[0]):
+            yield point_id, row
+
+    def __iter__(self) -> Iterator[str]:  # noqa: D105
+        return (point_id for point_id, _ in self.iter_items())
+
+    def values(self) -> ValuesView[RW5Row]:  # noqa: D102
+        return _Values(self)
+
+    def items(self) -> ItemsView[str, RW5Row]:  # noqa: D102
+        return _Items(self)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from rw5_to_csv.machine_state import AngleObservation, MachineState
+from rw5_to_csv.records.common import get_angles_and_distance, get_standard_record_params_dict
+from rw5_to_csv.records.record import RW5Row
+
+
+def parse_bd_record(
+    command_block: list[str],
+    machine_state: MachineState,
+) -> list[RW5Row]:
+    """Parse BD (backsight direction) record, the check shot taken to the backsight.
+
+    This records an observation for residual analysis and creates no rows.
+    Records missing a field the observation needs are ignored.
+
+    Ex: `
+        BD,OP1,FPG1,AR0.0000,ZE106.4145,SD1.100000,--
+        --Calculated: AR0°00'00", HD7789948.654, Z42.303
+        `
+    """  # noqa: DOC201
+    first_line_params = get_standard_record_params_dict(command_block[0].strip())
+    occupied_point_id, foresight_point_id = first_line_params.get("OP"), first_line_params.get("FP")
+    angles_and_distance = get_angles_and_distance(first_line_params)
+    if occupied_point_id is None or foresight_point_id is None or angles_and_distance is None:
+        return []
+
+    angle_right, zenith, slope_distance = angles_and_distance
+    machine_state.Observations.append(AngleObservation(
+        RecordType="BD",
+        OccupiedPointID=occupied_point_id,
+        ForesightPointID=foresight_point_id,
+        AngleRightDD=angle_right,
+        ZenithDD=zenith,
+        SlopeDistance=slope_distance,
+        InstrumentHeight=machine_state.HI,
+        RodHeight=machine_state.HR,
+        Backsight=machine_state.Backsights[-1] if machine_state.Backsights else None,
+    ))
+
+    return []
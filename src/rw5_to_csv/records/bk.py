@@ -31,9 +31,10 @@ def parse_bk_record(
 
     first_line_params = get_standard_record_params_dict(command_block[0].strip())
 
-    oc_point_id = first_line_params["OP"]
-    bs_point_id = first_line_params["BP"]
+    oc_point_id = machine_state.PointIDs.canonical(first_line_params["OP"])
+    bs_point_id = machine_state.PointIDs.canonical(first_line_params["BP"])
     backsigt_angle = dms_to_dd(first_line_params["BS"])
+    backsight_circle = dms_to_dd(first_line_params["BC"]) if "BC" in first_line_params else 0.0
 
     op_point = get_crdb_point(oc_point_id, machine_state.crdb_path)
     bs_point = get_crdb_point(bs_point_id, machine_state.crdb_path)
@@ -45,10 +46,9 @@ def parse_bk_record(
     assert bs_point.LocalY is not None
     assert bs_point.LocalZ is not None
 
-    backsight_distance = math.sqrt(
-        ((op_point.LocalX - bs_point.LocalX) ** 2)
-        + ((op_point.LocalY - bs_point.LocalY) ** 2)
-        + ((op_point.LocalZ - bs_point.LocalZ) ** 2),
+    backsight_distance = math.dist(
+        (float(op_point.LocalX), float(op_point.LocalY), float(op_point.LocalZ)),
+        (float(bs_point.LocalX), float(bs_point.LocalY), float(bs_point.LocalZ)),
     )
 
     reflectorless = False
@@ -61,6 +61,7 @@ def parse_bk_record(
         OccupiedPointID=oc_point_id,
         BacksightAngleDD=backsigt_angle,
         BacksightDistance=backsight_distance,
+        BacksightCircleDD=backsight_circle,
     ))
 
     return []
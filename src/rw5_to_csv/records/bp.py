@@ -13,10 +13,17 @@ def parse_bp_record(
     command_block: list[str],
     machine_state: MachineState,
 ) -> list[RW5Row]:
+    """Parse BP (base point) record and sets the base station for following GPS shots.
+
+    Ex:
+        `BP,PN967,LA45.153015028946,LN-66.034997236824,EL-10.4410,AG2.0000,PA0.1319,ATAPC,SRROVER,--`
+    """  # noqa: DOC201
     first_line_params = get_standard_record_params_dict(command_block[0].strip())
+    point_id = first_line_params["PN"]
 
+    machine_state.BasePointID = point_id
     return [RW5Row(
-        PointID=first_line_params["PN"],
+        PointID=point_id,
         Lat=float(first_line_params["LA"]),
         Lng=float(first_line_params["LN"]),
         Elevation=float(first_line_params["EL"]),
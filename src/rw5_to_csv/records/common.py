@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import datetime
 
+from rw5_to_csv.utils.dms import dms_to_dd
+
 
 def get_date_time(command_block: list[str], tzinfo: datetime.tzinfo) -> datetime.datetime | None:
     # e.g. --DT05-17-2024
@@ -40,3 +42,27 @@ def get_prism_applied(command_block: list[str]) -> str | None:
             continue
         prism = line.split("(", maxsplit=1)[-1].split(":", maxsplit=1)[0]
     return prism
+
+
+def get_data_collector(command_block: list[str]) -> str | None:
+    """Return the software that wrote the file, e.g. "SurvCE" from `--SurvCE Version 6.05`."""  # noqa: DOC201
+    for line in command_block:
+        stripped = line.strip()
+        if stripped.startswith("--") and " Version " in stripped:
+            return stripped.removeprefix("--").split(" Version ", maxsplit=1)[0]
+    return None
+
+
+def get_angles_and_distance(params: dict[str, str]) -> tuple[float, float, float] | None:
+    """Return `AR` and `ZE` in decimal degrees and `SD` of a BD or SS record.
+
+    Returns None if any is missing or malformed, e.g. a shot recorded with `AZ`
+    rather than `AR`, as these only feed residual analysis.
+    """  # noqa: DOC201
+    angle_right, zenith, slope_distance = params.get("AR"), params.get("ZE"), params.get("SD")
+    if angle_right is None or zenith is None or slope_distance is None:
+        return None
+    try:
+        return dms_to_dd(angle_right), dms_to_dd(zenith), float(slope_distance)
+    except ValueError:
+        return None
@@ -1,15 +1,26 @@
 from __future__ import annotations
 
+import calendar
 import datetime
-from decimal import Decimal
+import re
+from dataclasses import dataclass
 from logging import getLogger
+from typing import TYPE_CHECKING, Any
 
+from rw5_to_csv.diagnostics import MissingFieldError
 from rw5_to_csv.machine_state import MachineState
 from rw5_to_csv.records.common import get_date_time, get_standard_record_params_dict
-from rw5_to_csv.records.record import RW5Row
+from rw5_to_csv.records.record import LazyField, RW5Row
+from rw5_to_csv.utils.fixed_point import FixedPoint
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from rw5_to_csv.machine_state import GPSLayout
 
 logger = getLogger(__name__)
 
+SINGLE_LINE_STATS_START = "--HRMS:"
 HRMS_LINE_START = "--HRMS Avg:"
 VRMS_LINE_START = "--VRMS Avg:"
 NUM_SATELLITES_LINE_START = "--Number of Satellites Avg:"
@@ -19,260 +30,337 @@ VDOP_LINE_START = "--VDOP Avg:"
 PDOP_LINE_START = "--PDOP Avg:"
 FIXED_READINGS_LINE_START = "--Fixed Readings:"
 
-
-def _get_hrms_line_params(command_block: list[str]) -> dict[str, str] | None:
-    hrms_line_match = [
-        line for line in command_block if line.strip().startswith("--HRMS:")
-    ]
-    if len(hrms_line_match) > 0:
-        # Type A parsing.
-        hrms_line = hrms_line_match[0]
-        return {
-            param.split(":")[0]: param.split(":")[1].strip()
-            for param in hrms_line.strip().removeprefix("--").split(", ")
-        }
-    return None
-
-
-def _get_hrms(command_block: list[str]) -> float:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return float(hrms_line_params["HRMS"])
-
-    # Type B parsing.
-    logger.info("Type A parsing for HRMS failed, HRMS line not found. Trying Type B.")
-    hrms_line_match = [
-        line for line in command_block if line.strip().startswith(HRMS_LINE_START)
-    ]
-    if len(hrms_line_match) == 0:
-        msg = "HRMS line not found."
-        raise ValueError(msg)
-    """Parse HRMS Avg from line:
-        --HRMS Avg: 0.0058 SD: 0.0004 Min: 0.0048 Max: 0.0062
-        """
-    hrms_line = hrms_line_match[0].strip()
-    return float(
-        hrms_line[
-            len(HRMS_LINE_START) : hrms_line.find("SD:", len(HRMS_LINE_START))
-        ].strip(),
+MULTI_LINE_STATS_ENDS = {
+    HRMS_LINE_START: "SD:",
+    VRMS_LINE_START: "SD:",
+    NUM_SATELLITES_LINE_START: "Min:",
+    AGE_LINE_START: "Min:",
+    HDOP_LINE_START: "Min:",
+    VDOP_LINE_START: "Min:",
+    PDOP_LINE_START: "Min:",
+}
+"""Start of each multi-line statistic, and the text following its average.
+
+e.g. `--HRMS Avg: 0.0058 SD: 0.0004 Min: 0.0048 Max: 0.0062`
+"""
+
+SINGLE_LINE_STATS_KEYS = {
+    "HRMS": True,
+    "VRMS": True,
+    "STATUS": False,
+    "AGE": False,
+    "SATS": False,
+    "HDOP": True,
+    "VDOP": True,
+    "PDOP": True,
+    "TDOP": True,
+    "GDOP": True,
+}
+"""Single-line statistics in the order `_parse_single_line` reads them, and whether each is a number."""
+
+_NUMBER = re.compile(r"\s*[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?\s*")
+_AVERAGE_PATTERNS = {
+    line_start: re.compile(rf"{re.escape(line_start)}{_NUMBER.pattern}{re.escape(MULTI_LINE_STATS_ENDS[line_start])}")
+    for line_start in (HRMS_LINE_START, VRMS_LINE_START, HDOP_LINE_START, VDOP_LINE_START, PDOP_LINE_START)
+}
+"""Numeric multi-line statistics, matching when the average is a number."""
+_DATE_TIME = re.compile(
+    r"(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])-(\d{4})\s+(2[0-3]|[0-1]\d|\d):([0-5]\d|\d):(6[0-1]|[0-5]\d|\d)",
+)
+"""What `strptime` accepts for `%m-%d-%Y %H:%M:%S`."""
+
+DATA_COLLECTOR_GPS_LAYOUTS: dict[str, GPSLayout] = {
+    "SurvCE": "single-line",
+    "SurvPC": "multi-line",
+}
+
+
+@dataclass
+class GPSStats:
+    """Quality statistics of a GPS shot."""
+
+    HRMS: float
+    VRMS: float
+    Status: str | None = None
+    Age: str | None = None
+    NumSatellites: str | None = None
+    HDOP: float | None = None
+    VDOP: float | None = None
+    PDOP: float | None = None
+    TDOP: float | None = None
+    GDOP: float | None = None
+
+
+def _parse_single_line(stats_line: str) -> GPSStats:
+    """Parse `--HRMS:0.011, VRMS:0.024, STATUS:FIXED, SATS:15, AGE:2.0, PDOP:1.598, ...`."""  # noqa: DOC201
+    params = {}
+    for param in stats_line.removeprefix("--").split(", "):
+        name, _, value = param.partition(":")
+        params[name] = value.strip()
+    return GPSStats(
+        HRMS=float(params["HRMS"]),
+        VRMS=float(params["VRMS"]),
+        Status=params["STATUS"],
+        Age=params["AGE"],
+        NumSatellites=params["SATS"],
+        HDOP=float(params["HDOP"]),
+        VDOP=float(params["VDOP"]),
+        PDOP=float(params["PDOP"]),
+        TDOP=float(params["TDOP"]),
+        GDOP=float(params["GDOP"]),
     )
 
 
-def _get_vrms(command_block: list[str]) -> float:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return float(hrms_line_params["VRMS"])
-
-    # Type B parsing.
-    logger.info("Type A parsing for VRMS failed, VRMS line not found. Trying Type B.")
-    vrms_line_match = [
-        line for line in command_block if line.strip().startswith(VRMS_LINE_START)
-    ]
-    if len(vrms_line_match) == 0:
-        msg = "VRMS line not found."
-        raise ValueError(msg)
-    """Parse VRMS Avg from line:
-        --VRMS Avg: 0.0058 SD: 0.0004 Min: 0.0048 Max: 0.0062
-        """
-    vrms_line = vrms_line_match[0].strip()
-    return float(
-        vrms_line[
-            len(VRMS_LINE_START) : vrms_line.find("SD:", len(VRMS_LINE_START))
-        ].strip(),
-    )
-
-
-def _get_status(command_block: list[str]) -> str | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return hrms_line_params["STATUS"]
+def _parse_single_line_stats(command_block: Sequence[str]) -> GPSStats | None:
+    """Parse SurvCE statistics, or return None if the block has no single-line statistics."""  # noqa: DOC201
+    for line in command_block:
+        stripped = line.strip()
+        if stripped.startswith(SINGLE_LINE_STATS_START):
+            return _parse_single_line(stripped)
     return None
 
 
-def _get_number_of_satellites(command_block: list[str]) -> str | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return hrms_line_params["SATS"]
-
-    sats_line_match = [
-        line for line in command_block if line.strip().startswith(NUM_SATELLITES_LINE_START)
-    ]
-    if len(sats_line_match) == 0:
-        return None
-
-    sats_line = sats_line_match[0].strip()
-    return (
-        sats_line[
-            len(NUM_SATELLITES_LINE_START) : sats_line.find("Min:", len(NUM_SATELLITES_LINE_START))
-        ].strip()
-    )
-
-
-def _get_age_of_corrections(command_block: list[str]) -> str | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return hrms_line_params["AGE"]
-
-    age_line_match = [
-        line for line in command_block if line.strip().startswith(AGE_LINE_START)
-    ]
-    if len(age_line_match) == 0:
-        return None
-
-    age_line = age_line_match[0].strip()
-    return (
-        age_line[
-            len(AGE_LINE_START) : age_line.find("Min:", len(AGE_LINE_START))
-        ].strip()
-    )
-
-
-def _get_hdop(command_block: list[str]) -> float | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return float(hrms_line_params["HDOP"])
-
-    # Type B parsing.
-    logger.info("Type A parsing for HDOP failed, HDOP line not found. Trying Type B.")
-    hdop_line_match = [
-        line for line in command_block if line.strip().startswith(HDOP_LINE_START)
-    ]
-    if len(hdop_line_match) == 0:
-        logger.info(
-            "Type B parsing for HDOP failed, HDOP line not found. Returning None.",
-        )
-        return None
-    """Parse HDOP Avg from line:
-        --HDOP Avg: 0.0058 Min: 0.0048 Max: 0.0062
-        """
-    hdop_line = hdop_line_match[0].strip()
-    return float(
-        hdop_line[
-            len(HDOP_LINE_START) : hdop_line.find("Min:", len(HDOP_LINE_START))
-        ].strip(),
-    )
-
-
-def _get_vdop(command_block: list[str]) -> float | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return float(hrms_line_params["VDOP"])
-
-    # Type B parsing.
-    logger.info("Type A parsing for VDOP failed, VDOP line not found. Trying Type B.")
-    vdop_line_match = [
-        line for line in command_block if line.strip().startswith(VDOP_LINE_START)
-    ]
-    if len(vdop_line_match) == 0:
-        logger.info(
-            "Type B parsing for VDOP failed, VDOP line not found. Returning None.",
-        )
+def _parse_multi_line_stats(command_block: Sequence[str]) -> GPSStats | None:
+    """Parse SurvPC statistics in one pass, or return None if the block has no `--HRMS Avg:` line.
+
+    SurvPC also writes a single-line summary after stakeout shots, which takes
+    precedence as it carries the fix status.
+    """  # noqa: DOC201, DOC501
+    averages: dict[str, str] = {}
+    for line in command_block:
+        stripped = line.strip()
+        if not stripped.startswith("--"):
+            continue
+        if stripped.startswith(SINGLE_LINE_STATS_START):
+            return _parse_single_line(stripped)
+        for line_start, average_end in MULTI_LINE_STATS_ENDS.items():
+            if stripped.startswith(line_start):
+                if line_start not in averages:
+                    averages[line_start] = stripped[len(line_start) : stripped.find(average_end, len(line_start))].strip()
+                break
+
+    if HRMS_LINE_START not in averages:
         return None
-    """Parse VDOP Avg from line:
-        --VDOP Avg: 0.0058 Min: 0.0048 Max: 0.0062
-        """
-    vdop_line = vdop_line_match[0].strip()
-    return float(
-        vdop_line[
-            len(VDOP_LINE_START) : vdop_line.find("Min:", len(VDOP_LINE_START))
-        ].strip(),
+    if VRMS_LINE_START not in averages:
+        raise MissingFieldError("VRMS")
+
+    def dop(line_start: str) -> float | None:
+        return float(averages[line_start]) if line_start in averages else None
+
+    return GPSStats(
+        HRMS=float(averages[HRMS_LINE_START]),
+        VRMS=float(averages[VRMS_LINE_START]),
+        Age=averages.get(AGE_LINE_START),
+        NumSatellites=averages.get(NUM_SATELLITES_LINE_START),
+        HDOP=dop(HDOP_LINE_START),
+        VDOP=dop(VDOP_LINE_START),
+        PDOP=dop(PDOP_LINE_START),
     )
 
 
-def _get_pdop(command_block: list[str]) -> float | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return float(hrms_line_params["PDOP"])
-
-    # Type B parsing.
-    logger.info("Type A parsing for PDOP failed, PDOP line not found. Trying Type B.")
-    pdop_line_match = [
-        line for line in command_block if line.strip().startswith(PDOP_LINE_START)
-    ]
-    if len(pdop_line_match) == 0:
-        logger.info(
-            "Type B parsing for PDOP failed, PDOP line not found. Returning None.",
-        )
-        return None
-    """Parse PDOP Avg from line:
-        --PDOP Avg: 0.0058 Min: 0.0048 Max: 0.0062
-        """
-    pdop_line = pdop_line_match[0].strip()
-    return float(
-        pdop_line[
-            len(PDOP_LINE_START) : pdop_line.find("Min:", len(PDOP_LINE_START))
-        ].strip(),
-    )
-
-
-def _get_tdop(command_block: list[str]) -> float | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return float(hrms_line_params["TDOP"])
-    return None
-
-
-def _get_gdop(command_block: list[str]) -> float | None:
-    hrms_line_params = _get_hrms_line_params(command_block)
-    if hrms_line_params:
-        # Type A parsing.
-        return float(hrms_line_params["GDOP"])
-    return None
+GPS_STATS_PARSERS: dict[GPSLayout, Callable[[Sequence[str]], GPSStats | None]] = {
+    "single-line": _parse_single_line_stats,
+    "multi-line": _parse_multi_line_stats,
+}
+
+
+def detect_gps_layout(command_block: Sequence[str], data_collector: str | None = None) -> GPSLayout:
+    """Return the statistics layout of a GPS record, or the data collector's usual one if it has none."""  # noqa: DOC201
+    for line in command_block:
+        stripped = line.strip()
+        if stripped.startswith(SINGLE_LINE_STATS_START):
+            return "single-line"
+        if stripped.startswith(HRMS_LINE_START):
+            # single-line statistics may still follow SurvPC's averages
+            return "multi-line"
+    return DATA_COLLECTOR_GPS_LAYOUTS.get(data_collector or "", "single-line")
+
+
+def parse_gps_stats(command_block: Sequence[str], layout: GPSLayout) -> GPSStats:
+    """Parse a GPS record's statistics with the parser for the file's layout.
+
+    Falls back to the other layout for blocks that don't match, e.g. a file
+    that switched data collectors. Raises MissingFieldError if neither matches.
+    """  # noqa: DOC201, DOC501
+    stats = GPS_STATS_PARSERS[layout](command_block)
+    if stats is None:
+        fallback = "multi-line" if layout == "single-line" else "single-line"
+        stats = GPS_STATS_PARSERS[fallback](command_block)
+    if stats is None:
+        raise MissingFieldError("HRMS")
+    return stats
+
+
+def _gps_layout(command_block: Sequence[str], machine_state: MachineState) -> GPSLayout:
+    if machine_state.GPSLayout is None:
+        machine_state.GPSLayout = detect_gps_layout(command_block, machine_state.DataCollector)
+        logger.debug("Parsing %s GPS statistics.", machine_state.GPSLayout)
+    return machine_state.GPSLayout
+
+
+def _check_gps_block(command_block: Sequence[str]) -> None:
+    """Check, without parsing values, that the statistics and timestamp of a block would parse.
+
+    Raises what `parse_gps_stats` and `get_date_time` would, so lazy rows skip
+    the records eager parsing skips. Whichever layout the file uses, a
+    single-line statistics line takes precedence over multi-line averages.
+    """  # noqa: DOC501
+    single_line = date_line = time_line = None
+    averages: dict[str, str] = {}
+    for line in command_block:
+        stripped = line.strip()
+        if not stripped.startswith("--"):
+            continue
+        if stripped.startswith(SINGLE_LINE_STATS_START):
+            single_line = single_line or stripped
+        elif stripped.startswith("--DT"):
+            date_line = date_line or stripped
+        elif stripped.startswith("--TM"):
+            time_line = time_line or stripped
+        else:
+            line_start = next((start for start in _AVERAGE_PATTERNS if stripped.startswith(start)), None)
+            if line_start is not None:
+                averages.setdefault(line_start, stripped)
+
+    if single_line is not None:
+        params = dict(param.partition(":")[::2] for param in single_line.removeprefix("--").split(", "))
+        for key, is_number in SINGLE_LINE_STATS_KEYS.items():
+            value = params[key]
+            if is_number and not _NUMBER.fullmatch(value):
+                msg = f"could not convert string to float: {value.strip()!r}"
+                raise ValueError(msg)
+    else:
+        for line_start, field_name in ((HRMS_LINE_START, "HRMS"), (VRMS_LINE_START, "VRMS")):
+            if line_start not in averages:
+                raise MissingFieldError(field_name)
+        for line_start, average_line in averages.items():
+            if not _AVERAGE_PATTERNS[line_start].match(average_line):
+                end = average_line.find(MULTI_LINE_STATS_ENDS[line_start], len(line_start))
+                msg = f"could not convert string to float: {average_line[len(line_start) : end].strip()!r}"
+                raise ValueError(msg)
+
+    if date_line and time_line:
+        date_time = f"{date_line.removeprefix('--DT')} {time_line.removeprefix('--TM')}"
+        match = _DATE_TIME.fullmatch(date_time)
+        if match is None:
+            msg = f"time data {date_time!r} does not match format '%m-%d-%Y %H:%M:%S'"
+            raise ValueError(msg)
+        month, day, year, _, _, second = map(int, match.groups())
+        if day > calendar.monthrange(year, month)[1] or second > 59:  # noqa: PLR2004
+            msg = f"time data {date_time!r} is out of range"
+            raise ValueError(msg)
+
+
+def _stats_field(name: str) -> LazyField:
+    """Lazy `GPSStats` field; reading any one of them caches them all on the row."""  # noqa: DOC201
+
+    def parse(row: LazyGPSRow) -> Any:  # noqa: ANN401
+        stats = parse_gps_stats(row.command_block, row.gps_layout)
+        row.__dict__.update(vars(stats))
+        return getattr(stats, name)
+
+    return LazyField(parse)
+
+
+class LazyGPSRow(RW5Row):
+    """GPS row that keeps its command block and parses fields the first time they are read.
+
+    Only `PointID`, `Note` and `RW5RecordType` are parsed up front. The block is
+    checked with `_check_gps_block` first, so records eager parsing would skip
+    are skipped too.
+    """
+
+    Lat = LazyField(lambda row: float(row.first_line_params["LA"]))
+    Lng = LazyField(lambda row: float(row.first_line_params["LN"]))
+    Elevation = LazyField(lambda row: float(row.first_line_params["EL"]))
+    LocalX = LazyField(lambda row: FixedPoint.from_text(row.second_line_params["E "]))
+    LocalY = LazyField(lambda row: FixedPoint.from_text(row.second_line_params["N "]))
+    LocalZ = LazyField(lambda row: FixedPoint.from_text(row.second_line_params["EL"]))
+    HRMS = _stats_field("HRMS")
+    VRMS = _stats_field("VRMS")
+    Status = _stats_field("Status")
+    Age = _stats_field("Age")
+    NumSatellites = _stats_field("NumSatellites")
+    HDOP = _stats_field("HDOP")
+    VDOP = _stats_field("VDOP")
+    PDOP = _stats_field("PDOP")
+    TDOP = _stats_field("TDOP")
+    GDOP = _stats_field("GDOP")
+    DateTime = LazyField(lambda row: get_date_time(row.command_block, row.tzinfo))
+    second_line_params = LazyField(lambda row: get_standard_record_params_dict(row.command_block[1].strip()))
+    """Params of the `--GS` line holding grid coordinates."""
+
+    def __init__(
+        self,
+        command_block: list[str],
+        first_line_params: dict[str, str],
+        tzinfo: datetime.tzinfo,
+        gps_layout: GPSLayout,
+    ) -> None:
+        self.command_block = tuple(command_block)
+        self.first_line_params = first_line_params
+        self.tzinfo = tzinfo
+        self.gps_layout = gps_layout
+        self.PointID = first_line_params["PN"]
+        self.Note = first_line_params["--"]
+        self.RW5RecordType = "GPS"
+
+
+def _skip(machine_state: MachineState, first_line_params: dict[str, str], reason: str, field_name: str | None = None) -> None:
+    machine_state.Diagnostics.add("GPS", machine_state.LineNumber, reason, field_name, first_line_params.get("PN"))
+    logger.debug("Skipping GPS record at line %s: %s", machine_state.LineNumber, reason)
+
+
+def _set_base_point(point_id: str, machine_state: MachineState) -> None:
+    if machine_state.BasePointID is not None:
+        machine_state.GPSIDBasePointID[point_id] = machine_state.BasePointID
 
 
 def parse_gps_record(
     command_block: list[str],
     machine_state: MachineState,
 ) -> list[RW5Row]:
-    logger.debug(command_block)
-
     first_line_params = get_standard_record_params_dict(command_block[0].strip())
-    second_line_params = get_standard_record_params_dict(command_block[1].strip())
 
     # get hrms, vrms, and fixed status
+    layout = _gps_layout(command_block, machine_state)
+    tzinfo = machine_state.tzinfo or datetime.UTC
     try:
-        hrms = _get_hrms(command_block)
-        vrms = _get_vrms(command_block)
-        status = _get_status(command_block)
-        hdop = _get_hdop(command_block)
-        vdop = _get_vdop(command_block)
-        pdop = _get_pdop(command_block)
-        tdop = _get_tdop(command_block)
-        gdop = _get_gdop(command_block)
-        num_sats = _get_number_of_satellites(command_block)
-        age = _get_age_of_corrections(command_block)
-        dt = get_date_time(command_block, machine_state.tzinfo or datetime.UTC)
-    except ValueError:
-        logger.exception("Skipping record.")
+        if machine_state.LazyRows:
+            _check_gps_block(command_block)
+        else:
+            stats = parse_gps_stats(command_block, layout)
+            dt = get_date_time(command_block, tzinfo)
+    except MissingFieldError as e:
+        _skip(machine_state, first_line_params, str(e), e.Field)
+        return []
+    except ValueError as e:
+        _skip(machine_state, first_line_params, str(e))
         return []
 
+    _set_base_point(first_line_params["PN"], machine_state)
+    if machine_state.LazyRows:
+        return [LazyGPSRow(command_block, first_line_params, tzinfo, layout)]
+
+    second_line_params = get_standard_record_params_dict(command_block[1].strip())
     return [RW5Row(
         PointID=first_line_params["PN"],
         Lat=float(first_line_params["LA"]),
         Lng=float(first_line_params["LN"]),
         Elevation=float(first_line_params["EL"]),
-        LocalX=Decimal(second_line_params["E "]),
-        LocalY=Decimal(second_line_params["N "]),
-        LocalZ=Decimal(second_line_params["EL"]),
-        HRMS=hrms,
-        VRMS=vrms,
-        HDOP=hdop,
-        VDOP=vdop,
-        PDOP=pdop,
-        TDOP=tdop,
-        GDOP=gdop,
-        Status=status,
-        NumSatellites=num_sats,
-        Age=age,
+        LocalX=FixedPoint.from_text(second_line_params["E "]),
+        LocalY=FixedPoint.from_text(second_line_params["N "]),
+        LocalZ=FixedPoint.from_text(second_line_params["EL"]),
+        HRMS=stats.HRMS,
+        VRMS=stats.VRMS,
+        HDOP=stats.HDOP,
+        VDOP=stats.VDOP,
+        PDOP=stats.PDOP,
+        TDOP=stats.TDOP,
+        GDOP=stats.GDOP,
+        Status=stats.Status,
+        NumSatellites=stats.NumSatellites,
+        Age=stats.Age,
         Note=first_line_params["--"],
         RW5RecordType="GPS",
         DateTime=dt,
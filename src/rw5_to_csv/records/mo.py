@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from rw5_to_csv.machine_state import MachineState
+from rw5_to_csv.records.common import get_data_collector
+from rw5_to_csv.records.record import RW5Row
+
+
+def parse_mo_record(
+    command_block: list[str],
+    machine_state: MachineState,
+) -> list[RW5Row]:
+    """Parse MO record and set the data collector, whose GPS statistics layout the GPS parser expects first.
+
+    Ex:
+        `MO,AD0,UN1,SF1.00000000,EC0,EO0.0,AU0`
+        `--SurvPC Version 6.08`
+    """  # noqa: DOC201
+    machine_state.DataCollector = get_data_collector(command_block) or machine_state.DataCollector
+    return []
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from decimal import Decimal
 from logging import getLogger
 
 from rw5_to_csv.machine_state import MachineState
 from rw5_to_csv.records.common import get_standard_record_params_dict
 from rw5_to_csv.records.record import RW5Row
+from rw5_to_csv.utils.fixed_point import FixedPoint
 
 logger = getLogger(__name__)
 
@@ -22,12 +22,15 @@ def parse_oc_record(
     first_line_params = get_standard_record_params_dict(command_block[0].strip())
     point_id = first_line_params["OP"]
 
-    machine_state.OccupiedPointID = point_id
-    return [RW5Row(
+    row = RW5Row(
         PointID=point_id,
-        LocalX=Decimal(first_line_params["E "]),
-        LocalY=Decimal(first_line_params["N "]),
-        LocalZ=Decimal(first_line_params["EL"]),
+        LocalX=FixedPoint.from_text(first_line_params["E "]),
+        LocalY=FixedPoint.from_text(first_line_params["N "]),
+        LocalZ=FixedPoint.from_text(first_line_params["EL"]),
         Note=first_line_params["--"],
         RW5RecordType="OC",
-    )]
+    )
+
+    machine_state.OccupiedPointID = point_id
+    machine_state.OccupiedPoints[point_id] = row
+    return [row]
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import datetime
-from dataclasses import dataclass
-from decimal import Decimal
+from dataclasses import dataclass, fields
+from typing import Any, Callable
+
+from rw5_to_csv.utils.fixed_point import FixedPoint
 
 
 @dataclass
@@ -15,9 +17,10 @@ class RW5Row:
     Lat: float | None = None
     Lng: float | None = None
     Elevation: float | None = None
-    LocalX: Decimal | None = None
-    LocalY: Decimal | None = None
-    LocalZ: Decimal | None = None
+    LocalX: FixedPoint | None = None
+    """Exact, at the precision the RW5 or CRDB file carries."""
+    LocalY: FixedPoint | None = None
+    LocalZ: FixedPoint | None = None
     HRMS: float | None = None
     VRMS: float | None = None
     Status: str | None = None
@@ -42,3 +45,37 @@ class RW5Row:
     """Set by machine state."""
     PrismApplied: str | None = None
     """Set by machine state."""
+
+
+ROW_FIELD_NAMES = tuple(field.name for field in fields(RW5Row))
+
+
+class LazyField:
+    """Descriptor for an `RW5Row` field that is parsed from raw record text the first time it is read.
+
+    The parsed value is cached in the row's `__dict__`, which then shadows the
+    descriptor, so later reads cost nothing and assigning to the field replaces it as usual.
+    """
+
+    def __init__(self, parse: Callable[[Any], Any]) -> None:
+        self.parse = parse
+        self.name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, row: Any, owner: type | None = None) -> Any:  # noqa: ANN401
+        if row is None:
+            return self
+        value = row.__dict__[self.name] = self.parse(row)
+        return value
+
+
+def row_dict(row: RW5Row) -> dict[str, Any]:
+    """Return the fields of `row` by name, parsing lazy ones, without `asdict`'s deep copies."""  # noqa: DOC201
+    return {name: getattr(row, name) for name in ROW_FIELD_NAMES}
+
+
+def materialize_row(row: RW5Row) -> RW5Row:
+    """Return a plain `RW5Row` with every field of `row` parsed."""  # noqa: DOC201
+    return RW5Row(**row_dict(row))
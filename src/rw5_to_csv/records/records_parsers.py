@@ -3,10 +3,12 @@ from __future__ import annotations
 from collections.abc import Callable
 from typing import TYPE_CHECKING
 
+from rw5_to_csv.records.bd import parse_bd_record
 from rw5_to_csv.records.bk import parse_bk_record
 from rw5_to_csv.records.bp import parse_bp_record
 from rw5_to_csv.records.gps import parse_gps_record
 from rw5_to_csv.records.ls import parse_ls_record
+from rw5_to_csv.records.mo import parse_mo_record
 from rw5_to_csv.records.oc import parse_oc_record
 from rw5_to_csv.records.sp import parse_sp_record
 from rw5_to_csv.records.ss import parse_ss_record
@@ -23,4 +25,22 @@ RECORD_CSV_PARSERS: dict[str, Callable[[list[str], MachineState], list[RW5Row]]]
     "OC": parse_oc_record,
     "SP": parse_sp_record,
     "BK": parse_bk_record,
+    "BD": parse_bd_record,
+    "MO": parse_mo_record,
 }
+
+STATEFUL_RECORD_TYPES = {"LS", "OC", "BK", "BD", "BP", "MO"}
+"""Records whose parsers change machine state, so they are parsed even when filtered out."""
+
+RECORD_LOOKBACK: dict[str, int] = {
+    "LS": 1,  # GPS LS records read the rover HR from the previous command block
+}
+"""Number of previously processed command blocks each parser reads from `MachineState.ProcessedCommandBlocks`.
+
+Parsers not listed here need no lookback.
+"""
+
+
+def get_command_block_lookback() -> int:
+    """Return the number of processed command blocks any parser needs to look back on."""  # noqa: DOC201
+    return max(RECORD_LOOKBACK.values(), default=0)
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from decimal import Decimal
 from logging import getLogger
 
 from rw5_to_csv.machine_state import MachineState
 from rw5_to_csv.records.common import get_standard_record_params_dict
 from rw5_to_csv.records.record import RW5Row
+from rw5_to_csv.utils.fixed_point import FixedPoint
 
 logger = getLogger(__name__)
 
@@ -24,9 +24,9 @@ def parse_sp_record(
     return_rows = [
         RW5Row(
             PointID=first_line_params["PN"],
-            LocalX=Decimal(first_line_params["E "]),
-            LocalY=Decimal(first_line_params["N "]),
-            LocalZ=Decimal(first_line_params["EL"]),
+            LocalX=FixedPoint.from_text(first_line_params["E "]),
+            LocalY=FixedPoint.from_text(first_line_params["N "]),
+            LocalZ=FixedPoint.from_text(first_line_params["EL"]),
             Note=first_line_params["--"],
             RW5RecordType="SP",
         ),
@@ -3,7 +3,8 @@ from __future__ import annotations
 import datetime
 from typing import TYPE_CHECKING
 
-from rw5_to_csv.records.common import get_date_time, get_standard_record_params_dict
+from rw5_to_csv.machine_state import AngleObservation
+from rw5_to_csv.records.common import get_angles_and_distance, get_date_time, get_standard_record_params_dict
 from rw5_to_csv.records.record import RW5Row
 from rw5_to_csv.utils.crdb import get_crdb_point
 
@@ -40,7 +41,7 @@ def parse_ss_record(
     # assert machine state
     assert len(machine_state.Backsights) > 0
     current_backsight = machine_state.Backsights[-1]
-    occupied_point = machine_state.Records[current_backsight.OccupiedPointID]
+    occupied_point = machine_state.OccupiedPoints[current_backsight.OccupiedPointID]
 
     first_line_params = get_standard_record_params_dict(command_block[0])
     dt = get_date_time(command_block, machine_state.tzinfo or datetime.UTC)
@@ -60,5 +61,19 @@ def parse_ss_record(
 
     # add sideshot to sideshot to occupied point dict
     machine_state.SideshotIDOccupiedPointID[point_id] = occupied_point.PointID
+    angles_and_distance = get_angles_and_distance(first_line_params)
+    if angles_and_distance is not None:
+        angle_right, zenith, _ = angles_and_distance
+        machine_state.Observations.append(AngleObservation(
+            RecordType="SS",
+            OccupiedPointID=occupied_point.PointID,
+            ForesightPointID=point_id,
+            AngleRightDD=angle_right,
+            ZenithDD=zenith,
+            SlopeDistance=sd,
+            InstrumentHeight=machine_state.HI,
+            RodHeight=machine_state.HR,
+            Backsight=current_backsight,
+        ))
 
     return [record]
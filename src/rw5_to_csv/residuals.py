@@ -0,0 +1,142 @@
+"""Residuals of BD and SS observations against the coordinates of the points they measure.
+
+Every observation of a job is reduced in one NumPy batch: the measured angle
+right, zenith angle and slope distance are compared with the azimuth, zenith
+angle and distances computed from the occupied point (OC) and the CRDB
+coordinates of the target, then split per total station station.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from rw5_to_csv.total_station import get_total_station_stations
+from rw5_to_csv.utils.crdb import get_crdb_coordinates
+from rw5_to_csv.utils.fixed_point import to_float_array
+
+if TYPE_CHECKING:
+    from rw5_to_csv.machine_state import MachineState
+
+DEFAULT_HORIZONTAL_TOLERANCE = 0.02
+"""Metres of horizontal distance or lateral residual beyond which an observation is a blunder."""
+DEFAULT_VERTICAL_TOLERANCE = 0.03
+"""Metres of height residual beyond which an observation is a blunder."""
+
+
+@dataclass
+class StationResiduals:
+    """Measured minus computed values of every BD and SS observation from one occupied point."""
+
+    OccupiedPointID: str
+    PointIDs: list[str]
+    RecordTypes: list[str]
+    """"BD" or "SS" for each observation."""
+    HorizontalDistance: np.ndarray
+    """Metres."""
+    HeightDifference: np.ndarray
+    """Metres, of the target point above the occupied point, allowing for instrument and rod heights."""
+    SlopeDistance: np.ndarray
+    """Metres."""
+    AngleSeconds: np.ndarray
+    """Arc seconds of azimuth, wrapped to ±648000."""
+    Lateral: np.ndarray
+    """Metres across the line of sight the angle residual amounts to at the target."""
+    Flagged: np.ndarray
+    """True for blunders, observations with a residual beyond tolerance."""
+
+    def flagged_point_ids(self) -> list[str]:
+        """Return the point ids of blunders."""  # noqa: DOC201
+        return [self.PointIDs[i] for i in np.flatnonzero(self.Flagged)]
+
+
+def analyze_station_residuals(
+    machine: MachineState,
+    horizontal_tolerance: float = DEFAULT_HORIZONTAL_TOLERANCE,
+    vertical_tolerance: float = DEFAULT_VERTICAL_TOLERANCE,
+) -> list[StationResiduals]:
+    """Compute residuals of every BD and SS observation, per station of `get_total_station_stations`.
+
+    Observations whose target isn't in the CRDB are left out. Requires a CRDB file.
+    """  # noqa: DOC201, DOC501
+    if not machine.crdb_path:
+        msg = "CRDB file required for totalstation data."
+        raise ValueError(msg)
+
+    stations = {station.OccupiedPoint.PointID: station for station in get_total_station_stations(machine)}
+    targets = get_crdb_coordinates(
+        (observation.ForesightPointID for observation in machine.Observations),
+        machine.crdb_path,
+    )
+    observations = [
+        observation for observation in machine.Observations
+        if observation.OccupiedPointID in stations
+        and observation.ForesightPointID in targets
+        and observation.Backsight is not None
+    ]
+    if not observations:
+        return []
+
+    def column(values: list[float | None]) -> np.ndarray:
+        return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+    occupied = [stations[observation.OccupiedPointID].OccupiedPoint for observation in observations]
+    occupied_e = to_float_array([point.LocalX for point in occupied])
+    occupied_n = to_float_array([point.LocalY for point in occupied])
+    occupied_z = to_float_array([point.LocalZ for point in occupied])
+    target = np.array([targets[observation.ForesightPointID] for observation in observations], dtype=float)
+    instrument_height = np.nan_to_num(column([observation.InstrumentHeight for observation in observations]))
+    rod_height = np.nan_to_num(column([observation.RodHeight for observation in observations]))
+    angle_right = column([observation.AngleRightDD for observation in observations])
+    zenith = np.radians(column([observation.ZenithDD for observation in observations]))
+    slope_distance = column([observation.SlopeDistance for observation in observations])
+    backsight_azimuth = column([observation.Backsight.BacksightAngleDD for observation in observations])
+    backsight_circle = column([observation.Backsight.BacksightCircleDD for observation in observations])
+
+    # computed from coordinates
+    d_e = target[:, 0] - occupied_e
+    d_n = target[:, 1] - occupied_n
+    d_z = target[:, 2] - occupied_z
+    computed_hd = np.hypot(d_e, d_n)
+    computed_sd = np.sqrt(computed_hd**2 + (d_z + rod_height - instrument_height) ** 2)
+    computed_azimuth = np.degrees(np.arctan2(d_e, d_n))
+
+    # measured
+    measured_hd = slope_distance * np.sin(zenith)
+    measured_dz = slope_distance * np.cos(zenith) + instrument_height - rod_height
+    measured_azimuth = backsight_azimuth + angle_right - backsight_circle
+
+    angle = (measured_azimuth - computed_azimuth + 180) % 360 - 180
+    horizontal = measured_hd - computed_hd
+    height = measured_dz - d_z
+    lateral = computed_hd * np.sin(np.radians(angle))
+    flagged = (
+        (np.abs(horizontal) > horizontal_tolerance)
+        | (np.abs(lateral) > horizontal_tolerance)
+        | (np.abs(height) > vertical_tolerance)
+    )
+
+    station_ids = np.array([observation.OccupiedPointID for observation in observations])
+    order = np.argsort(station_ids, kind="stable")
+    splits = np.flatnonzero(station_ids[order][1:] != station_ids[order][:-1]) + 1
+    indices_by_station = {str(station_ids[indices[0]]): indices for indices in np.split(order, splits)}
+
+    results = []
+    for occupied_point_id in stations:
+        indices = indices_by_station.get(occupied_point_id)
+        if indices is None:
+            continue
+        results.append(StationResiduals(
+            OccupiedPointID=occupied_point_id,
+            PointIDs=[observations[i].ForesightPointID for i in indices],
+            RecordTypes=[observations[i].RecordType for i in indices],
+            HorizontalDistance=horizontal[indices],
+            HeightDifference=height[indices],
+            SlopeDistance=slope_distance[indices] - computed_sd[indices],
+            AngleSeconds=angle[indices] * 3600,
+            Lateral=lateral[indices],
+            Flagged=flagged[indices],
+        ))
+    return results
@@ -0,0 +1,239 @@
+"""Streaming output sinks fed by `convert()` as rows are produced.
+
+Sinks see rows in the order they are parsed. When a point id is shot again, the
+sink is told about the overwrite and then receives the new row with
+`Overwritten` set, so consumers that need the final view keep the last row per
+point id. The CSV written by `convert(output_path=...)` is still the resolved view.
+"""
+
+from __future__ import annotations
+
+import csv
+import datetime
+import json
+import re
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, Literal, TextIO
+
+from rw5_to_csv.records.record import RW5Row
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+    from types import TracebackType
+
+    from rw5_to_csv.machine_state import BacksightRow
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+"""Bytes buffered by file sinks before writing to disk."""
+SHARD_BUFFER_SIZE = 1 << 13
+"""Bytes buffered per open shard, smaller as many shards may be open at once."""
+DEFAULT_MAX_OPEN_SHARDS = 128
+UNASSIGNED_SHARD = "unassigned"
+"""Shard of rows without a key, e.g. GPS rows when sharding by station."""
+
+ShardBy = Literal["station", "date", "instrument"]
+
+
+class RecordSink:
+    """Receives rows, overwrite events and backsights as `convert()` produces them.
+
+    Override the events a sink cares about, the defaults do nothing.
+    """
+
+    def write_row(self, row: RW5Row) -> None:
+        """Receive a row, after machine state fields have been set on it."""
+
+    def write_overwrite(self, old_row: RW5Row, new_row: RW5Row) -> None:
+        """Receive notice that `new_row` replaces `old_row`. Called before `write_row(new_row)`."""
+
+    def write_backsight(self, backsight: BacksightRow) -> None:
+        """Receive a backsight parsed from a BK record."""
+
+    def close(self) -> None:
+        """Flush and release any resources. Called by `convert()` once the file is done."""
+
+    def __enter__(self) -> RecordSink:  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def _json_default(value: Any) -> Any:  # noqa: ANN401
+    # exact text for fixed point coordinates, ISO 8601 for datetimes
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class CSVSink(RecordSink):
+    """Stream rows to a CSV file with the same columns as `convert()` output."""
+
+    def __init__(self, path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        self._file = path.open("w", buffering=buffer_size)
+        self._writer = csv.DictWriter(
+            self._file,
+            fieldnames=RW5Row.__annotations__.keys(),
+            delimiter=",",
+            lineterminator="\n",
+        )
+        self._writer.writeheader()
+
+    def write_row(self, row: RW5Row) -> None:  # noqa: D102
+        self._writer.writerow(asdict(row))
+
+    def close(self) -> None:  # noqa: D102
+        self._file.close()
+
+
+class JSONLinesSink(RecordSink):
+    """Stream rows to a JSON Lines file, one JSON object per row."""
+
+    def __init__(self, path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        self._file = path.open("w", buffering=buffer_size)
+
+    def write_row(self, row: RW5Row) -> None:  # noqa: D102
+        self._file.write(json.dumps(asdict(row), default=_json_default))
+        self._file.write("\n")
+
+    def close(self) -> None:  # noqa: D102
+        self._file.close()
+
+
+class GeoJSONSink(RecordSink):
+    """Stream rows to a GeoJSON FeatureCollection.
+
+    Rows with `Lat`/`Lng` become Point features. Rows with only local coordinates,
+    such as SS and OC, have a null geometry since GeoJSON positions are WGS84.
+    """
+
+    def __init__(self, path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        self._file = path.open("w", buffering=buffer_size)
+        self._file.write('{"type": "FeatureCollection", "features": [\n')
+        self._first = True
+
+    def write_row(self, row: RW5Row) -> None:  # noqa: D102
+        geometry = None
+        if row.Lat is not None and row.Lng is not None:
+            coordinates = [row.Lng, row.Lat]
+            if row.Elevation is not None:
+                coordinates.append(row.Elevation)
+            geometry = {"type": "Point", "coordinates": coordinates}
+        feature = {
+            "type": "Feature",
+            "id": row.PointID,
+            "geometry": geometry,
+            "properties": asdict(row),
+        }
+        if not self._first:
+            self._file.write(",\n")
+        self._first = False
+        self._file.write(json.dumps(feature, default=_json_default))
+
+    def close(self) -> None:  # noqa: D102
+        self._file.write("\n]}\n")
+        self._file.close()
+
+
+class ShardedCSVSink(RecordSink):
+    """Route each row to a CSV file per shard key in one pass, e.g. one file per OC station.
+
+    `shard_by` is "station" (the OC an SS row was shot from, or an OC row's own
+    point), "date" (local date of `DateTime`), "instrument" (`InstrumentType`),
+    or a function of the row. At most `max_open_files` shard files are open at
+    a time. The least recently written one is closed to make room, and reopened
+    for appending if more of its rows come, so any number of shards can be written.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        shard_by: ShardBy | Callable[[RW5Row], str | None],
+        max_open_files: int = DEFAULT_MAX_OPEN_SHARDS,
+        buffer_size: int = SHARD_BUFFER_SIZE,
+    ) -> None:
+        if max_open_files < 1:
+            msg = f"At least one shard file must be allowed open, got {max_open_files}."
+            raise ValueError(msg)
+        self.output_dir = output_dir
+        self.shard_by = shard_by
+        self.max_open_files = max_open_files
+        self.buffer_size = buffer_size
+        self.ShardPaths: dict[str, Path] = {}
+        """Output file of each shard key written so far."""
+        self._file_names: set[str] = set()
+        self._open: OrderedDict[str, tuple[TextIO, csv.DictWriter]] = OrderedDict()
+        """Open shard files, least recently written first."""
+        self._current_station: str | None = None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def shard_key(self, row: RW5Row) -> str:
+        """Return the shard `row` goes to."""  # noqa: DOC201
+        if callable(self.shard_by):
+            key = self.shard_by(row)
+        elif self.shard_by == "station":
+            key = row.PointID if row.RW5RecordType == "OC" else self._current_station if row.RW5RecordType == "SS" else None
+        elif self.shard_by == "date":
+            key = row.DateTime.date().isoformat() if row.DateTime else None
+        else:
+            key = row.InstrumentType or None
+        return key or UNASSIGNED_SHARD
+
+    def _path_for(self, key: str) -> Path:
+        path = self.ShardPaths.get(key)
+        if path is None:
+            name = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+            # keys that only differ in unsafe characters get numbered names
+            unique_name, n = name, 1
+            while unique_name.lower() in self._file_names:
+                n += 1
+                unique_name = f"{name}-{n}"
+            self._file_names.add(unique_name.lower())
+            path = self.ShardPaths[key] = self.output_dir / f"{unique_name}.csv"
+        return path
+
+    def _writer_for(self, key: str) -> csv.DictWriter:
+        shard = self._open.get(key)
+        if shard is not None:
+            self._open.move_to_end(key)
+            return shard[1]
+
+        if len(self._open) >= self.max_open_files:
+            _, (oldest_file, _) = self._open.popitem(last=False)
+            oldest_file.close()
+        new_shard = key not in self.ShardPaths
+        shard_file = self._path_for(key).open("w" if new_shard else "a", buffering=self.buffer_size)
+        writer = csv.DictWriter(
+            shard_file,
+            fieldnames=RW5Row.__annotations__.keys(),
+            delimiter=",",
+            lineterminator="\n",
+        )
+        if new_shard:
+            writer.writeheader()
+        self._open[key] = (shard_file, writer)
+        return writer
+
+    @property
+    def open_files(self) -> int:
+        """Number of shard files currently open."""  # noqa: DOC201
+        return len(self._open)
+
+    def write_backsight(self, backsight: BacksightRow) -> None:  # noqa: D102
+        # sideshots after a backsight are from its occupied point, as `parse_ss_record` assumes
+        self._current_station = backsight.OccupiedPointID
+
+    def write_row(self, row: RW5Row) -> None:  # noqa: D102
+        self._writer_for(self.shard_key(row)).writerow(asdict(row))
+
+    def close(self) -> None:  # noqa: D102
+        while self._open:
+            _, (shard_file, _) = self._open.popitem(last=False)
+            shard_file.close()
@@ -0,0 +1,264 @@
+"""Total station diagrams written straight to SVG, without matplotlib.
+
+Draws the same diagram as `plot.py`: green OC triangles, red backsight lines and
+triangles, blue sideshot lines and dots, and point id labels, with the same
+colors, marker sizes and label offsets. Coordinates are scaled with NumPy and
+elements are streamed to the output as they are formatted.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from rw5_to_csv.plot_data import (
+    ExtentType,
+    PlotLOD,
+    StationPlotData,
+    get_extent,
+    get_points_extent,
+    get_station_plot_data,
+    scale_points,
+    station_plot_file_names,
+    thin_points,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from pathlib import Path
+    from typing import TextIO
+
+    from rw5_to_csv.machine_state import MachineState
+    from rw5_to_csv.total_station import TSStation
+
+# matplotlib's "r", "g" and "b"
+RED = "#ff0000"
+GREEN = "#008000"
+BLUE = "#0000ff"
+
+NEW_EXTENT = (0, 0, 10, 10)
+"""Extent points are scaled into before drawing, as in `plot.py`."""
+AXES_WIDTH = 558.0
+AXES_HEIGHT = 554.4
+"""Points, the size of the axes of a 10 x 10 inch matplotlib figure."""
+AXES_MARGIN = 0.05
+"""Fraction of the data range added on each side, matplotlib's default axes margin."""
+PADDING = 12.0
+"""Points around everything drawn, like `bbox_inches="tight"`."""
+FONT_SIZES = {"xx-large": 17.28, "small": 8.33}
+CHARACTER_WIDTH = 0.6
+"""Approximate width of a label character, in font sizes, for sizing the image."""
+
+
+@dataclass
+class _Style:
+    marker_size: float
+    sideshot_size: float
+    line_width: float
+    font_size: float
+
+
+class _View:
+    """Maps the scaled data coordinates to SVG points, like matplotlib's autoscaled axes."""
+
+    def __init__(self, points: np.ndarray) -> None:
+        lo = points.min(axis=0) if len(points) else np.zeros(2)
+        hi = points.max(axis=0) if len(points) else np.ones(2)
+        span = hi - lo
+        # a single point is centered in a unit range
+        lo = np.where(span > 0, lo, lo - 0.5)
+        span = np.where(span > 0, span, 1.0)
+        self.lo = lo - span * AXES_MARGIN
+        self.hi = lo + span * (1 + AXES_MARGIN)
+        self.scale = np.array([AXES_WIDTH, AXES_HEIGHT]) / (self.hi - self.lo)
+
+    def __call__(self, points: np.ndarray) -> np.ndarray:
+        """Return (n, 2) SVG coordinates of (n, 2) data points, y pointing down."""  # noqa: DOC201
+        out = np.empty_like(points, dtype=float)
+        out[:, 0] = PADDING + (points[:, 0] - self.lo[0]) * self.scale[0]
+        out[:, 1] = PADDING + (self.hi[1] - points[:, 1]) * self.scale[1]
+        return out
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.2f}"
+
+
+def _lines(segments: np.ndarray, color: str, width: float, opacity: float) -> Iterator[str]:
+    if not len(segments):
+        return
+    yield f'<g stroke="{color}" stroke-width="{_fmt(width)}" stroke-opacity="{opacity}" stroke-linecap="square">\n'
+    for (x1, y1), (x2, y2) in segments:
+        yield f'<line x1="{_fmt(x1)}" y1="{_fmt(y1)}" x2="{_fmt(x2)}" y2="{_fmt(y2)}"/>\n'
+    yield "</g>\n"
+
+
+def _markers(points: np.ndarray, symbol: str) -> Iterator[str]:
+    for x, y in points:
+        yield f'<use href="#{symbol}" x="{_fmt(x)}" y="{_fmt(y)}"/>\n'
+
+
+def _labels(points: np.ndarray, labels: Iterable[str], color: str, font_size: float) -> Iterator[str]:
+    for (x, y), label in zip(points, labels):
+        yield (
+            f'<text x="{_fmt(x)}" y="{_fmt(y)}" fill="{color}" font-size="{_fmt(font_size)}"'
+            f' dominant-baseline="central">{escape(label)}</text>\n'
+        )
+
+
+def _defs(style: _Style) -> str:
+    # matplotlib's "^" marker, with a 1pt edge in the face color
+    h = style.marker_size / 2
+    triangle = f"M0,{_fmt(-h)} L{_fmt(-h)},{_fmt(h)} L{_fmt(h)},{_fmt(h)} Z"
+    return (
+        "<defs>\n"
+        f'<path id="bs" d="{triangle}" fill="{RED}" stroke="{RED}" opacity="0.7"/>\n'
+        f'<path id="oc" d="{triangle}" fill="{GREEN}" stroke="{GREEN}" opacity="0.7"/>\n'
+        f'<circle id="ss" r="{_fmt(style.sideshot_size / 2)}" fill="{BLUE}" stroke="{BLUE}"/>\n'
+        "</defs>\n"
+    )
+
+
+def write_stations_svg(
+    stations: list[StationPlotData],
+    extent: ExtentType,
+    output: TextIO,
+    lod: PlotLOD | None = None,
+) -> None:
+    """Write an SVG diagram of `stations`, scaled from `extent`, to `output` as it is formatted.
+
+    Pass `lod` to thin dense sideshots and labels, as `plot.py` does.
+    """
+    dense = lod is not None and sum(1 + len(station.BacksightPoints) for station in stations) > lod.LabelDensityThreshold
+    style = (
+        _Style(marker_size=8, sideshot_size=3, line_width=1, font_size=FONT_SIZES["small"])
+        if dense
+        else _Style(marker_size=22, sideshot_size=10, line_width=4, font_size=FONT_SIZES["xx-large"])
+    )
+    label_offset = 0.1 if dense else 0.25
+
+    # scale every station's points in one go, then split them back up
+    counts = [(len(station.BacksightPoints), len(station.SideshotPoints)) for station in stations]
+    all_points = np.array(
+        [p for station in stations for p in (station.OccupiedPoint, *station.BacksightPoints, *station.SideshotPoints)],
+        dtype=float,
+    ).reshape(-1, 2)
+    scaled = scale_points(all_points, extent, NEW_EXTENT)
+    station_points = []
+    start = 0
+    for (num_bs, num_ss), station in zip(counts, stations):
+        oc = scaled[start]
+        bs = scaled[start + 1:start + 1 + num_bs]
+        ss = scaled[start + 1 + num_bs:start + 1 + num_bs + num_ss]
+        if lod is not None:
+            ss = ss[thin_points(ss, NEW_EXTENT, lod.GridCells)]
+        station_points.append((station, oc, bs, ss))
+        start += 1 + num_bs + num_ss
+
+    # labels are drawn at an offset in data units, so they share the view transform
+    oc_label_points = np.array([oc + (label_offset, 0) for _, oc, _, _ in station_points]).reshape(-1, 2)
+    bs_label_points = np.concatenate([bs + (0.25, -0.2) for _, _, bs, _ in station_points] or [np.empty((0, 2))])
+    drawn = np.concatenate([
+        np.concatenate([oc[None], bs, ss]) for _, oc, bs, ss in station_points
+    ] or [np.empty((0, 2))])
+    view = _View(drawn)
+
+    oc_labels = view(oc_label_points)
+    bs_labels = view(bs_label_points)
+    label_right = max(
+        [x + len(station.OccupiedPointID) * CHARACTER_WIDTH * style.font_size for (x, _), station in zip(oc_labels, stations)]
+        + [x + len(point_id) * CHARACTER_WIDTH * style.font_size for (x, _), point_id in zip(bs_labels, (
+            point_id for station in stations for point_id in station.BacksightPointIDs
+        ))],
+        default=0.0,
+    )
+    width = max(PADDING + AXES_WIDTH, label_right) + PADDING
+    height = AXES_HEIGHT + 2 * PADDING
+
+    output.write(
+        '<svg xmlns="http://www.w3.org/2000/svg" version="1.1"'
+        f' width="{_fmt(width)}pt" height="{_fmt(height)}pt" viewBox="0 0 {_fmt(width)} {_fmt(height)}"'
+        ' font-family="DejaVu Sans, sans-serif">\n',
+    )
+    output.write(_defs(style))
+
+    if lod is None:
+        # per station, in the order `plot._draw_stations_full` draws
+        bs_label_start = 0
+        for i, (station, oc, bs, ss) in enumerate(station_points):
+            oc_svg = view(oc[None])
+            bs_svg = view(bs)
+            ss_svg = view(ss)
+            output.writelines(_lines(np.stack([np.broadcast_to(oc_svg, bs_svg.shape), bs_svg], axis=1), RED, style.line_width, 0.3))
+            output.writelines(_markers(bs_svg, "bs"))
+            output.writelines(_labels(bs_labels[bs_label_start:bs_label_start + len(bs)], station.BacksightPointIDs, RED, style.font_size))
+            bs_label_start += len(bs)
+            output.writelines(_lines(np.stack([np.broadcast_to(oc_svg, ss_svg.shape), ss_svg], axis=1), BLUE, style.line_width, 0.1))
+            output.writelines(_markers(oc_svg, "oc"))
+            output.writelines(_labels(oc_labels[i:i + 1], [station.OccupiedPointID], GREEN, style.font_size))
+            output.writelines(_markers(ss_svg, "ss"))
+    else:
+        # one group per kind of element, in the order `plot._draw_stations_lod` draws
+        oc_svg = view(np.array([oc for _, oc, _, _ in station_points]).reshape(-1, 2))
+        bs_segments, ss_segments, bs_svg, ss_svg = [], [], [], []
+        for (_, _, bs, ss), oc in zip(station_points, oc_svg):
+            bs_view, ss_view = view(bs), view(ss)
+            bs_svg.append(bs_view)
+            ss_svg.append(ss_view)
+            bs_segments.append(np.stack([np.broadcast_to(oc, bs_view.shape), bs_view], axis=1))
+            ss_segments.append(np.stack([np.broadcast_to(oc, ss_view.shape), ss_view], axis=1))
+        empty_segments = [np.empty((0, 2, 2))]
+        output.writelines(_lines(np.concatenate(bs_segments or empty_segments), RED, style.line_width, 0.3))
+        output.writelines(_markers(np.concatenate(bs_svg or [np.empty((0, 2))]), "bs"))
+        output.writelines(_lines(np.concatenate(ss_segments or empty_segments), BLUE, style.line_width, 0.1))
+        output.writelines(_markers(oc_svg, "oc"))
+        output.writelines(_markers(np.concatenate(ss_svg or [np.empty((0, 2))]), "ss"))
+        if dense:
+            assert lod is not None
+            kept = thin_points(oc_label_points - (label_offset, 0), NEW_EXTENT, lod.LabelGridCells)
+            output.writelines(_labels(oc_labels[kept], [stations[i].OccupiedPointID for i in kept], GREEN, style.font_size))
+        else:
+            bs_ids = [point_id for station in stations for point_id in station.BacksightPointIDs]
+            output.writelines(_labels(bs_labels, bs_ids, RED, style.font_size))
+            output.writelines(_labels(oc_labels, [station.OccupiedPointID for station in stations], GREEN, style.font_size))
+
+    output.write("</svg>\n")
+
+
+def render_stations_svg(stations: list[StationPlotData], extent: ExtentType, lod: PlotLOD | None = None) -> str:
+    """Return an SVG diagram of `stations` as a string."""  # noqa: DOC201
+    buffer = io.StringIO()
+    write_stations_svg(stations, extent, buffer, lod)
+    return buffer.getvalue()
+
+
+def plot_total_station_svg(machine: MachineState, lod: PlotLOD | None = None) -> str:
+    """SVG counterpart of `plot.plot_total_station_data`, for a whole job."""  # noqa: DOC201, DOC501
+    if not machine.crdb_path:
+        msg = "CRDB file is required."
+        raise ValueError(msg)
+    return render_stations_svg(get_station_plot_data(machine), get_extent(list(machine.Records.values())), lod)
+
+
+def render_station_svgs(
+    stations: Iterable[TSStation],
+    output_dir: Path,
+    lod: PlotLOD | None = None,
+) -> Iterator[Path]:
+    """Write each station to its own SVG file, scaled to the station's own points.
+
+    File names match `plot.render_station_plots`. Rendering takes milliseconds,
+    so this runs in the calling process.
+    """  # noqa: DOC402
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stations_data = [StationPlotData.from_ts_station(station) for station in stations]
+    file_names = station_plot_file_names([station.OccupiedPointID for station in stations_data], "svg")
+    for station, file_name in zip(stations_data, file_names):
+        output_path = output_dir / file_name
+        with output_path.open("w", encoding="utf-8") as output:
+            write_stations_svg([station], get_points_extent(station.points()), output, lod)
+        yield output_path
@@ -0,0 +1,140 @@
+"""Index of converted rows by time, for range and nearest-time queries."""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from rw5_to_csv.records.record import RW5Row
+
+
+class TimeIndex:
+    """Sorted `RW5Row.DateTime` timestamps mapped to point ids in `MachineState.Records`.
+
+    Filled by `convert` as rows are set, so only a timestamp per point id is
+    kept and rows are looked up in `records` when a query returns them. Rows
+    without a `DateTime` are not indexed. Naive datetimes passed to queries
+    are taken to be in the index's timezone.
+    """
+
+    def __init__(self, records: Mapping[str, RW5Row], tzinfo: datetime.tzinfo = datetime.UTC) -> None:
+        self.tzinfo = tzinfo
+        self._records = records
+        self._shot_times: dict[str, float | None] = {}
+        """Timestamp of each point id, in the same order as `records`."""
+        self._sorted: tuple[list[float], list[str], list[int]] | None = None
+
+    def add(self, row: RW5Row) -> None:
+        """Index `row`, replacing any earlier row with its point id."""
+        self._shot_times[row.PointID] = None if row.DateTime is None else row.DateTime.timestamp()
+        self._sorted = None
+
+    def discard(self, point_id: str) -> None:
+        """Stop indexing the row with `point_id`, if there is one."""
+        if self._shot_times.pop(point_id, False) is not False:
+            self._sorted = None
+
+    def _sorted_entries(self) -> tuple[list[float], list[str], list[int]]:
+        if self._sorted is None:
+            entries = sorted(
+                (timestamp, position, point_id)
+                for position, (point_id, timestamp) in enumerate(self._shot_times.items())
+                if timestamp is not None
+            )
+            self._sorted = (
+                [timestamp for timestamp, _, _ in entries],
+                [point_id for _, _, point_id in entries],
+                [position for _, position, _ in entries],
+            )
+        return self._sorted
+
+    @property
+    def Timestamps(self) -> list[float]:  # noqa: N802
+        """POSIX timestamps, ascending."""  # noqa: DOC201
+        return self._sorted_entries()[0]
+
+    @property
+    def PointIDs(self) -> list[str]:  # noqa: N802
+        """Point id of the row at the same index of `Timestamps`."""  # noqa: DOC201
+        return self._sorted_entries()[1]
+
+    @property
+    def Positions(self) -> list[int]:  # noqa: N802
+        """Position in `MachineState.Records` of the row at the same index of `Timestamps`."""  # noqa: DOC201
+        return self._sorted_entries()[2]
+
+    def _rows(self, point_ids: list[str]) -> list[RW5Row]:
+        return [self._records[point_id] for point_id in point_ids]
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.Timestamps)
+
+    def _timestamp(self, when: datetime.datetime) -> float:
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=self.tzinfo)
+        return when.timestamp()
+
+    def _slice(self, start: datetime.datetime, end: datetime.datetime) -> slice:
+        return slice(
+            bisect.bisect_left(self.Timestamps, self._timestamp(start)),
+            bisect.bisect_left(self.Timestamps, self._timestamp(end)),
+        )
+
+    def positions_between(self, start: datetime.datetime, end: datetime.datetime) -> list[int]:
+        """Return record positions of rows shot from `start` (inclusive) to `end` (exclusive), in time order."""  # noqa: DOC201
+        return self.Positions[self._slice(start, end)]
+
+    def between(self, start: datetime.datetime, end: datetime.datetime) -> list[RW5Row]:
+        """Return rows shot from `start` (inclusive) to `end` (exclusive), in time order."""  # noqa: DOC201
+        return self._rows(self.PointIDs[self._slice(start, end)])
+
+    def within(self, when: datetime.datetime, delta: datetime.timedelta) -> list[RW5Row]:
+        """Return rows shot within `delta` either side of `when`, inclusive, in time order."""  # noqa: DOC201
+        timestamp = self._timestamp(when)
+        return self._rows(self.PointIDs[
+            bisect.bisect_left(self.Timestamps, timestamp - delta.total_seconds()):
+            bisect.bisect_right(self.Timestamps, timestamp + delta.total_seconds())
+        ])
+
+    def nearest(self, when: datetime.datetime) -> RW5Row | None:
+        """Return the row shot closest to `when`, the earlier one on a tie."""  # noqa: DOC201
+        if not self.Timestamps:
+            return None
+        timestamps = self.Timestamps
+        timestamp = self._timestamp(when)
+        i = bisect.bisect_left(timestamps, timestamp)
+        if i == len(timestamps) or (i > 0 and timestamp - timestamps[i - 1] <= timestamps[i] - timestamp):
+            i -= 1
+        return self._records[self.PointIDs[i]]
+
+    def buckets(
+        self,
+        interval: datetime.timedelta,
+        origin: datetime.datetime | None = None,
+    ) -> dict[datetime.datetime, list[RW5Row]]:
+        """Group rows into consecutive `interval` long buckets, keyed by bucket start.
+
+        Buckets start at `origin`, by default midnight of the first shot's day. Empty buckets are left out.
+        """  # noqa: DOC201
+        if not self.Timestamps:
+            return {}
+        if origin is None:
+            first = datetime.datetime.fromtimestamp(self.Timestamps[0], tz=self.tzinfo)
+            origin = first.replace(hour=0, minute=0, second=0, microsecond=0)
+        origin_timestamp = self._timestamp(origin)
+        width = interval.total_seconds()
+
+        buckets: dict[datetime.datetime, list[RW5Row]] = {}
+        timestamps = self.Timestamps
+        i = bisect.bisect_left(timestamps, origin_timestamp)
+        while i < len(timestamps):
+            bucket_number = int((timestamps[i] - origin_timestamp) // width)
+            bucket_end = origin_timestamp + (bucket_number + 1) * width
+            j = bisect.bisect_left(timestamps, bucket_end, lo=i)
+            buckets[datetime.datetime.fromtimestamp(bucket_end - width, tz=self.tzinfo)] = self._rows(self.PointIDs[i:j])
+            i = j
+        return buckets
@@ -25,8 +25,7 @@ class TSStation:
 
         side_shots = [
             machine_state.Records[side_shot_id]
-            for side_shot_id, _occupied_point_id
-            in machine_state.SideshotIDOccupiedPointID.items() if _occupied_point_id == occupied_point_id
+            for side_shot_id in machine_state.SideshotIDOccupiedPointID.keys_for(occupied_point_id)
         ]
 
         backsight = next((i for i in machine_state.Backsights if i.OccupiedPointID == occupied_point_id), None)
@@ -0,0 +1,26 @@
+"""Write output files so readers never see them half written."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def write_atomically(output_path: Path, write: Callable[[Path], object]) -> None:
+    """Call `write` with a temporary path next to `output_path`, then move it into place.
+
+    Readers of `output_path` only ever see a complete file.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        write(tmp_path)
+        tmp_path.replace(output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
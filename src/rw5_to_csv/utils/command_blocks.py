@@ -1,10 +1,18 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import BinaryIO
+
 SKIP_LINES_WITH_PREFIXES = ["G0", "G1", "G2", "G3"]
 
 
-def group_lines_into_command_blocks(lines: list[str]) -> list[list[str]]:
-    """Group file lines into command blocks."""
-    commands: list[list[str]] = []
-    active_command = []
+def _group_lines(lines: Iterable[tuple[int, str]]) -> Iterator[tuple[int, list[str]]]:
+    """Group (position, line) pairs into command blocks, yielding each with the position of its first line."""  # noqa: DOC402
+    active_command: list[str] = []
+    active_position = 0
 
     """
     group lines in blocks of lines making up a command
@@ -31,9 +39,8 @@ def group_lines_into_command_blocks(lines: list[str]) -> list[list[str]]:
         GPS ____________________________    // New command starts
     """
 
-    stripped_lines = [line.strip() for line in lines]
-
-    for line in stripped_lines:
+    for position, raw_line in lines:
+        line = raw_line.strip()
         # skips lines with specific prefixes, act line they're not even there.
         if any(line.startswith(prefix) for prefix in SKIP_LINES_WITH_PREFIXES):
             continue
@@ -42,13 +49,41 @@ def group_lines_into_command_blocks(lines: list[str]) -> list[list[str]]:
         # If theres an active command and this line isn't comment
         #   Finish active command, start new command
         if len(active_command) > 0 and line_is_comment is False:
-            commands.append(active_command)
+            yield active_position, active_command
             active_command = []
 
         # Append current line to active_command
+        if not active_command:
+            active_position = position
         active_command.append(line)
 
     if len(active_command) > 0:
-        commands.append(active_command)
+        yield active_position, active_command
+
+
+def group_lines_into_command_blocks(lines: list[str]) -> list[list[str]]:
+    """Group file lines into command blocks."""  # noqa: DOC201
+    return [command for _, command in _group_lines(enumerate(lines))]
+
+
+def iter_command_blocks(lines: Iterable[str]) -> Iterator[list[str]]:
+    """Group lines into command blocks as they are read, e.g. straight from an open file."""  # noqa: DOC402
+    for _, command in _group_lines(enumerate(lines)):
+        yield command
+
+
+def iter_numbered_command_blocks(lines: Iterable[str]) -> Iterator[tuple[int, list[str]]]:
+    """Like `iter_command_blocks`, yielding each block with the 1-based line number of its first line."""  # noqa: DOC402
+    yield from _group_lines(enumerate(lines, start=1))
+
+
+def iter_command_block_offsets(input_file: BinaryIO, encoding: str = "iso8859-1") -> Iterator[tuple[int, list[str]]]:
+    """Yield each command block of a binary file with the byte offset of its first line."""  # noqa: DOC402
+
+    def lines_with_offsets() -> Iterator[tuple[int, str]]:
+        offset = input_file.tell()
+        for raw_line in input_file:
+            yield offset, raw_line.decode(encoding)
+            offset += len(raw_line)
 
-    return commands
+    yield from _group_lines(lines_with_offsets())
@@ -0,0 +1,53 @@
+"""Open RW5 files that may be gzip, bzip2 or xz compressed, decompressing as they are read."""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import lzma
+import zipfile
+from typing import IO, TYPE_CHECKING, Any, Literal
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+RW5_ENCODING = "iso8859-1"
+
+MAGIC_NUMBERS = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+}
+"""Leading bytes of each compressed format, detected regardless of file extension."""
+
+_OPENERS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+
+def detect_compression(path: Path) -> str | None:
+    """Return "gzip", "bz2" or "xz" from a file's magic number, or None for plain files."""  # noqa: DOC201
+    with path.open("rb") as f:
+        head = f.read(max(len(magic) for magic in MAGIC_NUMBERS))
+    return next((codec for magic, codec in MAGIC_NUMBERS.items() if head.startswith(magic)), None)
+
+
+def open_rw5(rw5_path: Path | zipfile.Path, mode: Literal["r", "rb"] = "r") -> IO[Any]:
+    """Open an RW5 file for reading, streaming through a decompressor if it is compressed.
+
+    Text mode decodes with the RW5 encoding. Binary mode offsets count
+    decompressed bytes, and seeking in a compressed file re-reads it from
+    the start when going backwards. A `zipfile.Path` member of a job archive
+    is streamed straight out of the archive.
+    """  # noqa: DOC201
+    if isinstance(rw5_path, zipfile.Path):
+        # zip members are already compressed by the archive
+        return rw5_path.open("rb") if mode == "rb" else rw5_path.open("r", encoding=RW5_ENCODING)
+    codec = detect_compression(rw5_path)
+    if mode == "rb":
+        return rw5_path.open("rb") if codec is None else _OPENERS[codec](rw5_path, "rb")
+    if codec is None:
+        return rw5_path.open("r", encoding=RW5_ENCODING)
+    return _OPENERS[codec](rw5_path, "rt", encoding=RW5_ENCODING)
@@ -1,8 +1,9 @@
 import sqlite3
-from decimal import Decimal
+from collections.abc import Iterable
 from pathlib import Path
 
 from rw5_to_csv.records.record import RW5Row
+from rw5_to_csv.utils.fixed_point import FixedPoint
 
 
 def get_crdb_point(point_id: str, crdb_path: Path) -> RW5Row:
@@ -27,7 +28,26 @@ def get_crdb_point(point_id: str, crdb_path: Path) -> RW5Row:
         PointID=point_id,
         RW5RecordType="",
         Note=crdb_row["D"],
-        LocalX=Decimal(crdb_row["E"]),
-        LocalY=Decimal(crdb_row["N"]),
-        LocalZ=Decimal(crdb_row["Z"]),
+        LocalX=FixedPoint.from_float(crdb_row["E"]),
+        LocalY=FixedPoint.from_float(crdb_row["N"]),
+        LocalZ=FixedPoint.from_float(crdb_row["Z"]) if crdb_row["Z"] is not None else None,
     )
+
+
+def get_crdb_coordinates(point_ids: Iterable[str], crdb_path: Path) -> dict[str, tuple[float, float, float]]:
+    """Retrieve (E, N, Z) of many points from the crdb file over one connection.
+
+    Points missing from the crdb, or without N and E, are left out. A missing Z is NaN.
+    """  # noqa: DOC201
+    crdb_connection = sqlite3.connect(crdb_path)
+    try:
+        coordinates = {}
+        for point_id in set(point_ids):
+            crdb_row = crdb_connection.execute(
+                "SELECT E, N, Z FROM Coordinates WHERE P like ?", (point_id,),
+            ).fetchone()
+            if crdb_row and crdb_row[0] is not None and crdb_row[1] is not None:
+                coordinates[point_id] = (crdb_row[0], crdb_row[1], crdb_row[2] if crdb_row[2] is not None else float("nan"))
+        return coordinates
+    finally:
+        crdb_connection.close()
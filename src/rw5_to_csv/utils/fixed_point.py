@@ -0,0 +1,367 @@
+"""Exact fixed point coordinates, stored as a scaled integer and the number of decimal places."""
+
+from __future__ import annotations
+
+import math
+import sys
+from decimal import Decimal
+from typing import TYPE_CHECKING, overload
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+class FixedPoint:
+    """Decimal number held as `Value / 10 ** Places`, e.g. `FixedPoint.from_text("45.2120")` is `(452120, 4)`.
+
+    `str()` gives back the text it was parsed from, so CSV output is exact, except
+    that negative zero loses its sign. Coordinates at the precision RW5 and CRDB
+    files carry fit an int64 `Value`, and a file's coordinates share one scale,
+    so arithmetic and comparisons between them are plain integer operations.
+    Addition, subtraction and multiplication with other fixed point numbers or
+    ints are exact. Mixing with floats gives floats, and mixing with `Decimal`
+    gives `Decimal`. Division gives a float, or a `Decimal` when either operand
+    is one. `round()` rounds half to even like `Decimal`, giving an int or, with
+    digits, a fixed point number. Comparisons with floats and `Decimal` are exact,
+    so equal numbers hash equal whatever their type.
+    """
+
+    __slots__ = ("Places", "Value")
+
+    def __init__(self, value: int, places: int) -> None:
+        if places < 0:
+            msg = f"Decimal places must not be negative, got {places}."
+            raise ValueError(msg)
+        self.Value = value
+        self.Places = places
+
+    @classmethod
+    def from_text(cls, text: str) -> FixedPoint:
+        """Parse plain decimal text like `-7.9573` exactly, keeping its number of decimal places."""  # noqa: DOC201, DOC501
+        text = text.strip()
+        whole, _, fraction = text.partition(".")
+        if (fraction.isdigit() or not fraction) and "_" not in text:
+            try:
+                # int() keeps the sign, e.g. "-0" + "5" is -5
+                value = int(whole + fraction)
+            except ValueError:
+                if "e" not in text and "E" not in text:
+                    raise
+            else:
+                fixed = _new(cls)
+                fixed.Value = value
+                fixed.Places = len(fraction)
+                return fixed
+        if "e" in text or "E" in text:
+            return cls.from_decimal(Decimal(text))
+        msg = f"Not a decimal number: {text!r}."
+        raise ValueError(msg)
+
+    @classmethod
+    def from_decimal(cls, value: Decimal) -> FixedPoint:
+        """Convert a `Decimal` exactly."""  # noqa: DOC201
+        sign, digits, exponent = value.as_tuple()
+        assert isinstance(exponent, int)
+        integer = int("".join(map(str, digits)) or "0")
+        if exponent > 0:
+            integer *= 10**exponent
+            exponent = 0
+        return cls(-integer if sign else integer, -exponent)
+
+    @classmethod
+    def from_float(cls, value: float) -> FixedPoint:
+        """Convert a float, such as a CRDB coordinate, at the shortest precision that round-trips to the same float."""  # noqa: DOC201
+        return cls.from_text(repr(value))
+
+    def to_decimal(self) -> Decimal:
+        """Return the exact `Decimal` value."""  # noqa: DOC201
+        return Decimal(self.Value).scaleb(-self.Places)
+
+    def __str__(self) -> str:  # noqa: D105
+        sign = "-" if self.Value < 0 else ""
+        digits = str(abs(self.Value))
+        if not self.Places:
+            return sign + digits
+        digits = digits.rjust(self.Places + 1, "0")
+        return f"{sign}{digits[:-self.Places]}.{digits[-self.Places:]}"
+
+    def __repr__(self) -> str:  # noqa: D105
+        return f"FixedPoint.from_text({str(self)!r})"
+
+    def __reduce__(self) -> tuple[type[FixedPoint], tuple[int, int]]:  # noqa: D105
+        return (type(self), (self.Value, self.Places))
+
+    def __float__(self) -> float:  # noqa: D105
+        return self.Value / 10**self.Places
+
+    def __bool__(self) -> bool:  # noqa: D105
+        return self.Value != 0
+
+    def _aligned(self, other: FixedPoint) -> tuple[int, int, int]:
+        if self.Places == other.Places:
+            return self.Value, other.Value, self.Places
+        places = max(self.Places, other.Places)
+        return self.Value * 10 ** (places - self.Places), other.Value * 10 ** (places - other.Places), places
+
+    def _coerce(self, other: object) -> FixedPoint | None:
+        if isinstance(other, FixedPoint):
+            return other
+        if isinstance(other, int):
+            return _make(other, 0)
+        return None
+
+    def __add__(self, other: object) -> FixedPoint | float | Decimal:  # noqa: D105
+        if type(other) is FixedPoint and other.Places == self.Places:
+            # `_make` inlined, as this is the hot path of coordinate arithmetic
+            fixed = _new(FixedPoint)
+            fixed.Value = self.Value + other.Value
+            fixed.Places = self.Places
+            return fixed
+        fixed = self._coerce(other)
+        if fixed is not None:
+            a, b, places = self._aligned(fixed)
+            return _make(a + b, places)
+        if isinstance(other, float):
+            return float(self) + other
+        if isinstance(other, Decimal):
+            return self.to_decimal() + other
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __neg__(self) -> FixedPoint:  # noqa: D105
+        return _make(-self.Value, self.Places)
+
+    def __abs__(self) -> FixedPoint:  # noqa: D105
+        return _make(abs(self.Value), self.Places)
+
+    def __sub__(self, other: object) -> FixedPoint | float | Decimal:  # noqa: D105
+        if type(other) is FixedPoint and other.Places == self.Places:
+            fixed = _new(FixedPoint)
+            fixed.Value = self.Value - other.Value
+            fixed.Places = self.Places
+            return fixed
+        fixed = self._coerce(other)
+        if fixed is not None:
+            a, b, places = self._aligned(fixed)
+            return _make(a - b, places)
+        if isinstance(other, (float, Decimal)):
+            return self + -other
+        return NotImplemented
+
+    def __rsub__(self, other: object) -> FixedPoint | float | Decimal:  # noqa: D105
+        return -self + other
+
+    def __mul__(self, other: object) -> FixedPoint | float | Decimal:  # noqa: D105
+        fixed = self._coerce(other)
+        if fixed is not None:
+            return _make(self.Value * fixed.Value, self.Places + fixed.Places)
+        if isinstance(other, float):
+            return float(self) * other
+        if isinstance(other, Decimal):
+            return self.to_decimal() * other
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __pow__(self, exponent: int) -> FixedPoint:  # noqa: D105
+        if not isinstance(exponent, int) or exponent < 0:
+            return NotImplemented
+        return _make(self.Value**exponent, self.Places * exponent)
+
+    def __truediv__(self, other: object) -> float | Decimal:  # noqa: D105
+        if isinstance(other, (FixedPoint, int, float)):
+            return float(self) / float(other)
+        if isinstance(other, Decimal):
+            return self.to_decimal() / other
+        return NotImplemented
+
+    def __rtruediv__(self, other: object) -> float | Decimal:  # noqa: D105
+        if isinstance(other, (int, float)):
+            return float(other) / float(self)
+        if isinstance(other, Decimal):
+            return other / self.to_decimal()
+        return NotImplemented
+
+    @overload
+    def __round__(self, ndigits: None = None) -> int: ...
+
+    @overload
+    def __round__(self, ndigits: int) -> FixedPoint: ...
+
+    def __round__(self, ndigits: int | None = None) -> int | FixedPoint:  # noqa: D105
+        if ndigits is None:
+            return _round_half_even(self.Value, self.Places)
+        if ndigits >= self.Places:
+            return _make(self.Value * 10 ** (ndigits - self.Places), ndigits)
+        places = max(ndigits, 0)
+        # negative digits round to tens, hundreds, ... and keep no decimal places
+        rounded = _round_half_even(self.Value, self.Places - ndigits) * 10 ** (places - ndigits)
+        return _make(rounded, places)
+
+    def _compare(self, other: object) -> int | None:
+        fixed = self._coerce(other)
+        if fixed is not None:
+            a, b, _ = self._aligned(fixed)
+        elif isinstance(other, Decimal):
+            if other.is_nan():
+                return None
+            a, b = self.to_decimal(), other
+        elif isinstance(other, float):
+            if math.isnan(other):
+                return None
+            if math.isinf(other):
+                return -1 if other > 0 else 1
+            # exact, as floats are binary fractions: Value / 10**Places against numerator / denominator
+            numerator, denominator = other.as_integer_ratio()
+            a, b = self.Value * denominator, numerator * 10**self.Places
+        else:
+            return None
+        return (a > b) - (a < b)
+
+    def __eq__(self, other: object) -> bool:  # noqa: D105
+        if type(other) is FixedPoint and other.Places == self.Places:
+            return self.Value == other.Value
+        comparison = self._compare(other)
+        if comparison is None:
+            # NaN equals nothing
+            return False if isinstance(other, (float, Decimal)) else NotImplemented
+        return comparison == 0
+
+    def __lt__(self, other: object) -> bool:  # noqa: D105
+        if type(other) is FixedPoint and other.Places == self.Places:
+            return self.Value < other.Value
+        comparison = self._compare(other)
+        return NotImplemented if comparison is None else comparison < 0
+
+    def __le__(self, other: object) -> bool:  # noqa: D105
+        if type(other) is FixedPoint and other.Places == self.Places:
+            return self.Value <= other.Value
+        comparison = self._compare(other)
+        return NotImplemented if comparison is None else comparison <= 0
+
+    def __gt__(self, other: object) -> bool:  # noqa: D105
+        if type(other) is FixedPoint and other.Places == self.Places:
+            return self.Value > other.Value
+        comparison = self._compare(other)
+        return NotImplemented if comparison is None else comparison > 0
+
+    def __ge__(self, other: object) -> bool:  # noqa: D105
+        if type(other) is FixedPoint and other.Places == self.Places:
+            return self.Value >= other.Value
+        comparison = self._compare(other)
+        return NotImplemented if comparison is None else comparison >= 0
+
+    def __hash__(self) -> int:  # noqa: D105
+        # Python's hash of the rational Value / 10**Places, which equal ints, floats and Decimals share
+        if not self.Places:
+            return hash(self.Value)
+        if self.Places < len(_HASH_INVERSE_POWERS_OF_TEN):
+            inverse = _HASH_INVERSE_POWERS_OF_TEN[self.Places]
+        else:
+            inverse = pow(10, -self.Places, _HASH_MODULUS)
+        value_hash = abs(self.Value) % _HASH_MODULUS * inverse % _HASH_MODULUS
+        value_hash = value_hash if self.Value >= 0 else -value_hash
+        return -2 if value_hash == -1 else value_hash
+
+
+_HASH_MODULUS = sys.hash_info.modulus
+_HASH_INVERSE_POWERS_OF_TEN = [pow(10, -places, _HASH_MODULUS) for places in range(32)]
+"""Modular inverses of the scales coordinates use, for hashing."""
+
+_EXACT_FLOAT_INT = 2**53
+"""Integers below this in magnitude convert to float exactly."""
+_FLOAT_POWERS_OF_TEN = np.array([float(10**i) for i in range(23)])
+"""The powers of ten that are exact floats."""
+_INT64_POWERS_OF_TEN = np.array([10**i for i in range(19)], dtype=np.int64)
+"""The powers of ten that fit an int64."""
+
+
+def _round_half_even(value: int, shift: int) -> int:
+    """Return `value / 10 ** shift` rounded half to even."""  # noqa: DOC201
+    quotient, remainder = divmod(value, 10**shift)
+    twice = 2 * remainder
+    return quotient + (twice > 10**shift or (twice == 10**shift and quotient % 2))
+
+
+_new = object.__new__
+
+
+def _make(value: int, places: int) -> FixedPoint:
+    # skips __init__ checks for values that are valid by construction
+    fixed = _new(FixedPoint)
+    fixed.Value = value
+    fixed.Places = places
+    return fixed
+
+
+def _raw_arrays(values: Sequence[FixedPoint | None]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return int64 arrays of each value's `Value` and `Places`, 0 where missing, and a mask of the missing values.
+
+    Raises `OverflowError` when a `Value` doesn't fit an int64.
+    """  # noqa: DOC201
+    count = len(values)
+    places = np.fromiter((-1 if value is None else value.Places for value in values), dtype=np.int64, count=count)
+    raw = np.fromiter((0 if value is None else value.Value for value in values), dtype=np.int64, count=count)
+    missing = places < 0
+    places[missing] = 0
+    return raw, places, missing
+
+
+def _scale_one(value: FixedPoint, places: int) -> int:
+    shift = places - value.Places
+    return value.Value * 10**shift if shift >= 0 else _round_half_even(value.Value, -shift)
+
+
+def to_scaled_array(values: Sequence[FixedPoint | None], places: int) -> np.ndarray:
+    """Return values as an int64 array scaled by `10 ** places`, rounding half to even where values have more places.
+
+    Missing values are `np.iinfo(np.int64).min`.
+    """  # noqa: DOC201
+    int64 = np.iinfo(np.int64)
+    try:
+        raw, value_places, missing = _raw_arrays(values)
+    except OverflowError:
+        raw = None
+    if raw is not None and (value_places == places).all():
+        # a file's coordinates share one scale, so usually there is nothing to rescale
+        scaled = raw
+    elif raw is not None and (np.abs(places - value_places) < len(_INT64_POWERS_OF_TEN)).all():
+        scaled = raw.copy()
+        up = value_places < places
+        factor = _INT64_POWERS_OF_TEN[places - value_places[up]]
+        if (np.abs(raw[up]) > int64.max // factor).any():
+            msg = "Scaled fixed point value doesn't fit an int64."
+            raise OverflowError(msg)
+        scaled[up] = raw[up] * factor
+        down = value_places > places
+        divisor = _INT64_POWERS_OF_TEN[value_places[down] - places]
+        quotient, remainder = np.divmod(raw[down], divisor)
+        # round half to even, like `_round_half_even`
+        twice = 2 * remainder
+        scaled[down] = quotient + ((twice > divisor) | ((twice == divisor) & (quotient % 2 == 1)))
+    else:
+        scaled = np.array([0 if value is None else _scale_one(value, places) for value in values], dtype=np.int64)
+        missing = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    scaled[missing] = int64.min
+    return scaled
+
+
+def to_float_array(values: Sequence[FixedPoint | None]) -> np.ndarray:
+    """Return values as a float64 array, NaN where missing."""  # noqa: DOC201
+    try:
+        raw, places, missing = _raw_arrays(values)
+    except OverflowError:
+        raw = None
+    if raw is not None and (np.abs(raw) < _EXACT_FLOAT_INT).all() and (places < len(_FLOAT_POWERS_OF_TEN)).all():
+        # both operands are exact floats, so one correctly rounded division gives the same float as `float(value)`
+        floats = raw.astype(float) / _FLOAT_POWERS_OF_TEN[places]
+        floats[missing] = np.nan
+        return floats
+    return np.fromiter(
+        (np.nan if value is None else value.Value / 10**value.Places for value in values),
+        dtype=float,
+        count=len(values),
+    )
@@ -0,0 +1,227 @@
+"""Watch a folder for RW5 jobs and convert them as they arrive.
+
+Field laptops sync `.rw5`/`.crdb` pairs into a shared folder throughout the day.
+The watcher polls that folder, waits for files to stop changing, and converts
+each job on a bounded worker pool, writing the CSV output atomically.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.utils.atomic_write import write_atomically
+
+if TYPE_CHECKING:
+    import datetime
+    import threading
+
+logger = getLogger(__name__)
+
+STATE_FILE_NAME = ".rw5_watch_state.json"
+"""Name of the file, in the output folder, that remembers converted content hashes."""
+
+FileSignature = tuple[int, int, int, int]
+"""RW5 size, RW5 mtime, CRDB size, CRDB mtime. CRDB values are -1 if there is no CRDB."""
+
+
+@dataclass
+class WatchedJob:
+    """An RW5 file and its matching CRDB file, if one exists."""
+
+    RW5Path: Path
+    CRDBPath: Path | None
+    Signature: FileSignature
+
+
+def _hash_files(*paths: Path | None) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        if path is None:
+            continue
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _convert_job(
+    rw5_path: Path,
+    crdb_path: Path | None,
+    output_path: Path,
+    tzinfo: datetime.tzinfo | None,
+    ignore_missing_shots: bool,  # noqa: FBT001
+) -> Path:
+    write_atomically(
+        output_path,
+        lambda tmp_path: convert(
+            rw5_path,
+            tmp_path,
+            tzinfo=tzinfo,
+            crdb_path=crdb_path,
+            ignore_missing_shots=ignore_missing_shots,
+        ),
+    )
+    return output_path
+
+
+class FolderWatcher:
+    """Poll a folder for new or changed RW5 jobs and convert them.
+
+    A job is converted once its files have kept the same size and mtime for
+    `settle_seconds`, so files still being synced are left alone. Jobs whose
+    content hash matches the last conversion are skipped.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        input_dir: Path,
+        output_dir: Path,
+        *,
+        settle_seconds: float = 2.0,
+        max_workers: int = 2,
+        tzinfo: datetime.tzinfo | None = None,
+        ignore_missing_shots: bool = False,
+    ) -> None:
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.settle_seconds = settle_seconds
+        self.tzinfo = tzinfo
+        self.ignore_missing_shots = ignore_missing_shots
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._state_path = output_dir / STATE_FILE_NAME
+        self._content_hashes: dict[str, str] = self._load_state()
+        self._seen_signatures: dict[Path, FileSignature] = {}
+        """Signature of each job when it was last converted or found unchanged."""
+        self._pending: dict[Path, tuple[FileSignature, float]] = {}
+        """Signature of each changed job and the time it was first seen with that signature."""
+        self._in_flight: dict[Path, tuple[Future[Path], FileSignature, str]] = {}
+
+    def _load_state(self) -> dict[str, str]:
+        if not self._state_path.exists():
+            return {}
+        try:
+            return json.loads(self._state_path.read_text())
+        except ValueError:
+            logger.warning("Ignoring unreadable watch state file %s.", self._state_path)
+            return {}
+
+    def _save_state(self) -> None:
+        write_atomically(
+            self._state_path,
+            lambda tmp_path: tmp_path.write_text(json.dumps(self._content_hashes, indent=1)),
+        )
+
+    def find_jobs(self) -> list[WatchedJob]:
+        """List RW5 files in the input folder with their current signatures."""  # noqa: DOC201
+        entries = {entry.name.lower(): entry for entry in os.scandir(self.input_dir) if entry.is_file()}
+        jobs = []
+        for name, entry in entries.items():
+            if not name.endswith(".rw5"):
+                continue
+            rw5_stat = entry.stat()
+            crdb_entry = entries.get(name.removesuffix(".rw5") + ".crdb")
+            crdb_stat = crdb_entry.stat() if crdb_entry else None
+            jobs.append(WatchedJob(
+                RW5Path=Path(entry.path),
+                CRDBPath=Path(crdb_entry.path) if crdb_entry else None,
+                Signature=(
+                    rw5_stat.st_size,
+                    rw5_stat.st_mtime_ns,
+                    crdb_stat.st_size if crdb_stat else -1,
+                    crdb_stat.st_mtime_ns if crdb_stat else -1,
+                ),
+            ))
+        return jobs
+
+    def _collect_finished(self) -> None:
+        for rw5_path, (future, signature, content_hash) in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[rw5_path]
+            try:
+                output_path = future.result()
+            except Exception:
+                logger.exception("Failed to convert %s.", rw5_path)
+                # remember the signature so a broken file isn't retried until it changes again
+                self._seen_signatures[rw5_path] = signature
+                continue
+            logger.info("Converted %s to %s.", rw5_path, output_path)
+            self._seen_signatures[rw5_path] = signature
+            self._content_hashes[str(rw5_path)] = content_hash
+            self._save_state()
+
+    def scan(self) -> list[Path]:
+        """Scan the input folder once and submit conversions for settled, changed jobs.
+
+        Returns the RW5 paths submitted for conversion by this scan.
+        """  # noqa: DOC201
+        self._collect_finished()
+        now = time.monotonic()
+        submitted = []
+
+        for job in self.find_jobs():
+            if job.RW5Path in self._in_flight or self._seen_signatures.get(job.RW5Path) == job.Signature:
+                continue
+
+            pending = self._pending.get(job.RW5Path)
+            if pending is None or pending[0] != job.Signature:
+                # new or still being written, (re)start the settle timer
+                self._pending[job.RW5Path] = (job.Signature, now)
+                if self.settle_seconds > 0:
+                    continue
+            elif now - pending[1] < self.settle_seconds:
+                continue
+            del self._pending[job.RW5Path]
+
+            content_hash = _hash_files(job.RW5Path, job.CRDBPath)
+            if self._content_hashes.get(str(job.RW5Path)) == content_hash:
+                # touched but not changed
+                self._seen_signatures[job.RW5Path] = job.Signature
+                continue
+
+            output_path = self.output_dir / job.RW5Path.with_suffix(".csv").name
+            future = self._executor.submit(
+                _convert_job,
+                job.RW5Path,
+                job.CRDBPath,
+                output_path,
+                self.tzinfo,
+                self.ignore_missing_shots,
+            )
+            self._in_flight[job.RW5Path] = (future, job.Signature, content_hash)
+            submitted.append(job.RW5Path)
+
+        return submitted
+
+    def wait(self) -> None:
+        """Block until all submitted conversions have finished."""
+        for future, _, _ in list(self._in_flight.values()):
+            future.exception()
+        self._collect_finished()
+
+    def run(self, poll_interval: float = 1.0, stop_event: threading.Event | None = None) -> None:
+        """Scan the input folder every `poll_interval` seconds until `stop_event` is set."""
+        try:
+            while stop_event is None or not stop_event.is_set():
+                self.scan()
+                if stop_event is None:
+                    time.sleep(poll_interval)
+                else:
+                    stop_event.wait(poll_interval)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Wait for running conversions and shut down the worker pool."""
+        self.wait()
+        self._executor.shutdown()
@@ -0,0 +1,58 @@
+"""Tests for looking up single points through a sidecar block index."""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from rw5_to_csv.block_index import get_point, index_path_for, load_block_index
+from rw5_to_csv.convert import convert
+
+SS_RW5 = Path("./src/tests/data/ss.test.rw5")
+SS_CRDB = Path("./src/tests/data/ss.test.crdb")
+GPS_RW5 = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5")
+GPS_BP_RW5 = Path("./src/tests/data/gps-multiple-bp.test.rw5")
+
+
+@pytest.mark.parametrize(("rw5_path", "crdb_path"), [(SS_RW5, SS_CRDB), (GPS_RW5, None), (GPS_BP_RW5, None)])
+def test_get_point_matches_convert(tmp_path: Path, rw5_path: Path, crdb_path: Path | None):
+    rw5_copy = tmp_path / rw5_path.name
+    shutil.copy(rw5_path, rw5_copy)
+    machine = convert(rw5_copy, None, crdb_path=crdb_path)
+
+    for point_id, row in machine.Records.items():
+        assert get_point(rw5_copy, point_id, crdb_path=crdb_path) == row
+    assert index_path_for(rw5_copy).exists()
+
+    with pytest.raises(KeyError):
+        get_point(rw5_copy, "no such point", crdb_path=crdb_path)
+
+
+def test_index_invalidated_by_change(tmp_path: Path):
+    rw5_copy = tmp_path / GPS_RW5.name
+    shutil.copy(GPS_RW5, rw5_copy)
+    block_count = len(load_block_index(rw5_copy).Offsets)
+
+    with rw5_copy.open("a") as rw5_file:
+        rw5_file.write("\nSP,PNNEW1,N 1.0,E 2.0,EL3.0,--added\n")
+    stat = rw5_copy.stat()
+    os.utime(rw5_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert len(load_block_index(rw5_copy).Offsets) == block_count + 1
+    assert get_point(rw5_copy, "NEW1").Note == "added"
+
+
+@pytest.mark.parametrize("index_text", ["", '{"version":1,"size":', '{"version":1}', "[]", '{"version":1,"prisms":[1]}'])
+def test_unreadable_index_is_rebuilt(tmp_path: Path, index_text: str):
+    rw5_copy = tmp_path / GPS_RW5.name
+    shutil.copy(GPS_RW5, rw5_copy)
+    expected = get_point(rw5_copy, "5605")
+    index_path = index_path_for(rw5_copy)
+
+    index_path.write_text(index_text)
+
+    assert get_point(rw5_copy, "5605") == expected
+    assert load_block_index(rw5_copy).Offsets
+    # the rebuilt index replaced the bad one without leaving temporary files
+    assert set(tmp_path.iterdir()) == {rw5_copy, index_path}
@@ -0,0 +1,41 @@
+"""Tests for the archive-wide point catalogue."""
+
+import os
+import shutil
+from pathlib import Path
+
+from rw5_to_csv.catalogue import PointCatalogue
+from rw5_to_csv.convert import convert
+
+DATA = Path("./src/tests/data")
+
+
+def test_catalogue_finds_points(tmp_path: Path):
+    archive = tmp_path / "archive"
+    (archive / "2024").mkdir(parents=True)
+    for rw5_path in DATA.glob("*.rw5"):
+        shutil.copy(rw5_path, archive / "2024" / rw5_path.name)
+
+    with PointCatalogue(tmp_path / "catalogue.sqlite") as catalogue:
+        scanned, removed = catalogue.refresh_folder(archive, max_workers=2)
+        assert len(scanned) == len(list(DATA.glob("*.rw5")))
+        assert removed == []
+
+        job_path = archive / "2024" / "gps-short-stats.test.rw5"
+        machine = convert(job_path, None)
+        row = next(row for row in machine.Records.values() if row.RW5RecordType == "GPS")
+        locations = catalogue.find(row.PointID)
+        assert [location.JobPath for location in locations] == [job_path]
+        assert locations[0].RecordType == "GPS"
+        assert locations[0].DateTime == row.DateTime.isoformat()
+        assert locations[0].JobName is not None
+
+        assert catalogue.find("no such point") == []
+
+        # unchanged jobs are not rescanned, changed and deleted ones are
+        assert catalogue.refresh_folder(archive, max_workers=2) == ([], [])
+        stat = job_path.stat()
+        os.utime(job_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        (archive / "2024" / "ss.test.rw5").unlink()
+        assert catalogue.refresh_folder(archive, max_workers=2) == ([job_path], [archive / "2024" / "ss.test.rw5"])
+        assert len(catalogue.find(row.PointID)) == 1
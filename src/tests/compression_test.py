@@ -0,0 +1,41 @@
+"""Tests for reading compressed RW5 files."""
+
+import bz2
+import gzip
+import lzma
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.prelude import prelude
+from rw5_to_csv.utils.compression import detect_compression
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+
+
+@pytest.mark.parametrize("codec", list(COMPRESSORS))
+def test_convert_compressed(codec: str):
+    rw5_path = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5")
+
+    with TemporaryDirectory() as tmpdir:
+        # no telling extension, detection goes by content
+        compressed_path = Path(tmpdir) / "job.rw5"
+        compressed_path.write_bytes(COMPRESSORS[codec](rw5_path.read_bytes()))
+        assert detect_compression(compressed_path) == codec
+        assert detect_compression(rw5_path) is None
+
+        expected = convert(rw5_path, None)
+        machine = convert(compressed_path, None)
+        assert [asdict(row) for row in machine.Records.values()] == [asdict(row) for row in expected.Records.values()]
+
+        pipelined = convert(compressed_path, None, pipelined=True)
+        assert list(pipelined.Records) == list(expected.Records)
+
+        assert prelude(compressed_path, header_only=True) == prelude(rw5_path, header_only=True)
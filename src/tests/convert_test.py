@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from dataclasses import asdict
 from pathlib import Path
 
 import pytest
@@ -82,3 +83,41 @@ def test_convert(
 
     command_blocks = group_lines_into_command_blocks(lines)
     assert len(command_blocks) == data["num_command_blocks"]
+
+
+@pytest.mark.parametrize(
+    "data",
+    test_rw5_files__convert,
+)
+def test_convert_lazy_rows(
+    data: dict,
+) -> None:
+    """Test that lazily parsed rows hold the same values as eagerly parsed rows."""
+    eager = convert(data["rw5"], None, crdb_path=data["crdb"])
+    lazy = convert(data["rw5"], None, crdb_path=data["crdb"], lazy_rows=True)
+
+    assert list(lazy.Records.keys()) == list(eager.Records.keys())
+    for lazy_row, eager_row in zip(lazy.Records.values(), eager.Records.values()):
+        assert asdict(lazy_row) == asdict(eager_row)
+
+
+def test_lazy_rows_defer_statistics_and_timestamps() -> None:
+    """Test that lazy GPS rows only parse statistics and timestamps when read."""
+    machine = convert(Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5"), None, lazy_rows=True)
+
+    row = next(row for row in machine.Records.values() if row.RW5RecordType == "GPS")
+    assert {"HRMS", "GDOP", "DateTime"}.isdisjoint(vars(row))
+    assert row.VRMS is not None
+    assert {"HRMS", "GDOP"} <= set(vars(row))
+    assert "DateTime" not in vars(row)
+
+
+def test_convert_command_block_history() -> None:
+    """Test that processed command blocks are bounded unless full history is requested."""
+    data = test_rw5_files__convert[2]
+
+    machine = convert(data["rw5"], None, crdb_path=data["crdb"])
+    assert len(machine.ProcessedCommandBlocks) == 1
+
+    machine = convert(data["rw5"], None, crdb_path=data["crdb"], keep_command_history=True)
+    assert len(machine.ProcessedCommandBlocks) == data["num_command_blocks"]
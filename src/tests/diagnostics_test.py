@@ -0,0 +1,68 @@
+"""Tests for diagnostics of skipped records."""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from rw5_to_csv.convert import convert
+
+
+@pytest.mark.parametrize("options", [{}, {"lazy_rows": True}, {"pipelined": True}])
+def test_skipped_gps_record_is_diagnosed(options: dict):
+    lines = Path("./src/tests/data/gps-short-stats.test.rw5").read_bytes().split(b"\n")
+    # drop the RMS line of PN6001, whose GPS line is line 23
+    assert lines[25].startswith(b"--HRMS:0.055")
+    del lines[25]
+
+    with TemporaryDirectory() as tmpdir:
+        rw5_path = Path(tmpdir) / "job.rw5"
+        rw5_path.write_bytes(b"\n".join(lines))
+
+        machine = convert(rw5_path, None, **options)
+
+    assert "6001" not in machine.Records
+    assert "6002" in machine.Records
+    assert [(d.RecordType, d.LineNumber, d.Field, d.PointID) for d in machine.Diagnostics] == [("GPS", 23, "HRMS", "6001")]
+    assert sum(machine.Diagnostics.counts().values()) == 1
+
+
+@pytest.mark.parametrize("options", [{}, {"lazy_rows": True}, {"pipelined": True}])
+def test_missing_vrms_line_is_diagnosed(options: dict):
+    lines = Path("./src/tests/data/gps-multiple-bp.test.rw5").read_bytes().split(b"\n")
+    # drop the VRMS line of PN5216, whose GPS line is line 26
+    assert lines[37].startswith(b"--VRMS Avg:")
+    del lines[37]
+
+    with TemporaryDirectory() as tmpdir:
+        rw5_path = Path(tmpdir) / "job.rw5"
+        rw5_path.write_bytes(b"\n".join(lines))
+
+        machine = convert(rw5_path, None, **options)
+
+    assert "5216" not in machine.Records
+    assert [(d.RecordType, d.LineNumber, d.Field, d.PointID) for d in machine.Diagnostics] == [("GPS", 26, "VRMS", "5216")]
+
+
+@pytest.mark.parametrize("options", [{}, {"lazy_rows": True}, {"pipelined": True}])
+def test_unparseable_gps_value_is_diagnosed(options: dict):
+    rw5_text = Path("./src/tests/data/gps-short-stats.test.rw5").read_bytes()
+    assert rw5_text.count(b"--HRMS:0.055") == 1
+
+    with TemporaryDirectory() as tmpdir:
+        rw5_path = Path(tmpdir) / "job.rw5"
+        rw5_path.write_bytes(rw5_text.replace(b"--HRMS:0.055", b"--HRMS:x.055"))
+        csv_path = Path(tmpdir) / "job.csv"
+
+        machine = convert(rw5_path, csv_path, **options)
+        num_csv_rows = len(csv_path.read_text().splitlines()) - 1
+
+    assert "6001" not in machine.Records
+    assert num_csv_rows == len(machine.Records)
+    assert [(d.RecordType, d.Field, d.PointID) for d in machine.Diagnostics] == [("GPS", None, "6001")]
+
+
+def test_clean_file_has_no_diagnostics():
+    machine = convert(Path("./src/tests/data/gps-short-stats.test.rw5"), None)
+
+    assert len(machine.Diagnostics) == 0
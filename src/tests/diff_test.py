@@ -0,0 +1,36 @@
+"""Tests for diffing two versions of a job."""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.diff import diff_rw5, save_checkpoint
+
+RW5_PATH = Path("./src/tests/data/gps-short-stats.test.rw5")
+
+
+def test_diff_rw5_against_file_and_checkpoint():
+    lines = RW5_PATH.read_text(encoding="iso8859-1").splitlines()
+    # move one shot and add a new one
+    edited = [line.replace("N 7342048.0684", "N 7342048.1684") for line in lines]
+    edited += [
+        "GPS,PN9999,LA45.043907659603,LN-67.024500979226,EL-4.615666,--NEW",
+        "--GS,PN9999,N 7342048.0684,E 2457017.9846,EL-6.7476,--NEW",
+        "--HRMS:0.046, VRMS:0.044, STATUS:FIXED, SATS:20, AGE:1.0, PDOP:1.290, HDOP:0.647, VDOP:1.117, TDOP:0.708, GDOP:1.472",
+    ]
+
+    with TemporaryDirectory() as tmpdir:
+        new_path = Path(tmpdir) / "new.rw5"
+        new_path.write_text("\n".join(edited), encoding="iso8859-1")
+        checkpoint_path = Path(tmpdir) / "old.json"
+        save_checkpoint(convert(RW5_PATH, None), checkpoint_path)
+
+        for old_path in (RW5_PATH, checkpoint_path):
+            diff = diff_rw5(old_path, new_path)
+
+            assert list(diff.Added) == ["9999"]
+            assert not diff.Removed
+            assert list(diff.Modified) == ["6000"]
+            assert diff.Modified["6000"].ChangedFields == {"LocalY": ("7342048.0684", "7342048.1684")}
+
+        assert not diff_rw5(checkpoint_path, RW5_PATH)
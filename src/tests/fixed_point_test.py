@@ -0,0 +1,105 @@
+"""Tests for exact fixed point coordinates."""
+
+import csv
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.records.common import get_standard_record_params_dict
+from rw5_to_csv.utils.fixed_point import FixedPoint, to_float_array, to_scaled_array
+
+GPS_RW5 = Path("./src/tests/data/gps-short-stats.test.rw5")
+
+
+@pytest.mark.parametrize("text", ["45.2120", "-7.9573", "0.0065", "7366892.84678", "123", "-0.5", "1.000000"])
+def test_text_round_trip(text: str):
+    value = FixedPoint.from_text(text)
+    assert str(value) == text
+    assert value == Decimal(text)
+    assert value.to_decimal() == Decimal(text)
+    assert float(value) == float(text)
+
+
+def test_csv_keeps_rw5_text(tmp_path: Path):
+    output_path = tmp_path / "out.csv"
+    convert(GPS_RW5, output_path)
+    with output_path.open() as csv_file:
+        rows = {row["PointID"]: row for row in csv.DictReader(csv_file)}
+
+    lines = GPS_RW5.read_text(encoding="iso8859-1").splitlines()
+    grid_lines = [get_standard_record_params_dict(line.removeprefix("--")) for line in lines if line.startswith("--GS,")]
+    assert grid_lines
+    for params in grid_lines:
+        row = rows[params["PN"]]
+        assert (row["LocalX"], row["LocalY"], row["LocalZ"]) == (params["E "], params["N "], params["EL"])
+
+
+def test_arithmetic_is_exact():
+    a = FixedPoint.from_text("0.1")
+    b = FixedPoint.from_text("0.20")
+    assert str(a + b) == "0.30"
+    assert a + b == Decimal("0.3")
+    assert str(b - a - a) == "0.00"
+    assert not (b - a - a)
+    assert str(a * b) == "0.020"
+    assert a < b
+    assert a < 0.15  # noqa: PLR2004
+    assert hash(FixedPoint.from_text("2.50")) == hash(2.5)
+    assert hash(FixedPoint.from_text("-7.9573")) == hash(Decimal("-7.9573"))
+
+
+@pytest.mark.parametrize("text", ["0.1", "2.50", "-7.9573", "0.0065", "12", "-0.5"])
+def test_float_comparison_is_exact(text: str):
+    value = FixedPoint.from_text(text)
+    # equal only when the float is exactly the same number, so equal values hash equal
+    assert (value == float(text)) == (Decimal(text) == Decimal(float(text)))
+    if value == float(text):
+        assert hash(value) == hash(float(text))
+    assert value < float("inf")
+    assert value > float("-inf")
+    assert value != float("nan")
+    assert FixedPoint.from_float(7366857.354398) == Decimal("7366857.354398")
+
+
+@pytest.mark.parametrize("text", ["7342113.0385", "-2.345", "2.355", "0.5", "1.5", "-0.5", "12"])
+def test_decimal_division_and_rounding(text: str):
+    value = FixedPoint.from_text(text)
+    exact = Decimal(text)
+
+    assert value / Decimal(2) == exact / Decimal(2)
+    assert isinstance(value / Decimal(2), Decimal)
+    assert Decimal(2) / value == Decimal(2) / exact
+    assert isinstance(Decimal(2) / value, Decimal)
+    assert round(value) == round(exact)
+    assert isinstance(round(value), int)
+    for ndigits in (-1, 0, 2, 3, 6):
+        rounded = round(value, ndigits)
+        assert isinstance(rounded, FixedPoint)
+        assert rounded == round(exact, ndigits)
+        if ndigits >= 0 and rounded:
+            # same decimal places as Decimal, apart from negative zero
+            assert str(rounded) == str(round(exact, ndigits))
+
+
+def test_numpy_export():
+    values = [FixedPoint.from_text("1.25"), None, FixedPoint.from_text("-3.5"), FixedPoint.from_text("2.345")]
+
+    assert to_scaled_array(values, 2).tolist() == [125, np.iinfo(np.int64).min, -350, 234]
+    assert to_scaled_array(values, 1).tolist() == [12, np.iinfo(np.int64).min, -35, 23]
+    floats = to_float_array(values)
+    assert floats[0] == 1.25  # noqa: PLR2004
+    assert np.isnan(floats[1])
+
+
+def test_numpy_export_matches_scalars():
+    texts = ["7366892.84678", "-2457004.8538", "0.0065", "12", "1e-30", "123456789012345678901.5"]
+    values = [FixedPoint.from_text(text) for text in texts]
+
+    assert to_float_array(values).tolist() == [float(value) for value in values]
+    # the last value doesn't fit an int64 at 4 places
+    with pytest.raises(OverflowError):
+        to_scaled_array(values, 4)
+    assert to_scaled_array(values[:5], 4).tolist() == [int(round(value, 4).to_decimal().scaleb(4)) for value in values[:5]]
@@ -0,0 +1,47 @@
+"""Tests for projecting GPS coordinates onto grid coordinates."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.geodesy import GRID_SYSTEMS, check_gps_grid_coordinates, get_grid_system, packed_dms_to_dd
+from rw5_to_csv.prelude import prelude
+
+
+def test_packed_dms_to_dd():
+    dd = packed_dms_to_dd(np.array([45.30, -66.041962160406]))
+
+    assert dd[0] == pytest.approx(45.5)
+    assert dd[1] == pytest.approx(-(66 + 4 / 60 + 19.62160406 / 3600))
+
+
+def test_new_brunswick_stereographic():
+    grid_system = GRID_SYSTEMS["CANADA/NAD83/New Brunswick"]
+
+    northing, easting = grid_system.project(
+        packed_dms_to_dd(np.array([45.043907659603])),
+        packed_dms_to_dd(np.array([-67.024500979226])),
+    )
+
+    assert northing[0] == pytest.approx(7342048.0684, abs=0.001)
+    assert easting[0] == pytest.approx(2457017.9846, abs=0.001)
+
+
+@pytest.mark.parametrize(
+    ("rw5_path", "tolerance", "num_flagged"),
+    [
+        (Path("./src/tests/data/gps-short-stats.test.rw5"), 0.05, 0),
+        # localized job, shifted about 0.136m from the projection
+        (Path("./src/tests/data/gps-multiple-bp.test.rw5"), 0.05, 11),
+        (Path("./src/tests/data/gps-multiple-bp.test.rw5"), 0.2, 0),
+    ],
+)
+def test_check_gps_grid_coordinates(rw5_path: Path, tolerance: float, num_flagged: int):
+    machine = convert(rw5_path, None)
+
+    check = check_gps_grid_coordinates(machine, get_grid_system(prelude(rw5_path)), tolerance)
+
+    assert len(check.PointIDs) > 0
+    assert len(check.flagged_point_ids()) == num_flagged
@@ -0,0 +1,73 @@
+"""Tests for detecting a file's GPS statistics layout and parsing each layout."""
+
+from pathlib import Path
+
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.machine_state import MachineState
+from rw5_to_csv.records.gps import detect_gps_layout, parse_gps_record
+from rw5_to_csv.records.record import materialize_row
+
+MULTI_LINE_RECORD = """GPS,PN5100,LA45.230685893410,LN-65.491220056673,EL88.171642,--MON
+--GS,PN5100,N 7376327.1276,E 2553249.7300,EL0.0065,--MON
+--HRMS Avg: 0.0057 SD: 0.0004 Min: 0.0050 Max: 0.0062
+--VRMS Avg: 0.0092 SD: 0.0006 Min: 0.0083 Max: 0.0099
+--HDOP Avg: 0.5302  Min: 0.5302 Max: 0.5302
+--AGE Avg: 1.3000 Min: 1.0000 Max: 2.0000
+--Number of Satellites Avg: 29 Min: 29 Max: 29""".splitlines()
+
+SINGLE_LINE_RECORD = """GPS,PN5101,LA45.230685893410,LN-65.491220056673,EL88.171642,--MON
+--GS,PN5101,N 7376327.1276,E 2553249.7300,EL0.0065,--MON
+--HRMS:0.011, VRMS:0.024, STATUS:FIXED, SATS:15, AGE:2.0, PDOP:1.598, HDOP:0.951, VDOP:1.285, TDOP:0.949, GDOP:1.859""".splitlines()
+
+
+@pytest.mark.parametrize(
+    "rw5_name,data_collector,layout",
+    [
+        ("ss.test.rw5", "SurvCE", "single-line"),
+        ("gps-multiple-bp.test.rw5", "SurvPC", "multi-line"),
+        # SurvPC stakeout shots also carry single-line statistics after the averages
+        ("gps-long-stats_overwritten-shots.test.rw5", "SurvPC", "multi-line"),
+    ],
+)
+def test_layout_detected_once_per_file(rw5_name, data_collector, layout):
+    machine = convert(Path("./src/tests/data") / rw5_name, None)
+    assert machine.DataCollector == data_collector
+    assert machine.GPSLayout == layout
+
+
+def test_layout_without_statistics_follows_data_collector():
+    assert detect_gps_layout(MULTI_LINE_RECORD[:2], "SurvPC") == "multi-line"
+    assert detect_gps_layout(MULTI_LINE_RECORD[:2], "SurvCE") == "single-line"
+    assert detect_gps_layout(SINGLE_LINE_RECORD, "SurvPC") == "single-line"
+
+
+def test_single_line_statistics_take_precedence_in_multi_line_files():
+    machine_state = MachineState(GPSLayout="multi-line")
+    row = parse_gps_record(MULTI_LINE_RECORD + SINGLE_LINE_RECORD[2:], machine_state)[0]
+    assert (row.HRMS, row.Status, row.Age) == (0.011, "FIXED", "2.0")
+
+
+@pytest.mark.parametrize("lazy_rows", [False, True])
+def test_blocks_in_other_layout_fall_back(lazy_rows):
+    machine_state = MachineState(LazyRows=lazy_rows, GPSLayout="single-line")
+    row = materialize_row(parse_gps_record(MULTI_LINE_RECORD, machine_state)[0])
+    assert (row.HRMS, row.VRMS, row.HDOP, row.VDOP, row.Age, row.NumSatellites) == (0.0057, 0.0092, 0.5302, None, "1.3000", "29")
+
+    machine_state = MachineState(LazyRows=lazy_rows, GPSLayout="multi-line")
+    row = materialize_row(parse_gps_record(SINGLE_LINE_RECORD, machine_state)[0])
+    assert (row.HRMS, row.VRMS, row.Status, row.GDOP) == (0.011, 0.024, "FIXED", 1.859)
+
+
+@pytest.mark.parametrize(
+    "command_block,field_name",
+    [
+        (MULTI_LINE_RECORD[:2], "HRMS"),
+        (MULTI_LINE_RECORD[:3], "VRMS"),
+    ],
+)
+def test_missing_statistics_are_skipped(command_block, field_name):
+    machine_state = MachineState(GPSLayout="multi-line")
+    assert parse_gps_record(command_block, machine_state) == []
+    assert [entry.Field for entry in machine_state.Diagnostics] == [field_name]
@@ -0,0 +1,36 @@
+"""Tests for GPS quality statistics."""
+
+from pathlib import Path
+
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.gps_stats import summarize_gps_quality
+
+
+def test_summarize_gps_quality_by_base():
+    machines = [
+        convert(Path("./src/tests/data/gps-multiple-bp.test.rw5"), None),
+        convert(Path("./src/tests/data/gps-short-stats.test.rw5"), None),
+    ]
+
+    summaries = summarize_gps_quality(machines, group_by=("BasePointID",))
+
+    counts = {summary.Group["BasePointID"]: summary.Count for summary in summaries}
+    assert sum(counts.values()) == 11 + 24  # noqa: PLR2004
+    assert set(counts) == {"931_BASE_1", "1314_BASE_2", "948"}
+
+
+def test_summarize_gps_quality_stats():
+    machine = convert(Path("./src/tests/data/gps-short-stats.test.rw5"), None)
+    gps_rows = [row for row in machine.Records.values() if row.RW5RecordType == "GPS"]
+
+    summaries = summarize_gps_quality([machine], group_by=("Status",), percentiles=(0, 100), thresholds={"HRMS": 0.03})
+
+    fixed = next(s for s in summaries if s.Group["Status"] == "FIXED")
+    fixed_rows = [row for row in gps_rows if row.Status == "FIXED"]
+    assert fixed.Count == len(fixed_rows)
+    assert fixed.Percentiles["HRMS"][0] == pytest.approx(min(row.HRMS for row in fixed_rows))
+    assert fixed.Percentiles["NumSatellites"][100] == max(int(row.NumSatellites) for row in fixed_rows)
+    assert fixed.ExceedanceRates == {"HRMS": pytest.approx(sum(row.HRMS > 0.03 for row in fixed_rows) / len(fixed_rows))}
+    assert fixed.as_row()["HRMS_p100"] == pytest.approx(max(row.HRMS for row in fixed_rows))
@@ -0,0 +1,68 @@
+"""Tests for converting zipped job archives."""
+
+import gc
+import zipfile
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.job_archive import convert_job_archive, convert_job_archives, find_job_members
+from rw5_to_csv.total_station import get_total_station_stations
+
+
+def _zip_job(zip_path: Path, *members: tuple[str, Path]) -> Path:
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, path in members:
+            archive.write(path, name)
+        archive.writestr("notes/readme.txt", "extra file")
+    return zip_path
+
+
+def test_convert_job_archive():
+    rw5_path = Path("./src/tests/data/ss.test.rw5")
+    crdb_path = Path("./src/tests/data/ss.test.crdb")
+
+    with TemporaryDirectory() as tmpdir:
+        zip_path = _zip_job(Path(tmpdir) / "job.zip", ("job/SS.RW5", rw5_path), ("job/ss.crdb", crdb_path))
+        job = find_job_members(zip_path)
+        assert (job.RW5Member, job.CRDBMember) == ("job/SS.RW5", "job/ss.crdb")
+
+        output_path = Path(tmpdir) / "job.csv"
+        expected_output_path = Path(tmpdir) / "expected.csv"
+        expected = convert(rw5_path, expected_output_path, crdb_path=crdb_path)
+        machine = convert_job_archive(zip_path, output_path)
+
+        assert output_path.read_text() == expected_output_path.read_text()
+        assert [asdict(row) for row in machine.Records.values()] == [asdict(row) for row in expected.Records.values()]
+        # the CRDB copy stays usable while the machine state is alive
+        assert len(get_total_station_stations(machine)) == len(get_total_station_stations(expected))
+
+        crdb_copy = machine.crdb_path
+        assert crdb_copy is not None
+        assert crdb_copy.exists()
+        del machine
+        gc.collect()
+        assert not crdb_copy.exists()
+
+
+def test_find_job_members_requires_one_rw5():
+    with TemporaryDirectory() as tmpdir:
+        zip_path = _zip_job(Path(tmpdir) / "empty.zip")
+        with pytest.raises(ValueError, match="Expected one RW5 file"):
+            find_job_members(zip_path)
+
+
+def test_convert_job_archives():
+    gps_path = Path("./src/tests/data/gps-short-stats.test.rw5")
+
+    with TemporaryDirectory() as tmpdir:
+        good = _zip_job(Path(tmpdir) / "good.zip", ("gps.rw5", gps_path))
+        bad = _zip_job(Path(tmpdir) / "bad.zip")
+
+        converted = convert_job_archives([good, bad], Path(tmpdir) / "out", max_workers=2)
+
+        assert converted == {good: Path(tmpdir) / "out" / "good.csv"}
+        assert converted[good].read_text().startswith("PointID,")
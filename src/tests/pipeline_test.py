@@ -0,0 +1,63 @@
+"""Tests for pipelined conversion."""
+
+import importlib
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.records.record import RW5Row
+from rw5_to_csv.sinks import JSONLinesSink, RecordSink
+
+# the package re-exports `convert` the function under the module's name
+convert_module = importlib.import_module("rw5_to_csv.convert")
+
+
+class _FailingSink(RecordSink):
+    def __init__(self) -> None:
+        self.closed = False
+
+    def write_row(self, row: RW5Row) -> None:
+        msg = "disk full"
+        raise OSError(msg)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_pipelined_matches_sequential(monkeypatch: pytest.MonkeyPatch):
+    rw5_path = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5")
+    # small batches so the queues fill and stages wait on each other
+    monkeypatch.setattr(convert_module, "PIPELINE_BATCH_SIZE", 3)
+    monkeypatch.setattr(convert_module, "PIPELINE_QUEUE_SIZE", 1)
+
+    with TemporaryDirectory() as tmpdir:
+        sequential_csv = Path(tmpdir) / "sequential.csv"
+        pipelined_csv = Path(tmpdir) / "pipelined.csv"
+        sequential_jsonl = Path(tmpdir) / "sequential.jsonl"
+        pipelined_jsonl = Path(tmpdir) / "pipelined.jsonl"
+
+        sequential = convert(rw5_path, sequential_csv, sinks=[JSONLinesSink(sequential_jsonl)])
+        pipelined = convert(rw5_path, pipelined_csv, sinks=[JSONLinesSink(pipelined_jsonl)], pipelined=True)
+
+        assert list(pipelined.Records) == list(sequential.Records)
+        assert [asdict(row) for row in pipelined.Records.values()] == [asdict(row) for row in sequential.Records.values()]
+        assert any(row.Overwritten for row in pipelined.Records.values())
+        assert pipelined_csv.read_text() == sequential_csv.read_text()
+        assert pipelined_jsonl.read_text() == sequential_jsonl.read_text()
+
+
+def test_pipelined_raises_sink_errors():
+    rw5_path = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5")
+    sink = _FailingSink()
+
+    with pytest.raises(OSError, match="disk full"):
+        convert(rw5_path, None, sinks=[sink], pipelined=True)
+    assert sink.closed
+
+
+def test_pipelined_raises_read_errors():
+    with pytest.raises(FileNotFoundError):
+        convert(Path("./src/tests/data/missing.rw5"), None, pipelined=True)
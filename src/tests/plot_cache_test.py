@@ -0,0 +1,95 @@
+"""Tests for the rendered plot cache."""
+
+import dataclasses
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.plot import PlotLOD, _render_job_cached, plot_total_station_tiles, render_station_plots
+from rw5_to_csv.plot_cache import PlotCache, plot_key
+from rw5_to_csv.plot_data import StationPlotData, get_extent
+from rw5_to_csv.total_station import get_total_station_stations
+
+STYLE = {"renderer": "test"}
+
+
+def test_plot_key_changes_with_inputs():
+    station = StationPlotData("1", (0.0, 0.0), SideshotPointIDs=["2"], SideshotPoints=[(1.0, 1.0)])
+    moved = StationPlotData("1", (0.0, 0.0), SideshotPointIDs=["2"], SideshotPoints=[(1.0, 1.0000001)])
+    extent = (0.0, 0.0, 1.0, 1.0)
+
+    assert plot_key([station], extent, STYLE) == plot_key([station], extent, dict(STYLE))
+    assert plot_key([station], extent, STYLE) != plot_key([moved], extent, STYLE)
+    assert plot_key([station], extent, STYLE) != plot_key([station], extent, {"renderer": "other"})
+
+
+def test_plot_cache_evicts_least_recently_used():
+    with TemporaryDirectory() as tmpdir:
+        cache = PlotCache(Path(tmpdir), max_bytes=20)
+        cache.put("a", b"x" * 8)
+        cache.put("b", b"x" * 8)
+        assert cache.get("a") == b"x" * 8
+        cache.put("c", b"x" * 8)
+
+        # b was least recently used
+        assert "b" not in cache
+        assert cache.get("b") is None
+        assert cache.total_bytes == 16  # noqa: PLR2004
+        assert sorted(path.name for path in Path(tmpdir).iterdir()) == ["a.plot", "c.plot"]
+
+        # recency is kept across instances
+        reopened = PlotCache(Path(tmpdir), max_bytes=20)
+        assert len(reopened) == 2  # noqa: PLR2004
+        reopened.put("d", b"x" * 8)
+        assert "c" in reopened
+        assert "d" in reopened
+
+
+def test_station_plots_are_only_rendered_once():
+    machine = convert(
+        Path("./src/tests/data/ss.test.rw5"),
+        None,
+        crdb_path=Path("./src/tests/data/ss.test.crdb"),
+    )
+    stations = get_total_station_stations(machine)
+
+    with TemporaryDirectory() as tmpdir:
+        cache = PlotCache(Path(tmpdir) / "cache")
+        first = plot_total_station_tiles(machine, cache=cache)
+        assert (cache.hits, cache.misses) == (0, 2)
+        second = plot_total_station_tiles(machine, cache=cache)
+        assert (cache.hits, cache.misses) == (2, 2)
+        assert second.Stations["1"].getvalue() == first.Stations["1"].getvalue()
+
+        output_dir = Path(tmpdir) / "plots"
+        list(render_station_plots(stations, output_dir, image_format="svg", max_workers=1, cache=cache))
+        misses = cache.misses
+        paths = list(render_station_plots(stations, output_dir, image_format="svg", max_workers=1, cache=cache))
+        assert paths == [output_dir / "station_1.svg"]
+        assert cache.misses == misses
+        assert b"<svg" in paths[0].read_bytes()
+
+
+def test_job_plot_only_redraws_changed_stations():
+    machine = convert(
+        Path("./src/tests/data/ss.test.rw5"),
+        None,
+        crdb_path=Path("./src/tests/data/ss.test.crdb"),
+    )
+    [station] = get_total_station_stations(machine)
+    extent = get_extent(list(machine.Records.values()))
+    first = StationPlotData.from_ts_station(station)
+    second = dataclasses.replace(first, OccupiedPointID="2", OccupiedPoint=first.SideshotPoints[0])
+    reshot = dataclasses.replace(second, SideshotPointIDs=[*second.SideshotPointIDs, "new"], SideshotPoints=[*second.SideshotPoints, (extent[2], extent[1])])
+
+    for lod, num_layers in [(None, 2), (PlotLOD(LabelDensityThreshold=0), 3)]:
+        with TemporaryDirectory() as tmpdir:
+            cache = PlotCache(Path(tmpdir))
+            image = _render_job_cached([first, second], extent, lod, cache).getvalue()  # noqa: SLF001
+            assert (cache.hits, cache.misses) == (0, num_layers)
+            assert _render_job_cached([first, second], extent, lod, cache).getvalue() == image  # noqa: SLF001
+            assert (cache.hits, cache.misses) == (num_layers, num_layers)
+
+            # only the re-shot station's layer is drawn again, the dense labels don't depend on sideshots
+            assert _render_job_cached([first, reshot], extent, lod, cache).getvalue() != image  # noqa: SLF001
+            assert (cache.hits, cache.misses) == (2 * num_layers - 1, num_layers + 1)
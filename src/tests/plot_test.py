@@ -0,0 +1,77 @@
+"""Tests for total station plotting."""
+
+import dataclasses
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.plot import PlotLOD, plot_total_station_data, plot_total_station_tiles, render_station_plots
+from rw5_to_csv.plot_data import station_plot_file_names, thin_points
+from rw5_to_csv.total_station import get_total_station_stations
+
+PNG_SIGNATURE = b"\x89PNG"
+
+
+def test_thin_points_keeps_one_point_per_cell():
+    points = np.array([[0.0, 0.0], [0.01, 0.01], [5.0, 5.0], [9.99, 9.99], [10.0, 10.0]])
+
+    kept = thin_points(points, (0, 0, 10, 10), 10)
+
+    assert kept.tolist() == [0, 2, 3]
+
+
+def test_plot_total_station_lod():
+    machine = convert(
+        Path("./src/tests/data/ss.test.rw5"),
+        None,
+        crdb_path=Path("./src/tests/data/ss.test.crdb"),
+    )
+
+    assert plot_total_station_data(machine).read(4) == PNG_SIGNATURE
+    assert plot_total_station_data(machine, PlotLOD(LabelDensityThreshold=0)).read(4) == PNG_SIGNATURE
+
+    tiles = plot_total_station_tiles(machine)
+    assert tiles.Overview.read(4) == PNG_SIGNATURE
+    assert list(tiles.Stations.keys()) == ["1"]
+    assert tiles.Stations["1"].read(4) == PNG_SIGNATURE
+
+
+def test_render_station_plots():
+    machine = convert(
+        Path("./src/tests/data/ss.test.rw5"),
+        None,
+        crdb_path=Path("./src/tests/data/ss.test.crdb"),
+    )
+    stations = get_total_station_stations(machine)
+
+    with TemporaryDirectory() as tmpdir:
+        paths = list(render_station_plots(stations, Path(tmpdir), image_format="svg", max_workers=1))
+
+        assert paths == [Path(tmpdir) / "station_1.svg"]
+        assert b"<svg" in paths[0].read_bytes()
+
+
+def test_colliding_station_ids_get_distinct_plots():
+    machine = convert(
+        Path("./src/tests/data/ss.test.rw5"),
+        None,
+        crdb_path=Path("./src/tests/data/ss.test.crdb"),
+    )
+    [station] = get_total_station_stations(machine)
+    stations = [
+        dataclasses.replace(station, OccupiedPoint=dataclasses.replace(station.OccupiedPoint, PointID=point_id))
+        for point_id in ["A/1", "A_1"]
+    ]
+
+    assert station_plot_file_names(["A/1", "A_1", "a_1", "A/1"], "png") == [
+        "station_A_1.png",
+        "station_A_1-2.png",
+        "station_a_1-3.png",
+        "station_A_1-4.png",
+    ]
+    with TemporaryDirectory() as tmpdir:
+        paths = sorted(render_station_plots(stations, Path(tmpdir), image_format="svg", max_workers=1))
+
+        assert paths == [Path(tmpdir) / "station_A_1-2.svg", Path(tmpdir) / "station_A_1.svg"]
@@ -0,0 +1,30 @@
+"""Tests for the point id symbol table and maps keyed on it."""
+
+import pytest
+
+from rw5_to_csv.point_ids import PointIDTable, SymbolMap
+
+
+def test_symbol_map_behaves_like_dict():
+    table = PointIDTable()
+    sideshots = SymbolMap(table)
+    expected: dict[str, str] = {}
+    for side_shot_id, occupied_point_id in [("2", "1"), ("3", "1"), ("4", "5"), ("2", "5"), ("3", "1")]:
+        sideshots[side_shot_id] = occupied_point_id
+        expected[side_shot_id] = occupied_point_id
+
+    assert sideshots == expected
+    assert list(sideshots.items()) == list(expected.items())
+    assert sideshots.keys_for("1") == ["3"]
+    assert sideshots.keys_for("5") == ["2", "4"]
+    assert sideshots.keys_for("no such point") == []
+
+    del sideshots["4"]
+    assert "4" not in sideshots
+    assert sideshots.keys_for("5") == ["2"]
+    with pytest.raises(KeyError):
+        sideshots["4"]
+
+    assert table.symbol("2") == 0
+    assert table[table.intern("2")] == "2"
+    assert table.canonical("".join(["1", "0"])) is table.canonical("10")
@@ -39,6 +39,7 @@ def test_parse_prelude():
             == "[BRX7 Internal],RA0.0785m,SHMP0.0547m,L10.0701m,L20.0629m,--L1/L2/L5 Internal Antenna"
         )
         assert prelude_data.UserDefined == "CANADA/NAD83/New Brunswick"
+        assert prelude_data.DataCollector == "SurvPC"
 
 
 def test_parse_prelude_missing_fields():
@@ -57,3 +58,4 @@ def test_parse_prelude_missing_fields():
         assert not prelude_data.Equipment
         assert not prelude_data.AntennaType
         assert not prelude_data.UserDefined
+        assert prelude_data.DataCollector is None
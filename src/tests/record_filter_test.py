@@ -0,0 +1,125 @@
+"""Tests for filtering records during conversion."""
+
+import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.record_filter import RecordFilter
+
+SS_RW5 = Path("./src/tests/data/ss.test.rw5")
+SS_CRDB = Path("./src/tests/data/ss.test.crdb")
+GPS_RW5 = Path("./src/tests/data/gps-short-stats.test.rw5")
+
+
+def test_filter_record_types_keeps_state():
+    """SS rows still get their occupied point and rod heights when OC and LS rows are filtered out."""
+    unfiltered = convert(SS_RW5, None, crdb_path=SS_CRDB)
+    machine = convert(SS_RW5, None, crdb_path=SS_CRDB, record_filter=RecordFilter(RecordTypes={"SS"}))
+
+    assert {row.RW5RecordType for row in machine.Records.values()} == {"SS"}
+    assert len(machine.Backsights) == 1
+    for point_id, row in machine.Records.items():
+        assert row == unfiltered.Records[point_id]
+    assert machine.SideshotIDOccupiedPointID == unfiltered.SideshotIDOccupiedPointID
+
+
+def test_filter_point_ids_and_dates():
+    machine = convert(
+        GPS_RW5,
+        None,
+        record_filter=RecordFilter(
+            PointIDPatterns=["600?"],
+            Start=datetime.datetime(2024, 10, 4, 14, 44),  # noqa: DTZ001
+            End=datetime.datetime(2024, 10, 4, 14, 45, 30),  # noqa: DTZ001
+        ),
+    )
+
+    assert list(machine.Records.keys()) == ["6002", "6003", "6004"]
+
+
+def test_filter_quality():
+    unfiltered = convert(GPS_RW5, None)
+    record_filter = RecordFilter(RecordTypes={"GPS"}, Statuses={"FIXED"}, MaxHRMS=0.03)
+
+    machine = convert(GPS_RW5, None, record_filter=record_filter)
+
+    expected = [
+        row.PointID for row in unfiltered.Records.values()
+        if row.RW5RecordType == "GPS" and row.Status == "FIXED" and row.HRMS <= 0.03  # noqa: PLR2004
+    ]
+    assert expected
+    assert list(machine.Records.keys()) == expected
+
+
+def test_rejected_reshot_drops_superseded_shot():
+    """Filtering while parsing keeps the same rows as filtering the converted records."""
+    rw5_text = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5").read_bytes()
+    # make the final shot of 5605 fail the HRMS threshold
+    reshot = rw5_text.rindex(b"GPS,PN5605,")
+    reshot_end = rw5_text.index(b"\nGPS,", reshot)
+    block = rw5_text[reshot:reshot_end].replace(b"--HRMS Avg: 0.0055", b"--HRMS Avg: 0.0900").replace(b"--HRMS:0.005,", b"--HRMS:0.090,")
+    record_filter = RecordFilter(MaxHRMS=0.01)
+
+    with TemporaryDirectory() as tmpdir:
+        rw5_path = Path(tmpdir) / "job.rw5"
+        rw5_path.write_bytes(rw5_text[:reshot] + block + rw5_text[reshot_end:])
+
+        unfiltered = convert(rw5_path, None)
+        machine = convert(rw5_path, None, record_filter=record_filter)
+
+    assert unfiltered.Records["5605"].HRMS == 0.09  # noqa: PLR2004
+    assert "5605" not in machine.Records
+    expected = [point_id for point_id, row in unfiltered.Records.items() if record_filter.accepts_row(row)]
+    assert list(machine.Records.keys()) == expected
+
+
+REJECTED_RESHOTS = [
+    # rejected on quality, once parsed
+    pytest.param(("--HRMS:0.036,", "--HRMS:0.090,"), RecordFilter(MaxHRMS=0.05), id="row"),
+    # rejected on date, before parsing
+    pytest.param(
+        ("--DT10-04-2024", "--DT10-05-2024"),
+        RecordFilter(Start=datetime.datetime(2024, 10, 4), End=datetime.datetime(2024, 10, 5)),  # noqa: DTZ001
+        id="block",
+    ),
+]
+
+
+def _reshoot_6002(tmp_path: Path, edits: list[tuple[str, str] | None]) -> Path:
+    """Append re-shots of 6002 to the GPS job, each with its text edited by `edits`."""
+    rw5_text = GPS_RW5.read_text(encoding="iso8859-1")
+    shot = rw5_text.index("GPS,PN6002,")
+    block = rw5_text[shot : rw5_text.index("GPS,", shot + 1)]
+    reshots = [block if edit is None else block.replace(*edit) for edit in edits]
+    rw5_path = tmp_path / "job.rw5"
+    rw5_path.write_text("\n".join([rw5_text, *reshots]), encoding="iso8859-1")
+    return rw5_path
+
+
+@pytest.mark.parametrize(("edit", "record_filter"), REJECTED_RESHOTS)
+def test_rejected_reshot_drops_its_point_id(tmp_path: Path, edit: tuple[str, str], record_filter: RecordFilter):
+    """However a re-shot is rejected, the shot it supersedes and its base point are dropped."""
+    before_reshots = convert(GPS_RW5, None, record_filter=record_filter)
+    machine = convert(_reshoot_6002(tmp_path, [edit]), None, record_filter=record_filter)
+
+    assert "6002" in before_reshots.Records
+    assert "6002" in before_reshots.GPSIDBasePointID
+    assert "6002" not in machine.Records
+    assert "6002" not in machine.GPSIDBasePointID
+    assert machine.Records == {point_id: row for point_id, row in before_reshots.Records.items() if point_id != "6002"}
+
+
+@pytest.mark.parametrize(("edit", "record_filter"), REJECTED_RESHOTS)
+def test_reaccepted_reshot_is_an_overwrite(tmp_path: Path, edit: tuple[str, str], record_filter: RecordFilter):
+    """A shot accepted after a rejected re-shot of its point id is kept, and is still marked overwritten."""
+    rw5_path = _reshoot_6002(tmp_path, [edit, None])
+    before_reshots = convert(GPS_RW5, None, record_filter=record_filter)
+    unfiltered = convert(rw5_path, None)
+    machine = convert(rw5_path, None, record_filter=record_filter)
+
+    assert machine.Records["6002"].Overwritten
+    assert machine.Records == {**before_reshots.Records, "6002": unfiltered.Records["6002"]}
+    assert machine.GPSIDBasePointID["6002"] == unfiltered.GPSIDBasePointID["6002"]
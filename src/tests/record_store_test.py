@@ -0,0 +1,62 @@
+"""Tests for converting with a bounded number of bytes of rows in memory."""
+
+from pathlib import Path
+
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.record_store import SpillingRecordStore
+from rw5_to_csv.records.record import RW5Row
+
+GPS_RW5 = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5")
+SS_RW5 = Path("./src/tests/data/ss.test.rw5")
+SS_CRDB = Path("./src/tests/data/ss.test.crdb")
+
+
+@pytest.mark.parametrize(("rw5_path", "crdb_path"), [(GPS_RW5, None), (SS_RW5, SS_CRDB)])
+def test_convert_with_memory_budget(tmp_path: Path, rw5_path: Path, crdb_path: Path | None):
+    """Spilling rows to disk gives the same rows, in the same order, as converting in memory."""
+    expected_csv = tmp_path / "expected.csv"
+    spilled_csv = tmp_path / "spilled.csv"
+    expected = convert(rw5_path, expected_csv, crdb_path=crdb_path)
+    machine = convert(rw5_path, spilled_csv, crdb_path=crdb_path, memory_budget=1_000)
+
+    assert isinstance(machine.Records, SpillingRecordStore)
+    assert list(machine.Records.items()) == list(expected.Records.items())
+    assert spilled_csv.read_text() == expected_csv.read_text()
+
+
+def test_budget_counts_bytes():
+    small_rows = SpillingRecordStore(memory_budget=10_000)
+    large_rows = SpillingRecordStore(memory_budget=10_000)
+    for point_id in map(str, range(200)):
+        small_rows[point_id] = RW5Row(PointID=point_id, Note="", RW5RecordType="GPS")
+        large_rows[point_id] = RW5Row(PointID=point_id, Note="x" * 1_000, RW5RecordType="GPS")
+
+    # rows with long notes take more of the budget, so fewer of them are held
+    assert 1 <= len(large_rows._hot) < len(small_rows._hot)  # noqa: SLF001
+    for store in (small_rows, large_rows):
+        assert store._resident_bytes() <= store.MemoryBudget  # noqa: SLF001
+        assert list(store) == [str(i) for i in range(200)]
+        store.close()
+
+
+def test_overwrite_spilled_row_keeps_position():
+    store = SpillingRecordStore(memory_budget=1)
+    for point_id in ["1", "2", "3", "4"]:
+        store[point_id] = RW5Row(PointID=point_id, Note="", RW5RecordType="GPS")
+
+    store["1"] = RW5Row(PointID="1", Note="new", RW5RecordType="GPS", Overwritten=True)
+    del store["3"]
+
+    assert len(store) == 3  # noqa: PLR2004
+    assert list(store) == ["1", "2", "4"]
+    assert store["1"].Note == "new"
+    assert "3" not in store
+    with pytest.raises(KeyError):
+        store["3"]
+
+    spill_path = store.SpillPath
+    assert spill_path.exists()
+    store.close()
+    assert not spill_path.exists()
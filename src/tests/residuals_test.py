@@ -0,0 +1,50 @@
+"""Tests for BD and SS residuals against CRDB coordinates."""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pytest
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.residuals import analyze_station_residuals
+
+SS_RW5 = Path("./src/tests/data/ss.test.rw5")
+SS_CRDB = Path("./src/tests/data/ss.test.crdb")
+
+
+def test_station_residuals():
+    machine = convert(SS_RW5, None, crdb_path=SS_CRDB)
+    assert [observation.RecordType for observation in machine.Observations] == ["BD", "SS", "SS", "SS"]
+
+    (station,) = analyze_station_residuals(machine)
+
+    assert station.OccupiedPointID == "1"
+    assert station.PointIDs == ["G1", "2", "3", "4"]
+    # CRDB sideshot coordinates were computed from these observations, so only rounding is left
+    sideshots = np.array(station.RecordTypes) == "SS"
+    assert np.all(np.abs(station.HorizontalDistance[sideshots]) < 1e-4)  # noqa: PLR2004
+    assert np.all(np.abs(station.HeightDifference[sideshots]) < 1e-4)  # noqa: PLR2004
+    assert np.all(np.abs(station.AngleSeconds[sideshots]) < 1)
+    # the BD to the GPS point G1 disagrees by kilometres, see the record's --Delta line
+    assert station.flagged_point_ids() == ["G1"]
+
+
+@pytest.mark.parametrize("ignore_missing_shots", [False, True])
+def test_observations_missing_fields_do_not_affect_rows(ignore_missing_shots: bool):
+    rw5_text = SS_RW5.read_bytes()
+    assert b"SS,OP1,FP3,AR239.3525," in rw5_text
+    assert b"BD,OP1,FPG1,AR0.0000,ZE106.4145,SD1.100000," in rw5_text
+    rw5_text = rw5_text.replace(b"SS,OP1,FP3,AR239.3525,", b"SS,OP1,FP3,AZ239.3525,")
+    rw5_text = rw5_text.replace(b"ZE106.4145,SD1.100000,", b"ZE106.4145,")
+    unchanged = convert(SS_RW5, None, crdb_path=SS_CRDB)
+
+    with TemporaryDirectory() as tmpdir:
+        rw5_path = Path(tmpdir) / "job.rw5"
+        rw5_path.write_bytes(rw5_text)
+        machine = convert(rw5_path, None, crdb_path=SS_CRDB, ignore_missing_shots=ignore_missing_shots)
+
+    assert dict(machine.Records) == dict(unchanged.Records)
+    assert [row.PointID for row in machine.Records.values() if row.RW5RecordType == "SS"] == ["2", "3", "4"]
+    assert [(o.RecordType, o.ForesightPointID) for o in machine.Observations] == [("SS", "2"), ("SS", "4")]
+    assert len(machine.Diagnostics) == 0
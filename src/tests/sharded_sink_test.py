@@ -0,0 +1,106 @@
+"""Tests for writing rows to one CSV per shard key."""
+
+import csv
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.machine_state import BacksightRow
+from rw5_to_csv.records.record import RW5Row
+from rw5_to_csv.sinks import UNASSIGNED_SHARD, CSVSink, RecordSink, ShardedCSVSink
+
+
+class _MaxOpenFiles(RecordSink):
+    def __init__(self, sink: ShardedCSVSink) -> None:
+        self.sink = sink
+        self.max_open = 0
+
+    def write_row(self, row: RW5Row) -> None:
+        self.max_open = max(self.max_open, self.sink.open_files)
+
+
+def _read_shards(sink: ShardedCSVSink) -> dict[str, list[dict[str, str]]]:
+    shards = {}
+    for key, path in sink.ShardPaths.items():
+        with path.open() as f:
+            shards[key] = list(csv.DictReader(f))
+    return shards
+
+
+def test_shard_per_point_with_one_open_file():
+    rw5_path = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5")
+
+    with TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "out.csv"
+        sharded = ShardedCSVSink(Path(tmpdir) / "shards", lambda row: row.RW5RecordType, max_open_files=1)
+        watcher = _MaxOpenFiles(sharded)
+        convert(rw5_path, None, sinks=[CSVSink(csv_path), sharded, watcher])
+
+        assert watcher.max_open == 1
+        assert sharded.open_files == 0
+        with csv_path.open() as f:
+            rows = list(csv.DictReader(f))
+        shards = _read_shards(sharded)
+        # reopened shards are appended to without repeating the header
+        assert sum(len(shard_rows) for shard_rows in shards.values()) == len(rows)
+        for key, shard_rows in shards.items():
+            assert shard_rows == [row for row in rows if row["RW5RecordType"] == key]
+
+
+def test_shard_by_station():
+    rw5_path = Path("./src/tests/data/ss.test.rw5")
+    crdb_path = Path("./src/tests/data/ss.test.crdb")
+
+    with TemporaryDirectory() as tmpdir:
+        sharded = ShardedCSVSink(Path(tmpdir), "station", max_open_files=2)
+        machine = convert(rw5_path, None, crdb_path=crdb_path, sinks=[sharded])
+
+        shards = _read_shards(sharded)
+        stations = {backsight.OccupiedPointID for backsight in machine.Backsights}
+        assert stations <= set(shards)
+        num_ss_rows = 0
+        for key, shard_rows in shards.items():
+            for row in shard_rows:
+                if row["RW5RecordType"] == "SS":
+                    num_ss_rows += 1
+                    assert machine.SideshotIDOccupiedPointID[row["PointID"]] == key
+                elif row["RW5RecordType"] == "OC":
+                    assert row["PointID"] == key
+                else:
+                    assert key == UNASSIGNED_SHARD
+        assert num_ss_rows == sum(row.RW5RecordType == "SS" for row in machine.Records.values()) > 0
+
+
+def test_shard_by_station_follows_backsights():
+    def backsight(occupied_point_id: str) -> BacksightRow:
+        return BacksightRow(
+            Reflectorless=False,
+            BacksightPointID="BS",
+            OccupiedPointID=occupied_point_id,
+            BacksightAngleDD=0.0,
+            BacksightDistance=1.0,
+        )
+
+    with TemporaryDirectory() as tmpdir:
+        with ShardedCSVSink(Path(tmpdir), "station", max_open_files=1) as sink:
+            sink.write_row(RW5Row(PointID="G1", Note="", RW5RecordType="GPS"))
+            sink.write_row(RW5Row(PointID="A", Note="", RW5RecordType="OC"))
+            sink.write_row(RW5Row(PointID="B", Note="", RW5RecordType="OC"))
+            sink.write_backsight(backsight("A"))
+            sink.write_row(RW5Row(PointID="1", Note="", RW5RecordType="SS"))
+            sink.write_backsight(backsight("B"))
+            sink.write_row(RW5Row(PointID="2", Note="", RW5RecordType="SS"))
+            sink.write_backsight(backsight("A"))
+            sink.write_row(RW5Row(PointID="3", Note="", RW5RecordType="SS"))
+
+        shards = {key: [row["PointID"] for row in rows] for key, rows in _read_shards(sink).items()}
+        assert shards == {UNASSIGNED_SHARD: ["G1"], "A": ["A", "1", "3"], "B": ["B", "2"]}
+
+
+def test_shard_file_names_are_unique():
+    with TemporaryDirectory() as tmpdir:
+        sink = ShardedCSVSink(Path(tmpdir), "instrument")
+        names = {key: sink._path_for(key).name for key in ["a/b", "a_b", "A:B", "unknown"]}  # noqa: SLF001
+        assert len(set(names.values())) == len(names)
+        assert names["a/b"] == "a_b.csv"
+        assert names["a_b"] == "a_b-2.csv"
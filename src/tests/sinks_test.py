@@ -0,0 +1,58 @@
+"""Tests for streaming output sinks."""
+
+import csv
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.records.record import RW5Row
+from rw5_to_csv.sinks import CSVSink, GeoJSONSink, JSONLinesSink, RecordSink
+
+
+class _OverwriteCounter(RecordSink):
+    def __init__(self) -> None:
+        self.overwrites: list[tuple[RW5Row, RW5Row]] = []
+        self.closed = False
+
+    def write_overwrite(self, old_row: RW5Row, new_row: RW5Row) -> None:
+        self.overwrites.append((old_row, new_row))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_convert_feeds_several_sinks():
+    rw5_path = Path("./src/tests/data/gps-long-stats_overwritten-shots.test.rw5")
+
+    with TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "out.csv"
+        jsonl_path = Path(tmpdir) / "out.jsonl"
+        geojson_path = Path(tmpdir) / "out.geojson"
+        counter = _OverwriteCounter()
+
+        machine = convert(
+            rw5_path,
+            None,
+            sinks=[CSVSink(csv_path), JSONLinesSink(jsonl_path), GeoJSONSink(geojson_path), counter],
+        )
+
+        num_rows = len(machine.Records) + len(counter.overwrites)
+        assert counter.closed
+        assert len(counter.overwrites) == 4  # noqa: PLR2004
+        assert all(new.Overwritten and old.PointID == new.PointID for old, new in counter.overwrites)
+
+        with csv_path.open() as f:
+            assert len(list(csv.DictReader(f))) == num_rows
+
+        json_rows = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+        assert len(json_rows) == num_rows
+        # last row per point id is the final record
+        final = {row["PointID"]: row for row in json_rows}
+        assert set(final) == set(machine.Records)
+
+        geojson = json.loads(geojson_path.read_text())
+        assert geojson["type"] == "FeatureCollection"
+        assert len(geojson["features"]) == num_rows
+        gps_feature = next(f for f in geojson["features"] if f["properties"]["RW5RecordType"] == "GPS")
+        assert gps_feature["geometry"]["type"] == "Point"
@@ -0,0 +1,72 @@
+"""Tests for the matplotlib-free SVG renderer."""
+
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import rw5_to_csv
+from rw5_to_csv.convert import convert
+from rw5_to_csv.plot_data import PlotLOD, StationPlotData, get_points_extent
+from rw5_to_csv.svg_plot import GREEN, RED, plot_total_station_svg, render_station_svgs, render_stations_svg
+from rw5_to_csv.total_station import get_total_station_stations
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def test_render_stations_svg():
+    station = StationPlotData(
+        "OC<1>",
+        (100.0, 200.0),
+        BacksightPointIDs=["BS"],
+        BacksightPoints=[(110.0, 200.0)],
+        SideshotPointIDs=["S1", "S2"],
+        SideshotPoints=[(100.0, 210.0), (105.0, 205.0)],
+    )
+
+    root = ET.fromstring(render_stations_svg([station], get_points_extent(station.points())))
+
+    assert root.tag == f"{SVG}svg"
+    uses = [use.get("href") for use in root.iter(f"{SVG}use")]
+    assert uses == ["#bs", "#oc", "#ss", "#ss"]
+    labels = {text.text: text.get("fill") for text in root.iter(f"{SVG}text")}
+    assert labels == {"BS": RED, "OC<1>": GREEN}
+    assert len(list(root.iter(f"{SVG}line"))) == 3  # noqa: PLR2004
+
+    # north is up: the sideshot north of the OC is drawn above it
+    positions = [(float(use.get("x")), float(use.get("y"))) for use in root.iter(f"{SVG}use")]
+    assert positions[2][1] < positions[1][1]
+    assert positions[0][0] > positions[1][0]
+
+    dense = ET.fromstring(render_stations_svg([station], get_points_extent(station.points()), PlotLOD(LabelDensityThreshold=0)))
+    assert [text.text for text in dense.iter(f"{SVG}text")] == ["OC<1>"]
+
+
+def test_svg_plots_of_job():
+    machine = convert(
+        Path("./src/tests/data/ss.test.rw5"),
+        None,
+        crdb_path=Path("./src/tests/data/ss.test.crdb"),
+    )
+
+    root = ET.fromstring(plot_total_station_svg(machine))
+    assert root.tag == f"{SVG}svg"
+
+    with TemporaryDirectory() as tmpdir:
+        paths = list(render_station_svgs(get_total_station_stations(machine), Path(tmpdir)))
+        assert paths == [Path(tmpdir) / "station_1.svg"]
+        assert ET.parse(paths[0]).getroot().tag == f"{SVG}svg"
+
+        # re-occupying a point gives a second file rather than overwriting the first
+        station = get_total_station_stations(machine)[0]
+        paths = list(render_station_svgs([station, station], Path(tmpdir) / "twice"))
+        assert [path.name for path in paths] == ["station_1.svg", "station_1-2.svg"]
+
+
+def test_svg_plot_does_not_import_matplotlib():
+    # a fresh interpreter, as other tests import matplotlib
+    code = "import sys, rw5_to_csv, rw5_to_csv.svg_plot; assert 'matplotlib' not in sys.modules"
+    env = {**os.environ, "PYTHONPATH": str(Path(rw5_to_csv.__file__).parents[1])}
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)  # noqa: S603
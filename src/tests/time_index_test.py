@@ -0,0 +1,89 @@
+"""Tests for querying converted rows by shot time."""
+
+import datetime
+from pathlib import Path
+
+from rw5_to_csv.convert import convert
+from rw5_to_csv.record_filter import RecordFilter
+from rw5_to_csv.record_store import SpillingRecordStore
+
+GPS_RW5 = Path("./src/tests/data/gps-short-stats.test.rw5")
+
+
+def test_time_index_matches_scan():
+    machine = convert(GPS_RW5, None, build_time_index=True)
+    index = machine.TimeIndex
+    rows = [row for row in machine.Records.values() if row.DateTime is not None]
+    assert index is not None
+    assert len(index) == len(rows)
+
+    times = sorted(row.DateTime for row in rows)
+    start, end = times[len(times) // 4], times[3 * len(times) // 4]
+    expected = sorted((row for row in rows if start <= row.DateTime < end), key=lambda row: row.DateTime)
+    assert [row.PointID for row in index.between(start, end)] == [row.PointID for row in expected]
+
+    records = list(machine.Records.values())
+    assert [records[i] for i in index.positions_between(start, end)] == index.between(start, end)
+
+    # naive datetimes are in the conversion's timezone
+    assert index.between(start.replace(tzinfo=None), end.replace(tzinfo=None)) == index.between(start, end)
+
+    delta = datetime.timedelta(seconds=30)
+    assert {row.PointID for row in index.within(start, delta)} == {
+        row.PointID for row in rows if abs(row.DateTime - start) <= delta
+    }
+
+    probe = start + datetime.timedelta(seconds=1)
+    nearest = index.nearest(probe)
+    assert nearest is not None
+    assert abs(nearest.DateTime - probe) == min(abs(row.DateTime - probe) for row in rows)
+
+
+def test_time_index_buckets():
+    machine = convert(GPS_RW5, None, build_time_index=True)
+    index = machine.TimeIndex
+    assert index is not None
+
+    buckets = index.buckets(datetime.timedelta(minutes=15))
+
+    assert sum(len(bucket_rows) for bucket_rows in buckets.values()) == len(index)
+    for bucket_start, bucket_rows in buckets.items():
+        assert bucket_start.minute % 15 == 0
+        assert bucket_start.second == 0
+        assert all(bucket_start <= row.DateTime < bucket_start + datetime.timedelta(minutes=15) for row in bucket_rows)
+
+
+def test_time_index_not_built_by_default():
+    assert convert(GPS_RW5, None).TimeIndex is None
+
+
+def test_time_index_reads_spilled_rows_from_store():
+    expected = convert(GPS_RW5, None, build_time_index=True).TimeIndex
+    machine = convert(GPS_RW5, None, build_time_index=True, memory_budget=1_000)
+    index = machine.TimeIndex
+    assert expected is not None
+    assert index is not None
+    assert isinstance(machine.Records, SpillingRecordStore)
+
+    start = datetime.datetime.fromtimestamp(index.Timestamps[0], tz=datetime.UTC)
+    end = datetime.datetime.fromtimestamp(index.Timestamps[-1], tz=datetime.UTC)
+    assert index.between(start, end) == expected.between(start, end)
+    assert index.nearest(end) == expected.nearest(end)
+
+
+def test_time_index_follows_filtered_records(tmp_path: Path):
+    """A rejected re-shot drops the earlier shot of its point id from the index too."""
+    rw5_text = GPS_RW5.read_text(encoding="iso8859-1")
+    shot = rw5_text.index("GPS,PN6002,")
+    reshot = rw5_text[shot : rw5_text.index("GPS,", shot + 1)].replace("--HRMS:0.036,", "--HRMS:0.090,")
+    rw5_path = tmp_path / "job.rw5"
+    rw5_path.write_text(f"{rw5_text}\n{reshot}", encoding="iso8859-1")
+
+    machine = convert(rw5_path, None, build_time_index=True, record_filter=RecordFilter(MaxHRMS=0.05))
+    index = machine.TimeIndex
+    assert index is not None
+
+    records = list(machine.Records.values())
+    assert "6002" not in index.PointIDs
+    assert sorted(index.PointIDs) == sorted(row.PointID for row in records if row.DateTime is not None)
+    assert [records[position].PointID for position in index.Positions] == index.PointIDs
@@ -0,0 +1,52 @@
+"""Tests for the watch-folder conversion service."""
+
+import shutil
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rw5_to_csv.watch import FolderWatcher
+
+RW5_PATH = Path("./src/tests/data/gps-short-stats.test.rw5")
+
+
+def test_watch_converts_settled_files_once():
+    with TemporaryDirectory() as tmpdir:
+        input_dir = Path(tmpdir) / "in"
+        output_dir = Path(tmpdir) / "out"
+        input_dir.mkdir()
+        shutil.copy(RW5_PATH, input_dir / "job.rw5")
+
+        watcher = FolderWatcher(input_dir, output_dir, settle_seconds=0, max_workers=1)
+        try:
+            assert watcher.scan() == [input_dir / "job.rw5"]
+            watcher.wait()
+            assert (output_dir / "job.csv").exists()
+            # nothing changed, nothing to do
+            assert watcher.scan() == []
+
+            # touched but identical content is skipped
+            (input_dir / "job.rw5").write_bytes(RW5_PATH.read_bytes())
+            assert watcher.scan() == []
+        finally:
+            watcher.close()
+
+        # converted hashes are remembered across restarts
+        watcher = FolderWatcher(input_dir, output_dir, settle_seconds=0, max_workers=1)
+        try:
+            assert watcher.scan() == []
+        finally:
+            watcher.close()
+
+
+def test_watch_waits_for_files_to_settle():
+    with TemporaryDirectory() as tmpdir:
+        input_dir = Path(tmpdir) / "in"
+        input_dir.mkdir()
+        shutil.copy(RW5_PATH, input_dir / "job.rw5")
+
+        watcher = FolderWatcher(input_dir, Path(tmpdir) / "out", settle_seconds=60, max_workers=1)
+        try:
+            assert watcher.scan() == []
+            assert watcher.scan() == []
+        finally:
+            watcher.close()